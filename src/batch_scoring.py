@@ -0,0 +1,59 @@
+import argparse
+import logging
+import os
+import time
+
+from dotenv import load_dotenv
+
+from ml_prediction_web_service.configuration import get_model_path
+from ml_prediction_web_service.services.data_service import (
+    BULK_SCORING_CHUNK_SIZE,
+    get_table_format,
+    iter_table_chunks,
+    score_band_gap_chunks_parallel,
+    write_parquet_chunks
+)
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Score a table of perovskite compositions offline.")
+    parser.add_argument("input", help="CSV or Parquet table with prepared composition columns")
+    parser.add_argument("output", help="Parquet file to write predictions and computed factors to")
+    parser.add_argument("--input-format", choices=["csv", "parquet"], default=None)
+    parser.add_argument("--from-drive", action="store_true", help="read the input through Google Drive storage")
+    parser.add_argument("--chunk-size", type=int, default=BULK_SCORING_CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--models-path", default=None, help="defaults to MODELS_PATH")
+    return parser.parse_args()
+
+
+def _open_input(path: str, from_drive: bool):
+    if not from_drive:
+        return open(path, "rb")
+    from ml_prediction_web_service.google_storage.credentials import google_credentials
+    from ml_prediction_web_service.google_storage.storage import GoogleDriveStorage
+
+    storage = GoogleDriveStorage(google_credentials())
+    return open(storage.download_file_to_path(path), "rb")
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    args = _parse_args()
+    models_path = args.models_path or get_model_path()
+    file_format = get_table_format(args.input, args.input_format)
+
+    started_at = time.perf_counter()
+    with _open_input(args.input, args.from_drive) as file:
+        chunks = iter_table_chunks(file, file_format, args.chunk_size)
+        scored = score_band_gap_chunks_parallel(chunks, models_path, args.workers)
+        rows = write_parquet_chunks(scored, args.output)
+    logger.info("Scored %d rows in %.1fs, written to %s", rows, time.perf_counter() - started_at, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+import math
+from typing import AsyncIterator, Iterator, TypeVar
+
+from fastapi import HTTPException
+
+from ml_prediction_web_service.components import AppComponents
+from ml_prediction_web_service.services.inference_executor import InferenceOverloadedError
+
+T = TypeVar("T")
+
+
+def admit_inference(components: AppComponents):
+    """
+    Admit a request to the inference executor, or reject it with 503 and a Retry-After hint when it is full.
+    """
+    try:
+        return components.inference_executor.admit()
+    except InferenceOverloadedError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(math.ceil(e.retry_after_seconds))}
+        )
+
+
+def iterate_admitted(components: AppComponents, iterator: Iterator[T]) -> AsyncIterator[T]:
+    """
+    Stream `iterator` from the inference executor, holding an admission slot until the stream ends.
+    The slot is taken right away, so an overloaded executor rejects the request before streaming starts.
+    """
+    admission = admit_inference(components)
+
+    async def stream() -> AsyncIterator[T]:
+        with admission:
+            async for item in components.inference_executor.iterate(iterator):
+                yield item
+
+    return stream()
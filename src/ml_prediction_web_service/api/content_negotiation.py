@@ -0,0 +1,127 @@
+import json
+from typing import Any
+
+import msgpack
+import pyarrow as pa
+from fastapi import HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+
+JSON_MEDIA_TYPE = "application/json"
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+
+MEDIA_TYPE_ALIASES = {
+    JSON_MEDIA_TYPE: JSON_MEDIA_TYPE,
+    ARROW_STREAM_MEDIA_TYPE: ARROW_STREAM_MEDIA_TYPE,
+    MSGPACK_MEDIA_TYPE: MSGPACK_MEDIA_TYPE,
+    "application/x-msgpack": MSGPACK_MEDIA_TYPE,
+}
+MEDIA_TYPES = (JSON_MEDIA_TYPE, ARROW_STREAM_MEDIA_TYPE, MSGPACK_MEDIA_TYPE)
+
+
+def request_media_type(request: Request) -> str:
+    """
+    Media type of the request body from its Content-Type, JSON when none is given.
+
+    Raises:
+        HTTPException: 415 if the body is in a format the endpoint doesn't read.
+    """
+    content_type = request.headers.get("content-type")
+    if not content_type:
+        return JSON_MEDIA_TYPE
+    media_type = MEDIA_TYPE_ALIASES.get(content_type.split(";")[0].strip().lower())
+    if media_type is None:
+        raise HTTPException(
+            status_code=415,
+            detail=f"Unsupported content type {content_type}, expected one of {list(MEDIA_TYPES)}"
+        )
+    return media_type
+
+
+def response_media_type(request: Request, default: str) -> str:
+    """
+    First supported media type of the Accept header, by quality, or `default` (the request's format)
+    when the client accepts anything.
+
+    Raises:
+        HTTPException: 406 if none of the accepted types can be returned.
+    """
+    accept = request.headers.get("accept")
+    if not accept:
+        return default
+    candidates = []
+    for position, part in enumerate(accept.split(",")):
+        media_range, *params = [value.strip().lower() for value in part.split(";")]
+        quality = 1.
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.
+        if quality > 0:
+            candidates.append((-quality, position, media_range))
+    for _, _, media_range in sorted(candidates):
+        if media_range in ("*/*", "application/*"):
+            return default
+        if media_range in MEDIA_TYPE_ALIASES:
+            return MEDIA_TYPE_ALIASES[media_range]
+    raise HTTPException(
+        status_code=406,
+        detail=f"Can't respond with {accept}, available types are {list(MEDIA_TYPES)}"
+    )
+
+
+def decode_msgpack(body: bytes) -> Any:
+    """
+    Raises:
+        HTTPException: 422 if the body is not valid MessagePack.
+    """
+    try:
+        return msgpack.unpackb(body, raw=False)
+    except (msgpack.UnpackException, ValueError) as e:
+        raise HTTPException(status_code=422, detail=f"Invalid MessagePack body: {e}")
+
+
+def decode_json(body: bytes) -> Any:
+    """
+    Raises:
+        HTTPException: 422 if the body is not valid JSON.
+    """
+    try:
+        return json.loads(body)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid JSON body: {e}")
+
+
+def decode_arrow_stream(body: bytes) -> pa.Table:
+    """
+    Read an Arrow IPC stream. The table's buffers point into `body`, nothing is copied.
+
+    Raises:
+        HTTPException: 422 if the body is not an Arrow IPC stream.
+    """
+    try:
+        with pa.ipc.open_stream(pa.py_buffer(body)) as reader:
+            return reader.read_all()
+    except pa.ArrowInvalid as e:
+        raise HTTPException(status_code=422, detail=f"Invalid Arrow IPC stream: {e}")
+
+
+def encode_arrow_stream(table: pa.Table) -> bytes:
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def encoded_response(content: Any, media_type: str) -> Response:
+    """
+    Response with `content` (a pydantic model, plain data or, for Arrow, a table) in `media_type`.
+    """
+    if media_type == ARROW_STREAM_MEDIA_TYPE:
+        return Response(content=encode_arrow_stream(content), media_type=ARROW_STREAM_MEDIA_TYPE)
+    if media_type == MSGPACK_MEDIA_TYPE:
+        return Response(content=msgpack.packb(jsonable_encoder(content)), media_type=MSGPACK_MEDIA_TYPE)
+    return JSONResponse(content=jsonable_encoder(content))
@@ -0,0 +1,69 @@
+import shutil
+import tempfile
+from itertools import chain
+from typing import IO, Iterator, TypeVar
+
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+
+from ml_prediction_web_service.api.admission import admit_inference, iterate_admitted
+from ml_prediction_web_service.components import AppComponents
+from ml_prediction_web_service.configuration import build_components
+from ml_prediction_web_service.services.data_service import (
+    BULK_SCORING_CHUNK_SIZE,
+    get_table_format,
+    iter_table_chunks,
+    score_band_gap_chunks,
+    serialize_chunks
+)
+
+router = APIRouter(prefix="/data", tags=["Data"])
+
+OUTPUT_MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+# uploads up to this size are spooled in memory, larger ones to a temporary file
+UPLOAD_SPOOL_MAX_BYTES = 16 * 1024 * 1024
+
+T = TypeVar("T")
+
+
+def _closing_when_done(file: IO[bytes], iterator: Iterator[T]) -> Iterator[T]:
+    try:
+        yield from iterator
+    finally:
+        file.close()
+
+
+@router.post("/score/band_gap")
+async def score_band_gap_table(
+        file: UploadFile = File(...),
+        input_format: str | None = Query(None, description="csv or parquet, taken from the file name by default"),
+        output_format: str = Query("csv", pattern="^(csv|ndjson)$"),
+        chunk_size: int = Query(BULK_SCORING_CHUNK_SIZE, ge=1, le=1_000_000),
+        components: AppComponents = Depends(build_components)
+):
+    try:
+        file_format = get_table_format(file.filename, input_format)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    # the upload is closed once this handler returns, while the response is still streaming,
+    # so the stream reads its own copy and closes it at the end
+    table = tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_MAX_BYTES)
+    try:
+        await run_in_threadpool(shutil.copyfileobj, file.file, table)
+        table.seek(0)
+        scored = score_band_gap_chunks(iter_table_chunks(table, file_format, chunk_size), components)
+        # score the first chunk before streaming, so bad input is still reported with a proper status
+        with admit_inference(components):
+            first = await components.inference_executor.run(next, scored, None)
+        chunks = chain([first], scored) if first is not None else iter(())
+        stream = iterate_admitted(components, serialize_chunks(_closing_when_done(table, chunks), output_format))
+    except ValueError as e:
+        table.close()
+        raise HTTPException(status_code=422, detail=str(e))
+    except BaseException:
+        table.close()
+        raise
+
+    return StreamingResponse(stream, media_type=OUTPUT_MEDIA_TYPES[output_format])
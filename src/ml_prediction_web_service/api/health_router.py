@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse
+
+from ml_prediction_web_service.components import AppComponents
+from ml_prediction_web_service.configuration import build_components
+
+router = APIRouter(prefix="/health", tags=["Health"])
+
+
+@router.get("/live")
+async def get_liveness():
+    return {"status": "alive"}
+
+
+@router.get("/ready")
+async def get_readiness(
+        components: AppComponents = Depends(build_components)
+):
+    """
+    Ready once this worker process has loaded and warmed up its models, 503 before that.
+    """
+    if not components.ready:
+        return JSONResponse(status_code=503, content={"status": "loading"})
+    return {"status": "ready"}
@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+
+from ml_prediction_web_service.components import AppComponents
+from ml_prediction_web_service.configuration import build_components
+from ml_prediction_web_service.services.metrics import REGISTRY, render_gauge
+
+router = APIRouter(tags=["Metrics"])
+
+PROMETHEUS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics(
+        components: AppComponents = Depends(build_components)
+):
+    gauges = [
+        render_gauge(
+            "prediction_batch_queue_depth", "Requests waiting for a micro-batch",
+            {
+                ("band_gap",): components.band_gap_batcher.queue_depth,
+                ("stability_pce_t80",): components.pce_t80_batcher.queue_depth,
+            },
+            ("batcher",)
+        ),
+        render_gauge(
+            "inference_in_flight", "Requests admitted to the inference executor",
+            {(): components.inference_executor.stats()["in_flight"]}, ()
+        ),
+    ]
+    if components.prediction_cache is not None:
+        gauges.append(render_gauge(
+            "prediction_cache_entries", "Entries in the prediction cache",
+            {(): components.prediction_cache.stats()["size"]}, ()
+        ))
+    return PlainTextResponse(REGISTRY.render() + "".join(gauges), media_type=PROMETHEUS_MEDIA_TYPE)
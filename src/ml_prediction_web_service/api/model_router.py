@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Depends
+
+from ml_prediction_web_service.components import AppComponents
+from ml_prediction_web_service.configuration import build_components
+from ml_prediction_web_service.entities.model_dictionary import SavedModelName
+
+router = APIRouter(prefix="/models", tags=["Models"])
+
+
+@router.get("")
+def get_loaded_models(
+        components: AppComponents = Depends(build_components)
+):
+    return {
+        model_name.name: components.model_repository.get_model_version(model_name)
+        for model_name in SavedModelName
+    }
+
+
+@router.post("/reload")
+def reload_models(
+        components: AppComponents = Depends(build_components)
+):
+    reloaded = components.model_repository.reload()
+    return {"reloaded": [model_name.name for model_name in reloaded]}
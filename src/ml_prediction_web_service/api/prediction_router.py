@@ -1,34 +1,174 @@
-from fastapi import APIRouter, Depends
+import json
+from typing import List
 
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+from ml_prediction_web_service.api.admission import admit_inference, iterate_admitted
+from ml_prediction_web_service.api.content_negotiation import (
+    ARROW_STREAM_MEDIA_TYPE,
+    JSON_MEDIA_TYPE,
+    MSGPACK_MEDIA_TYPE,
+    decode_arrow_stream,
+    decode_json,
+    decode_msgpack,
+    encoded_response,
+    request_media_type,
+    response_media_type
+)
 from ml_prediction_web_service.components import AppComponents
 from ml_prediction_web_service.configuration import build_components
-from ml_prediction_web_service.entities.entities import BandGapPredictionRequest, PCET80PredictionRequest
+from ml_prediction_web_service.entities.entities import (
+    BandGapBatchPredictionResponse,
+    BandGapPredictionRequest,
+    BandGapScreeningRequest,
+    JVPCEPredictionRequest,
+    MultiTargetPredictionRequest,
+    MultiTargetPredictionResponse,
+    PCET80PredictionRequest
+)
 
+from ml_prediction_web_service.entities.model_dictionary import SavedModelName
+from ml_prediction_web_service.services.metrics import observe_stage
+from ml_prediction_web_service.services.multi_target_service import (
+    predict_all_targets_batch_service,
+    predict_all_targets_service
+)
 from ml_prediction_web_service.services.prediction_service import (
-    predict_band_gap_service
+    band_gap_response_from_table,
+    band_gap_response_to_table,
+    predict_band_gap_batch_service,
+    predict_band_gap_table_service,
+    predict_jv_pce_service
 )
+from ml_prediction_web_service.services.screening_service import screen_band_gap_candidates
 
 router = APIRouter(prefix="/prediction", tags=["Prediction Models"])
 
 
 @router.post("/band_gap")
-def predict_band_gap(
+async def predict_band_gap(
         request: BandGapPredictionRequest,
         components: AppComponents = Depends(build_components)
 ):
-    return predict_band_gap_service(request, components)
+    with admit_inference(components), observe_stage(SavedModelName.BAND_GAP_XGB.name, "batch"):
+        band_gap = await components.band_gap_batcher.submit(request)
+    return float(band_gap)
+
+
+@router.get("/batching/stats")
+async def get_batching_stats(
+        components: AppComponents = Depends(build_components)
+):
+    return {
+        "band_gap": components.band_gap_batcher.stats(),
+        "stability_pce_t80": components.pce_t80_batcher.stats(),
+        "inference": components.inference_executor.stats(),
+    }
+
+
+@router.get("/cache/stats")
+async def get_prediction_cache_stats(
+        components: AppComponents = Depends(build_components)
+):
+    if components.prediction_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **components.prediction_cache.stats()}
+
+
+BATCH_CONTENT_TYPES = {
+    JSON_MEDIA_TYPE: {"schema": {"type": "array", "items": BandGapPredictionRequest.model_json_schema()}},
+    ARROW_STREAM_MEDIA_TYPE: {
+        "schema": {"type": "string", "format": "binary"},
+        "description": "Arrow IPC stream with the prepared input columns, a row per request",
+    },
+    MSGPACK_MEDIA_TYPE: {"schema": {"type": "string", "format": "binary"}},
+}
+
+
+@router.post(
+    "/band_gap/batch",
+    response_model=BandGapBatchPredictionResponse,
+    openapi_extra={"requestBody": {"required": True, "content": BATCH_CONTENT_TYPES}},
+    responses={200: {"content": {ARROW_STREAM_MEDIA_TYPE: {}, MSGPACK_MEDIA_TYPE: {}}}},
+)
+async def predict_band_gap_batch(
+        request: Request,
+        components: AppComponents = Depends(build_components)
+):
+    """
+    Takes a JSON or MessagePack list of band gap requests, or an Arrow IPC stream of prepared input
+    columns, and responds in the request's format unless Accept asks for another one.
+    """
+    media_type = request_media_type(request)
+    accept = response_media_type(request, default=media_type)
+    body = await request.body()
+
+    if media_type == ARROW_STREAM_MEDIA_TYPE:
+        table = decode_arrow_stream(body)
+        with admit_inference(components):
+            try:
+                results = await components.inference_executor.run(predict_band_gap_table_service, table, components)
+            except ValueError as e:
+                raise HTTPException(status_code=422, detail=str(e))
+        if accept == ARROW_STREAM_MEDIA_TYPE:
+            return encoded_response(results, accept)
+        return encoded_response(band_gap_response_from_table(results), accept)
+
+    items = decode_msgpack(body) if media_type == MSGPACK_MEDIA_TYPE else decode_json(body)
+    if not isinstance(items, list):
+        raise HTTPException(status_code=422, detail="Expected a list of band gap requests")
+    with admit_inference(components):
+        response = await components.inference_executor.run(predict_band_gap_batch_service, items, components)
+    if accept == ARROW_STREAM_MEDIA_TYPE:
+        return encoded_response(band_gap_response_to_table(response), accept)
+    return encoded_response(response, accept)
+
+
+@router.post("/screening/band_gap")
+async def screen_band_gap(
+        request: BandGapScreeningRequest,
+        components: AppComponents = Depends(build_components)
+):
+    events = (json.dumps(event) + "\n" for event in screen_band_gap_candidates(request, components))
+    return StreamingResponse(
+        iterate_admitted(components, events),
+        media_type="application/x-ndjson"
+    )
 
 
 @router.post("/stability_pce_t80")
-def predict_stability_pce_t80(
+async def predict_stability_pce_t80(
         request: PCET80PredictionRequest,
         components: AppComponents = Depends(build_components)
 ):
-    return predict_stability_pce_t80(request, components)
+    with admit_inference(components), observe_stage(SavedModelName.PCE_T80_XGB.name, "batch"):
+        pce_t80 = await components.pce_t80_batcher.submit(request)
+    return float(pce_t80)
 
 
 @router.post("/jv_default_pce")
-def predict_jv_default_pce(
+async def predict_jv_default_pce(
+        request: JVPCEPredictionRequest,
+        components: AppComponents = Depends(build_components)
+):
+    with admit_inference(components):
+        return await components.inference_executor.run(predict_jv_pce_service, request, components)
+
+
+@router.post("/all_targets", response_model=MultiTargetPredictionResponse)
+async def predict_all_targets(
+        request: MultiTargetPredictionRequest,
+        components: AppComponents = Depends(build_components)
+):
+    with admit_inference(components):
+        return await components.inference_executor.run(predict_all_targets_service, request, components)
+
+
+@router.post("/all_targets/batch", response_model=List[MultiTargetPredictionResponse])
+async def predict_all_targets_batch(
+        requests: List[MultiTargetPredictionRequest],
         components: AppComponents = Depends(build_components)
 ):
-    ...
+    with admit_inference(components):
+        return await components.inference_executor.run(predict_all_targets_batch_service, requests, components)
@@ -1,10 +1,46 @@
+import time
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from pathlib import Path
+from ml_prediction_web_service.api.data_router import router as data_router
+from ml_prediction_web_service.api.health_router import router as health_router
+from ml_prediction_web_service.api.metrics_router import router as metrics_router
+from ml_prediction_web_service.api.model_router import router as models_router
 from ml_prediction_web_service.api.prediction_router import router as predictions_router
+from ml_prediction_web_service.configuration import (
+    build_components,
+    get_models_refresh_interval,
+    get_server_timing_enabled
+)
+from ml_prediction_web_service.services.metrics import (
+    HTTP_REQUEST_SECONDS,
+    collect_server_timings,
+    format_server_timing
+)
+from ml_prediction_web_service.services.prediction_service import warm_up_models
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    components = build_components()
+    components.model_repository.load_models()
+    warm_up_models(components)
+    refresh_interval = get_models_refresh_interval()
+    if refresh_interval > 0:
+        components.model_repository.start_background_refresh(refresh_interval)
+    components.ready = True
+    yield
+    components.ready = False
+    components.model_repository.stop_background_refresh()
+    await components.band_gap_batcher.stop()
+    await components.pce_t80_batcher.stop()
+    components.inference_executor.shutdown()
 
-app = FastAPI(title="Perovskite ML Intelligence API")
+
+app = FastAPI(title="Perovskite ML Intelligence API", lifespan=lifespan)
 
 BASE_DIR = Path(__file__).resolve().parent
 
@@ -15,7 +51,31 @@ templates_path = BASE_DIR / "api" / "templates"
 templates = Jinja2Templates(directory=templates_path)
 
 app.include_router(predictions_router)
+app.include_router(models_router)
+app.include_router(data_router)
+app.include_router(health_router)
+app.include_router(metrics_router)
+
+SERVER_TIMING_ENABLED = get_server_timing_enabled()
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    started_at = time.perf_counter()
+    with collect_server_timings() as timings:
+        response = await call_next(request)
+    duration = time.perf_counter() - started_at
+
+    route = request.scope.get("route")
+    HTTP_REQUEST_SECONDS.observe(
+        duration, method=request.method, route=route.path if route is not None else "unmatched",
+        status=response.status_code
+    )
+    if SERVER_TIMING_ENABLED:
+        response.headers["Server-Timing"] = format_server_timing(timings, duration)
+    return response
+
 
 @app.get("/", include_in_schema=False)
 async def serve_home(request: Request):
-    return templates.TemplateResponse("index.html", {"request": request})
\ No newline at end of file
+    return templates.TemplateResponse("index.html", {"request": request})
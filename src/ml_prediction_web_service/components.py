@@ -1,6 +1,9 @@
 from dataclasses import dataclass
 
 from ml_prediction_web_service.repository.model_repository import ModelRepository
+from ml_prediction_web_service.services.batching import MicroBatcher
+from ml_prediction_web_service.services.inference_executor import InferenceExecutor
+from ml_prediction_web_service.services.prediction_cache import PredictionCache
 
 
 @dataclass
@@ -11,4 +14,14 @@ class Env:
 @dataclass
 class AppComponents:
     model_repository: ModelRepository
-    
+    band_gap_batcher: MicroBatcher | None = None
+    pce_t80_batcher: MicroBatcher | None = None
+    prediction_cache: PredictionCache | None = None
+    inference_executor: InferenceExecutor | None = None
+    # set once the models of this worker process are loaded and warmed up
+    ready: bool = False
+    # one of prediction_service.PREDICTION_ENGINES, the PREDICTION_ENGINE default unless set:
+    # "array" encodes requests straight into the booster's input matrix and predicts with XGBoost,
+    # "trees" evaluates that matrix on the booster's flattened NumPy trees (falls back to "array"),
+    # "dataframe" builds a DataFrame and runs the sklearn pipeline
+    prediction_engine: str = "array"
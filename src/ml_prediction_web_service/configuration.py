@@ -1,19 +1,139 @@
 import os
-from functools import lru_cache
+from functools import lru_cache, partial
 
 from ml_prediction_web_service.components import AppComponents
-from ml_prediction_web_service.repository.model_repository import LocalModelRepository
+from ml_prediction_web_service.repository.model_repository import (
+    MODELS_REFRESH_INTERVAL_SECONDS,
+    GoogleModelRepository,
+    LocalModelRepository,
+    ModelRepository
+)
+from ml_prediction_web_service.services.batching import MicroBatcher
+from ml_prediction_web_service.services.inference_executor import (
+    INFERENCE_MAX_IN_FLIGHT,
+    INFERENCE_RETRY_AFTER_SECONDS,
+    INFERENCE_WORKERS,
+    InferenceExecutor
+)
+from ml_prediction_web_service.services.prediction_cache import (
+    PREDICTION_CACHE_FRACTION_TOLERANCE,
+    PREDICTION_CACHE_SIZE,
+    PREDICTION_CACHE_TTL_SECONDS,
+    PredictionCache
+)
+from ml_prediction_web_service.services.prediction_service import (
+    PREDICTION_ENGINE_ARRAY,
+    PREDICTION_ENGINES,
+    predict_band_gap_batch,
+    predict_pce_t80_batch
+)
 
 MODELS_BASE_PATH = "/ml_models"
+MODEL_SOURCE_LOCAL = "local"
+MODEL_SOURCE_GOOGLE_DRIVE = "google_drive"
+MODEL_SOURCES = (MODEL_SOURCE_LOCAL, MODEL_SOURCE_GOOGLE_DRIVE)
+GOOGLE_DRIVE_MODELS_PATH = "perovskite/models"
+SERVER_WORKERS = 1
+PREDICTION_BATCH_MAX_SIZE = 64
+PREDICTION_BATCH_MAX_WAIT_MS = 5.
 
 
 @lru_cache
 def build_components() -> AppComponents:
-    path = get_model_path()
-    model_repository = LocalModelRepository(path)
-    return AppComponents(
+    model_repository = build_model_repository()
+    inference_executor = build_inference_executor()
+    model_repository.pin_model_threads(get_model_threads(inference_executor.workers))
+    components = AppComponents(
         model_repository=model_repository,
+        prediction_cache=build_prediction_cache(),
+        prediction_engine=get_prediction_engine(),
+        inference_executor=inference_executor,
     )
+    max_batch_size = int(os.environ.get("PREDICTION_BATCH_MAX_SIZE", PREDICTION_BATCH_MAX_SIZE))
+    max_wait_ms = float(os.environ.get("PREDICTION_BATCH_MAX_WAIT_MS", PREDICTION_BATCH_MAX_WAIT_MS))
+    components.band_gap_batcher = MicroBatcher(
+        partial(predict_band_gap_batch, components=components), max_batch_size, max_wait_ms,
+        executor=inference_executor.pool
+    )
+    components.pce_t80_batcher = MicroBatcher(
+        partial(predict_pce_t80_batch, components=components), max_batch_size, max_wait_ms,
+        executor=inference_executor.pool
+    )
+    return components
+
+
+def build_model_repository() -> ModelRepository:
+    """
+    Models of MODEL_SOURCE: "local" reads MODELS_PATH, "google_drive" pulls them from
+    GOOGLE_DRIVE_MODELS_PATH on Drive and keeps the downloaded artifacts in MODELS_PATH.
+    """
+    mmap_mode = os.environ.get("MODELS_MMAP_MODE") or None
+    source = os.environ.get("MODEL_SOURCE", MODEL_SOURCE_LOCAL)
+    if source == MODEL_SOURCE_LOCAL:
+        return LocalModelRepository(get_model_path(), mmap_mode=mmap_mode)
+    if source == MODEL_SOURCE_GOOGLE_DRIVE:
+        from ml_prediction_web_service.google_storage.credentials import google_credentials
+        from ml_prediction_web_service.google_storage.storage import GoogleDriveStorage
+
+        return GoogleModelRepository(
+            GoogleDriveStorage(google_credentials()),
+            cache_path=os.path.abspath(os.environ.get("MODELS_PATH", MODELS_BASE_PATH)),
+            remote_path=os.environ.get("GOOGLE_DRIVE_MODELS_PATH", GOOGLE_DRIVE_MODELS_PATH),
+            mmap_mode=mmap_mode,
+        )
+    raise ValueError(f"MODEL_SOURCE must be one of {MODEL_SOURCES}, got {source}")
+
+
+def get_models_refresh_interval() -> float:
+    """
+    Seconds between background checks for new model artifacts, 0 disables them.
+    """
+    return float(os.environ.get("MODELS_REFRESH_INTERVAL_SECONDS", MODELS_REFRESH_INTERVAL_SECONDS))
+
+
+def build_inference_executor() -> InferenceExecutor:
+    return InferenceExecutor(
+        workers=int(os.environ.get("INFERENCE_WORKERS", INFERENCE_WORKERS)),
+        max_in_flight=int(os.environ.get("INFERENCE_MAX_IN_FLIGHT", INFERENCE_MAX_IN_FLIGHT)),
+        retry_after_seconds=float(os.environ.get("INFERENCE_RETRY_AFTER_SECONDS", INFERENCE_RETRY_AFTER_SECONDS)),
+    )
+
+
+def get_model_threads(inference_workers: int) -> int:
+    """
+    XGBoost threads per prediction call, by default the cores are split evenly between
+    the inference workers of all server processes.
+    """
+    default = max(1, (os.cpu_count() or 1) // (inference_workers * get_server_workers()))
+    return int(os.environ.get("INFERENCE_MODEL_THREADS", default))
+
+
+def build_prediction_cache() -> PredictionCache | None:
+    max_size = int(os.environ.get("PREDICTION_CACHE_SIZE", PREDICTION_CACHE_SIZE))
+    if max_size <= 0:
+        return None
+    return PredictionCache(
+        max_size=max_size,
+        ttl_seconds=float(os.environ.get("PREDICTION_CACHE_TTL_SECONDS", PREDICTION_CACHE_TTL_SECONDS)),
+        fraction_tolerance=float(
+            os.environ.get("PREDICTION_CACHE_FRACTION_TOLERANCE", PREDICTION_CACHE_FRACTION_TOLERANCE)
+        ),
+    )
+
+
+def get_prediction_engine() -> str:
+    engine = os.environ.get("PREDICTION_ENGINE", PREDICTION_ENGINE_ARRAY)
+    if engine not in PREDICTION_ENGINES:
+        raise ValueError(f"PREDICTION_ENGINE must be one of {PREDICTION_ENGINES}, got {engine}")
+    return engine
+
+
+def get_server_timing_enabled() -> bool:
+    return os.environ.get("SERVER_TIMING_ENABLED", "false").lower() in ("1", "true", "yes")
+
+
+def get_server_workers() -> int:
+    return int(os.environ.get("SERVER_WORKERS", SERVER_WORKERS))
 
 
 def get_model_path() -> str:
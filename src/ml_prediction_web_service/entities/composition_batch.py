@@ -0,0 +1,171 @@
+from dataclasses import dataclass
+from typing import Dict, Iterable, List
+
+import numpy as np
+import pandas as pd
+
+from ml_prediction_web_service.entities.dictionary import Element, Site
+from ml_prediction_web_service.entities.entities import (
+    SITE_FRACTION_TOLERANCE,
+    SITE_FRACTION_TOTALS,
+    SITE_SLOTS,
+    ElementFraction,
+    PerovskiteComposition,
+    site_sum_error
+)
+
+# float32 keeps ~7 significant digits, rounding to 6 decimals restores fractions as they were sent
+FRACTION_DECIMALS = 6
+
+_NAME_BY_CODE = np.full(max(element.code for element in Element) + 1, None, dtype=object)
+for _element in Element:
+    _NAME_BY_CODE[_element.code] = _element.nm
+
+
+@dataclass(frozen=True)
+class CompositionBatch:
+    """
+    Compositions as struct-of-arrays: per site an (n, slots) int16 array of element codes,
+    0 for empty slots, and an (n, slots) float32 array of their fractions.
+
+    Filled slots come first in every row, in the order the elements were given.
+    """
+    codes: Dict[Site, np.ndarray]
+    fractions: Dict[Site, np.ndarray]
+
+    def __post_init__(self):
+        for site in Site:
+            if self.codes[site].shape != self.fractions[site].shape:
+                raise ValueError(f"Codes and fractions of {site.value} site differ in shape")
+
+    def __len__(self) -> int:
+        return len(self.codes[Site.A])
+
+    @classmethod
+    def from_arrays(cls, codes: Dict[Site, np.ndarray], fractions: Dict[Site, np.ndarray]) -> "CompositionBatch":
+        return cls(
+            codes={site: np.asarray(codes[site], dtype=np.int16) for site in Site},
+            fractions={site: np.asarray(fractions[site], dtype=np.float32) for site in Site},
+        )
+
+    @classmethod
+    def from_compositions(cls, compositions: Iterable[PerovskiteComposition]) -> "CompositionBatch":
+        compositions = list(compositions)
+        codes = {site: np.zeros((len(compositions), SITE_SLOTS[site]), dtype=np.int16) for site in Site}
+        fractions = {site: np.zeros((len(compositions), SITE_SLOTS[site]), dtype=np.float32) for site in Site}
+        for i, composition in enumerate(compositions):
+            for site in Site:
+                site_list = getattr(composition, f"{site.value}_site")[:SITE_SLOTS[site]]
+                for slot, element_fraction in enumerate(site_list):
+                    codes[site][i, slot] = element_fraction.name.code
+                    fractions[site][i, slot] = element_fraction.frequence
+        return cls(codes=codes, fractions=fractions)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "CompositionBatch":
+        """
+        Batch of prepared composition rows (`A_1`, `A_1_coef`, ... columns with element names).
+
+        Raises:
+            ValueError: If a name is not a known element.
+        """
+        codes, fractions = {}, {}
+        for site in Site:
+            slots = range(1, SITE_SLOTS[site] + 1)
+            codes[site] = np.column_stack([
+                Element.codes_from_names(df[f"{site.value}_{slot}"]) if f"{site.value}_{slot}" in df.columns
+                else np.zeros(len(df), dtype=np.int16)
+                for slot in slots
+            ])
+            fractions[site] = np.column_stack([
+                df[f"{site.value}_{slot}_coef"].fillna(0).to_numpy(dtype=np.float32)
+                if f"{site.value}_{slot}_coef" in df.columns else np.zeros(len(df), dtype=np.float32)
+                for slot in slots
+            ])
+        return cls.from_arrays(codes, fractions)
+
+    def site_fractions(self, site: Site) -> np.ndarray:
+        """
+        Fractions of `site` as float64, rounded back to the values the batch was built from.
+        """
+        return self.fractions[site].astype(np.float64).round(FRACTION_DECIMALS)
+
+    def to_compositions(self) -> List[PerovskiteComposition]:
+        compositions = []
+        for i in range(len(self)):
+            sites = {}
+            for site in Site:
+                site_fractions = self.site_fractions(site)[i]
+                sites[f"{site.value}_site"] = [
+                    ElementFraction(name=Element.get_member_by_code(int(code)), frequence=float(fraction))
+                    for code, fraction in zip(self.codes[site][i], site_fractions) if code != 0
+                ]
+            compositions.append(PerovskiteComposition.model_construct(**sites))
+        return compositions
+
+    def to_columns(self) -> Dict[str, np.ndarray]:
+        """
+        Prepared composition columns, element slots as int16 codes and fractions as float64.
+        """
+        columns = {}
+        for site in Site:
+            site_fractions = self.site_fractions(site)
+            for slot in range(SITE_SLOTS[site]):
+                columns[f"{site.value}_{slot + 1}"] = self.codes[site][:, slot]
+                columns[f"{site.value}_{slot + 1}_coef"] = site_fractions[:, slot]
+        return columns
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Prepared composition rows as `prepare_perovskites_composition_batch_input` builds them,
+        element names (None for empty slots) and fractions (0 for empty slots).
+        """
+        columns = {}
+        for site in Site:
+            site_fractions = self.site_fractions(site)
+            for slot in range(SITE_SLOTS[site]):
+                columns[f"{site.value}_{slot + 1}"] = _NAME_BY_CODE[self.codes[site][:, slot]]
+            for slot in range(SITE_SLOTS[site]):
+                columns[f"{site.value}_{slot + 1}_coef"] = site_fractions[:, slot]
+        return pd.DataFrame(columns)
+
+    def take(self, indices: np.ndarray) -> "CompositionBatch":
+        return CompositionBatch(
+            codes={site: self.codes[site][indices] for site in Site},
+            fractions={site: self.fractions[site][indices] for site in Site},
+        )
+
+    def site_sum_errors(self) -> Dict[int, str]:
+        """
+        Rows whose site fractions don't sum to the site totals (1/1/3), with the error
+        `PerovskiteComposition` reports for them.
+        """
+        return find_site_sum_errors({site: self.site_fractions(site).sum(axis=1) for site in Site})
+
+    def validate(self) -> "CompositionBatch":
+        """
+        Raises:
+            ValueError: If a row's site fractions don't sum to the site totals, naming the first offending row.
+        """
+        errors = self.site_sum_errors()
+        if errors:
+            index = min(errors)
+            raise ValueError(f"Composition {index}: {errors[index]}")
+        return self
+
+
+def find_site_sum_errors(site_totals: Dict[Site, np.ndarray]) -> Dict[int, str]:
+    """
+    Check the site sums of all rows at once, `site_totals` holds the per-row fraction total of every site.
+    The first failing site of a row is reported, like `PerovskiteComposition.check_fractions` does.
+    """
+    errors = {}
+    for site in Site:
+        totals = site_totals[site]
+        low = SITE_FRACTION_TOTALS[site] - SITE_FRACTION_TOLERANCE
+        high = SITE_FRACTION_TOTALS[site] + SITE_FRACTION_TOLERANCE
+        # written like the pydantic check, so NaN totals fail too
+        valid = (low <= totals) & (totals <= high)
+        for index in np.flatnonzero(~valid):
+            errors.setdefault(int(index), site_sum_error(site, float(totals[index])))
+    return errors
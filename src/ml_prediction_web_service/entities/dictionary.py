@@ -1,8 +1,26 @@
 import enum
+from types import MappingProxyType
+from typing import Dict, Iterable, Mapping
+
+import numpy as np
+
+
+class _IndexedEnumMeta(enum.EnumMeta):
+    """
+    Builds name -> member, code -> member and name -> code indexes once, when the enum class is created.
+    """
+
+    def __new__(metacls, cls_name, bases, classdict, **kwargs):
+        cls = super().__new__(metacls, cls_name, bases, classdict, **kwargs)
+        members = list(cls)
+        cls._member_by_name = MappingProxyType({member.nm: member for member in members})
+        cls._member_by_code = MappingProxyType({member.code: member for member in members})
+        cls._code_by_name = MappingProxyType({member.nm: member.code for member in members})
+        return cls
 
 
 @enum.unique
-class BaseStructureDictionary(enum.Enum):
+class BaseStructureDictionary(enum.Enum, metaclass=_IndexedEnumMeta):
     @property
     def nm(self):
         return self.value[0]
@@ -14,13 +32,47 @@ class BaseStructureDictionary(enum.Enum):
     @classmethod
     def get_code_by_name(cls, name):
         """
-        Get the code (value[1]) by nm name (value[0]).
+        Get the code by nm name (value[0]).
         Raises KeyError if name not found.
         """
-        for member in cls:
-            if member.value[0] == name:
-                return member.value[1]
-        raise KeyError(f"Name '{name}' not found")
+        try:
+            return cls._code_by_name[name]
+        except KeyError:
+            raise KeyError(f"Name '{name}' not found") from None
+
+    @classmethod
+    def get_member_by_name(cls, name):
+        """
+        Get the member by nm name (value[0]).
+        Raises KeyError if name not found.
+        """
+        try:
+            return cls._member_by_name[name]
+        except KeyError:
+            raise KeyError(f"Name '{name}' not found") from None
+
+    @classmethod
+    def get_member_by_code(cls, code):
+        """
+        Get the member by its code.
+        Raises KeyError if code not found.
+        """
+        try:
+            return cls._member_by_code[code]
+        except KeyError:
+            raise KeyError(f"Code '{code}' not found") from None
+
+    @classmethod
+    def _missing_(cls, value):
+        # lets members be built from their name, e.g. Element("Pb") or "Pb" in a JSON payload
+        if isinstance(value, str):
+            return cls._member_by_name.get(value)
+        return None
+
+    @classmethod
+    def code_by_name(cls) -> Mapping[str, int]:
+        """Read-only name -> code index, e.g. for `pd.Series.map`."""
+        return cls._code_by_name
 
 
 class Element(BaseStructureDictionary):
@@ -79,10 +131,44 @@ class Element(BaseStructureDictionary):
         Raises:
             ValueError: If no element with the given name is found.
         """
-        for element in cls:
-            if element.nm == name:
-                return element
-        raise ValueError(f"No element found with name '{name}'")
+        element = cls._member_by_name.get(name)
+        if element is None:
+            raise ValueError(f"No element found with name '{name}'")
+        return element
+
+    @classmethod
+    def property_table(cls, property_name: str) -> np.ndarray:
+        """
+        Returns a float array of `property_name` values indexed by element code,
+        so whole code columns can be gathered at once with `table[codes]`.
+        Code 0 (no element) maps to NaN.
+
+        Args:
+            property_name (str): One of ELEMENT_TABLE_PROPERTIES.
+        """
+        try:
+            return _ELEMENT_PROPERTY_TABLES[property_name]
+        except KeyError:
+            raise KeyError(f"No property table for '{property_name}'") from None
+
+    @classmethod
+    def codes_from_names(cls, names: Iterable) -> np.ndarray:
+        """
+        Maps element names to codes. Missing names (None/NaN) map to 0.
+
+        Raises:
+            ValueError: If a name is not a known element.
+        """
+        codes = []
+        for name in names:
+            if name is None or name != name:
+                codes.append(0)
+                continue
+            code = cls._code_by_name.get(name)
+            if code is None:
+                raise ValueError(f"No element found with name '{name}'")
+            codes.append(code)
+        return np.array(codes, dtype=np.int16)
 
     # A-Site Ions
     MA = ("MA", 2.17, 2.5, 1, 32.06, False, 1)
@@ -139,6 +225,24 @@ class Element(BaseStructureDictionary):
     I = ("I", 2.20, 2.66, -1, 126.90, False, 48)
 
 
+ELEMENT_TABLE_PROPERTIES = ("ionic_radii", "electronegativity", "charge", "atomic_mass", "hydrophobicity")
+
+
+def _build_element_property_tables() -> Dict[str, np.ndarray]:
+    size = max(element.code for element in Element) + 1
+    tables = {}
+    for property_name in ELEMENT_TABLE_PROPERTIES:
+        table = np.full(size, np.nan, dtype=np.float64)
+        for element in Element:
+            table[element.code] = float(getattr(element, property_name))
+        table.flags.writeable = False
+        tables[property_name] = table
+    return tables
+
+
+_ELEMENT_PROPERTY_TABLES = _build_element_property_tables()
+
+
 @enum.unique
 class Layer(enum.Enum):
     """
@@ -1,5 +1,6 @@
-from typing import List
-from pydantic import BaseModel, field_validator
+import math
+from typing import Dict, List
+from pydantic import BaseModel, Field, model_validator
 
 from ml_prediction_web_service.entities.dictionary import (
     Element,
@@ -7,9 +8,23 @@ from ml_prediction_web_service.entities.dictionary import (
     BackContact,
     ETLStack,
     CellArchitecture,
-    Dimension
+    Dimension,
+    Site
 )
 
+SITE_FRACTION_TOTALS = {Site.A: 1.0, Site.B: 1.0, Site.C: 3.0}
+# element slots per site in the prepared model inputs, extra elements of a site are ignored
+SITE_SLOTS = {Site.A: 3, Site.B: 2, Site.C: 3}
+SITE_FRACTION_TOLERANCE = 0.01
+# bounds of the composition space one screening request may enumerate
+SCREENING_MIN_FRACTION_STEP = 0.01
+SCREENING_MAX_SITE_CANDIDATES = 100_000
+SCREENING_MAX_CANDIDATES = 10_000_000
+
+
+def site_sum_error(site: Site, total: float) -> str:
+    return f'Fractions of {site.value} site must sum to {SITE_FRACTION_TOTALS[site]}, got {total}'
+
 
 class ElementFraction(BaseModel):
     name: Element
@@ -21,20 +36,13 @@ class PerovskiteComposition(BaseModel):
     B_site: List[ElementFraction]
     C_site: List[ElementFraction]
 
-    @field_validator('A_site', 'B_site', 'C_site')
-    def check_fractions(cls, v):
-        total_A = sum(item.frequence for item in cls.A_site)
-        if not (0.99 <= total_A <= 1.01):
-            raise ValueError(f'Fractions of A site must sum to 1.0, got {total_A}')
-
-        total_B = sum(item.frequence for item in cls.B_site)
-        if not (0.99 <= total_B <= 1.01):
-            raise ValueError(f'Fractions of B site must sum to 1.0, got {total_B}')
-
-        total_C = sum(item.frequence for item in cls.C_site)
-        if not (2.99 <= total_C <= 3.01):
-            raise ValueError(f'Fractions of C site must sum to 3.0, got {total_C}')
-        return v
+    @model_validator(mode="after")
+    def check_fractions(self):
+        for site, expected_total in SITE_FRACTION_TOTALS.items():
+            total = sum(item.frequence for item in getattr(self, f"{site.value}_site"))
+            if not (expected_total - SITE_FRACTION_TOLERANCE <= total <= expected_total + SITE_FRACTION_TOLERANCE):
+                raise ValueError(site_sum_error(site, total))
+        return self
 
 
 class BandGapPredictionRequest(BaseModel):
@@ -50,11 +58,11 @@ class StabilityTemperatureRange(BaseModel):
     temperature_end: float
 
 
-class PCET80PredictionRequest(BaseModel):
-    perovskite_composition: PerovskiteComposition
+class StabilityConditions(BaseModel):
+    """
+    Device and stability test inputs of the PCE T80 model, besides the composition and band gap.
+    """
     temperature_range: StabilityTemperatureRange
-    band_gap: float
-    dimension_list_of_layers: int
     cell_area: float
     pce_initial: float
     stability_protocol: str
@@ -63,4 +71,120 @@ class PCET80PredictionRequest(BaseModel):
     backcontact: BackContact
     etl_stack_sequence: ETLStack
     cell_architecture: CellArchitecture
+    encapsulation: bool = False
+
+
+class PCET80PredictionRequest(StabilityConditions):
+    perovskite_composition: PerovskiteComposition
+    band_gap: float
+    dimension_list_of_layers: int
+
+
+class DeviceConditions(BaseModel):
+    """
+    Fabrication inputs of the JV PCE model, besides the composition and band gap. Unknown values may be left out.
+    """
+    cell_architecture: CellArchitecture
+    perovskite_thickness: float | None = None
+    etl_thickness: float | None = None
+    htl_thickness: float | None = None
+    annealing_temperature: float | None = None
+    deposition_solvents: str | None = None
+    jv_hysteresis_index: float | None = None
+
+
+class JVPCEPredictionRequest(DeviceConditions):
+    perovskite_composition: PerovskiteComposition
+    band_gap: float
+    inorganic_composition: bool
+    dimension_list_of_layers: float
+    dimension: Dimension
+
+
+class MultiTargetPredictionRequest(BandGapPredictionRequest):
+    """
+    Band gap inputs, plus the inputs of the models chained on the predicted band gap.
+    Targets whose inputs are left out are not predicted.
+    """
+    stability: StabilityConditions | None = None
+    device: DeviceConditions | None = None
+
+
+class MultiTargetPredictionResponse(BaseModel):
+    band_gap: float
+    pce_t80: float | None = None
+    jv_pce: float | None = None
+    # target -> why a requested target was not predicted
+    errors: Dict[str, str] = Field(default_factory=dict)
+
+
+class BandGapBatchItemResult(BaseModel):
+    index: int
+    band_gap: float | None = None
+    error: str | None = None
+
+
+class BandGapBatchPredictionResponse(BaseModel):
+    results: List[BandGapBatchItemResult]
+
+
+def count_site_compositions(n_elements: int, max_components: int, fraction_step: float) -> int:
+    """
+    Number of site compositions `screening_service.enumerate_site_compositions` builds from
+    `n_elements` distinct elements: per combination of k elements, every split of the
+    fraction grid into k positive parts.
+    """
+    n_steps = round(1 / fraction_step)
+    return sum(
+        math.comb(n_elements, k) * math.comb(n_steps - 1, k - 1)
+        for k in range(1, min(max_components, n_elements, n_steps) + 1)
+    )
+
+
+class BandGapScreeningRequest(BaseModel):
+    A_elements: List[Element] = Field(min_length=1)
+    B_elements: List[Element] = Field(min_length=1)
+    C_elements: List[Element] = Field(min_length=1)
+    max_A_components: int = Field(default=2, ge=1, le=3)
+    max_B_components: int = Field(default=1, ge=1, le=2)
+    max_C_components: int = Field(default=2, ge=1, le=3)
+    fraction_step: float = Field(default=0.25, ge=SCREENING_MIN_FRACTION_STEP, le=1)
+    tolerance_factor_min: float | None = None
+    tolerance_factor_max: float | None = None
+    octahedral_factor_min: float | None = None
+    octahedral_factor_max: float | None = None
+    band_gap_min: float
+    band_gap_max: float
+    top_k: int = Field(default=50, ge=1, le=10_000)
+    chunk_size: int = Field(default=50_000, ge=1, le=1_000_000)
+    inorganic_composition: bool
+    dimension_list_of_layers: float
+    dimension: Dimension
+    space_group: SpaceGroup
 
+    @model_validator(mode="after")
+    def check_ranges(self):
+        steps = 1 / self.fraction_step
+        if abs(steps - round(steps)) > 1e-9:
+            raise ValueError(f'fraction_step must divide 1.0, got {self.fraction_step}')
+        if self.band_gap_min > self.band_gap_max:
+            raise ValueError('band_gap_min must not be greater than band_gap_max')
+        total = 1
+        for site, elements, max_components in (
+                (Site.A, self.A_elements, self.max_A_components),
+                (Site.B, self.B_elements, self.max_B_components),
+                (Site.C, self.C_elements, self.max_C_components),
+        ):
+            count = count_site_compositions(len(set(elements)), max_components, self.fraction_step)
+            if count > SCREENING_MAX_SITE_CANDIDATES:
+                raise ValueError(
+                    f'{site.value} site has {count} compositions, at most {SCREENING_MAX_SITE_CANDIDATES} '
+                    f'are screened, use fewer elements or components or a larger fraction_step'
+                )
+            total *= count
+        if total > SCREENING_MAX_CANDIDATES:
+            raise ValueError(
+                f'{total} candidate compositions, at most {SCREENING_MAX_CANDIDATES} are screened, '
+                f'use fewer elements or components or a larger fraction_step'
+            )
+        return self
@@ -5,3 +5,4 @@ import enum
 class SavedModelName(enum.Enum):
     BAND_GAP_XGB = "xgboost_band_gap.joblib"
     PCE_T80_XGB = "pce_t80_model.joblib"
+    JV_PCE_XGB = "pce_jv_model.joblib"
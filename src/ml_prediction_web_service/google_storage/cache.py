@@ -0,0 +1,166 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator
+
+try:
+    import fcntl
+except ImportError:  # not on Windows, where downloads are only locked within the process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+PART_SUFFIX = ".part"
+LOCK_SUFFIX = ".lock"
+
+
+class FileIdIndex:
+    """
+    Persistent path -> Drive file ID map, so a path is resolved with `files().list` only once.
+    """
+
+    def __init__(self, index_path: Path):
+        self._index_path = index_path
+        self._lock = threading.Lock()
+        self._ids: Dict[str, str] = {}
+        if index_path.exists():
+            try:
+                self._ids = json.loads(index_path.read_text())
+            except (OSError, ValueError):
+                self._ids = {}
+
+    def get(self, filepath: str) -> str | None:
+        return self._ids.get(filepath)
+
+    def put(self, filepath: str, file_id: str):
+        with self._lock:
+            self._ids = {**self._ids, filepath: file_id}
+            self._save()
+
+    def discard(self, filepath: str):
+        with self._lock:
+            if filepath in self._ids:
+                self._ids = {key: value for key, value in self._ids.items() if key != filepath}
+                self._save()
+
+    def _save(self):
+        tmp_path = self._index_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(self._ids))
+        os.replace(tmp_path, self._index_path)
+
+
+def content_key(metadata: Dict[str, str]) -> str:
+    """
+    Cache key of a Drive file revision: its md5Checksum, or for files Drive has no checksum for
+    (Google-native documents) a hash of file ID and modifiedTime.
+    """
+    md5 = metadata.get("md5Checksum")
+    if md5:
+        return md5
+    revision = f"{metadata['id']}:{metadata.get('modifiedTime', '')}"
+    return "rev-" + hashlib.sha256(revision.encode()).hexdigest()[:32]
+
+
+class BlobCache:
+    """
+    Content-addressed files on local disk. Blobs are written to `<key>.part` first and
+    renamed into place once complete, so a present blob is always whole and an interrupted
+    download can resume from the size of its `.part` file.
+
+    Server worker processes may share the directory: a download holds an exclusive lock on
+    `<key>.lock` (the empty lock files are kept). With `max_bytes` the least recently used
+    blobs are removed once a new blob takes the cache past that size.
+    """
+
+    def __init__(self, blobs_path: Path, max_bytes: int | None = None):
+        self._blobs_path = blobs_path
+        self._blobs_path.mkdir(parents=True, exist_ok=True)
+        self._max_bytes = max_bytes
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def path(self, key: str) -> Path:
+        return self._blobs_path / key
+
+    def part_path(self, key: str) -> Path:
+        return self._blobs_path / f"{key}{PART_SUFFIX}"
+
+    def get(self, key: str) -> Path | None:
+        path = self.path(key)
+        try:
+            # the modification time orders blobs by last use for eviction
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    @contextmanager
+    def key_lock(self, key: str) -> Iterator[None]:
+        """
+        Held while `key` is downloaded, so concurrent requests for one file download it once,
+        from threads of this process and from other processes sharing the cache.
+        """
+        with self._lock:
+            thread_lock = self._key_locks.setdefault(key, threading.Lock())
+        with thread_lock, open(self._blobs_path / f"{key}{LOCK_SUFFIX}", "ab") as lock_file:
+            if fcntl is not None:
+                # released when the file is closed
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            yield
+
+    def commit(self, key: str, md5: str | None = None) -> Path:
+        """
+        Move the completed `.part` file of `key` into place, then evict blobs past `max_bytes`.
+
+        Raises:
+            IOError: If `md5` is given and the downloaded content doesn't match it. The part file is removed.
+        """
+        part_path = self.part_path(key)
+        if md5 is not None:
+            digest = hashlib.md5()
+            with open(part_path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+            if digest.hexdigest() != md5:
+                part_path.unlink()
+                raise IOError(f"Checksum mismatch for {key}, got {digest.hexdigest()}")
+        path = self.path(key)
+        os.replace(part_path, path)
+        self.evict(keep=key)
+        return path
+
+    def evict(self, keep: str | None = None) -> int:
+        """
+        Remove least recently used blobs, other than `keep`, until the cache fits in `max_bytes`.
+        Files already opened or hard-linked elsewhere stay readable there.
+
+        Returns:
+            int: Number of removed blobs.
+        """
+        if self._max_bytes is None:
+            return 0
+        blobs = []
+        for entry in os.scandir(self._blobs_path):
+            if entry.name.endswith((PART_SUFFIX, LOCK_SUFFIX)) or not entry.is_file():
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            blobs.append((stat.st_mtime_ns, entry.name, stat.st_size))
+        total = sum(size for _, _, size in blobs)
+        removed = 0
+        for _, name, size in sorted(blobs):
+            if total <= self._max_bytes:
+                break
+            if name == keep:
+                continue
+            Path(self._blobs_path / name).unlink(missing_ok=True)
+            logger.info("Evicted cached blob %s (%d bytes)", name, size)
+            total -= size
+            removed += 1
+        return removed
@@ -1,10 +1,42 @@
-import io
 import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List
+
 import pandas as pd
+import pyarrow as pa
 from abc import abstractmethod, ABC
 from google.oauth2.service_account import Credentials
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseDownload, MediaFileUpload, MediaIoBaseUpload
+from googleapiclient.errors import HttpError
+from googleapiclient.http import MediaFileUpload
+
+from ml_prediction_web_service.google_storage.cache import BlobCache, FileIdIndex, content_key
+from ml_prediction_web_service.google_storage.tables import (
+    TABLE_CHUNK_SIZE,
+    ParquetFilters,
+    iter_parquet_batches,
+    iter_table_chunks,
+    write_csv_chunks,
+    write_parquet_chunks
+)
+
+DRIVE_CACHE_DIR = os.path.join(tempfile.gettempdir(), "perovskite_drive_cache")
+DRIVE_DOWNLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+DRIVE_DOWNLOAD_WORKERS = 4
+DRIVE_UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+DRIVE_CACHE_MAX_BYTES = 10 * 1024 ** 3
+DRIVE_METADATA_FIELDS = "id, name, size, md5Checksum, modifiedTime"
+MIME_TYPES = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'xls': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'parquet': 'application/octet-stream',
+    'pkl': 'application/octet-stream',
+}
 
 
 class FileStorage(ABC):
@@ -21,35 +53,251 @@ class FileStorage(ABC):
         pass
 
     @abstractmethod
-    def download_dataframe(self, filepath: str) -> pd.DataFrame:
+    def download_file_to_path(self, filepath: str) -> Path:
+        """Local path with the content of `filepath`, must not be modified by the caller."""
         pass
 
     @abstractmethod
-    def upload_dataframe(self, dataframe: pd.DataFrame, filepath: str, file_format: str) -> pd.DataFrame:
+    def upload_file_from_path(self, local_path: Path, filepath: str, mime_type: str) -> str:
+        """Store the local file `local_path` as `filepath`, returns its ID in the storage."""
         pass
 
+    def download_dataframe(self, filepath: str) -> pd.DataFrame:
+        file_format = _get_file_format(filepath)
+        local_path = self.download_file_to_path(filepath)
+
+        if file_format == 'csv':
+            df = pd.read_csv(local_path, low_memory=False)
+        elif file_format in ['xlsx', 'xls']:
+            df = pd.read_excel(local_path)
+        elif file_format == 'parquet':
+            df = pd.read_parquet(local_path)
+        else:
+            df = pd.read_pickle(local_path)
+        return df
+
+    def upload_dataframe(self, dataframe: pd.DataFrame, filepath: str, file_format: str) -> str:
+        if file_format.lower() in ['xlsx', 'xls']:
+            return self._upload_staged(
+                filepath, file_format, lambda path: dataframe.to_excel(path, index=False, engine='openpyxl')
+            )
+        return self.upload_dataframe_chunks([dataframe], filepath, file_format)
+
+    def iter_dataframe_chunks(
+            self, filepath: str, chunk_size: int = TABLE_CHUNK_SIZE,
+            columns: List[str] | None = None, filters: ParquetFilters | None = None
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Read a CSV or Parquet file in chunks of at most `chunk_size` rows.
+        Parquet files are read with column projection and row group predicate pushdown (`filters`).
+        """
+        local_path = self.download_file_to_path(filepath)
+        yield from iter_table_chunks(local_path, _get_table_format(filepath), chunk_size, columns, filters)
+
+    def iter_record_batches(
+            self, filepath: str, batch_size: int = TABLE_CHUNK_SIZE,
+            columns: List[str] | None = None, filters: ParquetFilters | None = None
+    ) -> Iterator[pa.RecordBatch]:
+        """
+        Arrow record batches of a CSV or Parquet file, see `iter_dataframe_chunks`.
+        """
+        if _get_table_format(filepath) == 'parquet':
+            yield from iter_parquet_batches(self.download_file_to_path(filepath), batch_size, columns, filters)
+            return
+        for chunk in self.iter_dataframe_chunks(filepath, batch_size, columns, filters):
+            yield pa.RecordBatch.from_pandas(chunk, preserve_index=False)
+
+    def upload_dataframe_chunks(
+            self, chunks: Iterable[pd.DataFrame], filepath: str, file_format: str | None = None
+    ) -> str:
+        """
+        Write chunks as Parquet row groups or CSV parts to a staging file on disk and store it as `filepath`,
+        only one chunk is in memory at a time.
+        """
+        file_format = _get_table_format(filepath, file_format)
+        write = write_parquet_chunks if file_format == 'parquet' else write_csv_chunks
+        return self._upload_staged(filepath, file_format, lambda path: write(chunks, path))
+
+    def _upload_staged(self, filepath: str, file_format: str, write: Callable[[Path], Any]) -> str:
+        fd, staging_path = tempfile.mkstemp(suffix=f".{file_format}", dir=self._staging_dir(filepath))
+        os.close(fd)
+        staging_path = Path(staging_path)
+        try:
+            write(staging_path)
+            return self.upload_file_from_path(staging_path, filepath, MIME_TYPES[file_format.lower()])
+        finally:
+            staging_path.unlink(missing_ok=True)
+
+    def _staging_dir(self, filepath: str) -> Path | None:
+        """Directory for files staged before upload, the system temp directory by default."""
+        return None
+
+
+def _get_file_format(filepath: str) -> str:
+    file_format = os.path.splitext(filepath)[1].lstrip('.').lower()
+    if file_format not in ('csv', 'xlsx', 'xls', 'parquet', 'pkl'):
+        raise ValueError(
+            "Unsupported file format. Use 'csv', 'xlsx', 'parquet' or 'pkl.")
+    return file_format
+
+
+def _get_table_format(filepath: str, file_format: str | None = None) -> str:
+    file_format = (file_format or os.path.splitext(filepath)[1].lstrip('.')).lower()
+    if file_format not in ('csv', 'parquet'):
+        raise ValueError("Unsupported file format. Use 'csv' or 'parquet'.")
+    return file_format
+
+
+class LocalFileStorage(FileStorage):
+    """
+    Files under `root_path` on the local filesystem, `filepath` is relative to it.
+    """
+
+    def __init__(self, root_path: str | Path):
+        self._root_path = Path(root_path)
+        self._root_path.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, filepath: str) -> Path:
+        return self._root_path / filepath
+
+    def download_file(self, filepath: str) -> bytes:
+        return self.download_file_to_path(filepath).read_bytes()
+
+    def download_file_to_path(self, filepath: str) -> Path:
+        path = self._path(filepath)
+        if not path.is_file():
+            raise FileNotFoundError(f"File '{filepath}' not found in {self._root_path}.")
+        return path
+
+    def upload_file(self, filepath: str) -> bytes:
+        target = self._path(os.path.basename(filepath))
+        shutil.copyfile(filepath, target)
+        return str(target).encode()
+
+    def upload_file_from_path(self, local_path: Path, filepath: str, mime_type: str) -> str:
+        target = self._path(filepath)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # staged next to the target, readers never see a partially written file
+        shutil.move(local_path, target)
+        return str(target)
+
+    def verify_existence(self, filepath: str) -> bool:
+        return self._path(filepath).is_file()
+
+    def _staging_dir(self, filepath: str) -> Path:
+        staging_dir = self._path(filepath).parent
+        staging_dir.mkdir(parents=True, exist_ok=True)
+        return staging_dir
+
 
 class GoogleDriveStorage(FileStorage):
+    """
+    Google Drive files behind a local disk cache.
+
+    Downloads stream to disk in ranged chunks and resume after interruptions. Cached files are
+    keyed by content (md5Checksum), so a file is only fetched again when it changed on Drive.
+    The least recently used cached files are evicted past `cache_max_bytes`
+    (GOOGLE_DRIVE_CACHE_MAX_BYTES, 0 for no limit).
+    Resolved path -> file ID lookups are persisted next to the cache.
+    """
+
     def __init__(
-        self, credentials: Credentials
+        self, credentials: Credentials | None,
+        cache_dir: str | None = None,
+        chunk_size: int = DRIVE_DOWNLOAD_CHUNK_SIZE,
+        service_factory: Callable[[], Any] | None = None,
+        cache_max_bytes: int | None = None,
     ):
         self._credentials = credentials
-        self._service = build('drive', 'v3', credentials=self._credentials)
+        # Drive service objects are not thread-safe, concurrent downloads get one per thread
+        self._service_factory = service_factory or (lambda: build('drive', 'v3', credentials=self._credentials))
+        self._thread_services = threading.local()
+        self._service = self._service_factory()
+        self._chunk_size = chunk_size
+        cache_path = Path(cache_dir or os.environ.get("GOOGLE_DRIVE_CACHE_DIR", DRIVE_CACHE_DIR))
+        if cache_max_bytes is None:
+            cache_max_bytes = int(os.environ.get("GOOGLE_DRIVE_CACHE_MAX_BYTES", DRIVE_CACHE_MAX_BYTES))
+        # 0 disables eviction
+        self._blobs = BlobCache(cache_path / "blobs", max_bytes=cache_max_bytes or None)
+        self._file_ids = FileIdIndex(cache_path / "file_ids.json")
 
     def download_file(self, filepath: str) -> bytes:
+        return self.download_file_to_path(filepath).read_bytes()
+
+    def download_file_to_path(self, filepath: str) -> Path:
+        """
+        Local path of the current content of `filepath`, downloaded only if not cached yet.
+
+        Raises:
+            FileNotFoundError: If the file doesn't exist on Google Drive.
+        """
+        metadata = self.get_metadata(filepath)
+        key = content_key(metadata)
+        cached = self._blobs.get(key)
+        if cached is not None:
+            return cached
+        with self._blobs.key_lock(key):
+            cached = self._blobs.get(key)
+            if cached is not None:
+                return cached
+            # Google-native documents have no size, they are read until a short chunk
+            size = int(metadata["size"]) if metadata.get("size") is not None else None
+            self._download_ranges(metadata["id"], key, size)
+            return self._blobs.commit(key, metadata.get("md5Checksum"))
+
+    def download_files(self, filepaths: List[str], max_workers: int = DRIVE_DOWNLOAD_WORKERS) -> Dict[str, Path]:
+        """
+        Download several files concurrently, returns their local paths.
+        """
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="drive-download") as pool:
+            return dict(zip(filepaths, pool.map(self.download_file_to_path, filepaths)))
+
+    def get_metadata(self, filepath: str) -> Dict[str, str]:
+        """
+        Drive metadata (id, name, size, md5Checksum, modifiedTime) of `filepath`.
+        A stale indexed file ID is resolved again.
+
+        Raises:
+            FileNotFoundError: If the file doesn't exist on Google Drive.
+        """
         file_id = self._get_file_id_by_path(filepath)
-        if not file_id:
-            raise FileNotFoundError(
-                f"File '{filepath}' not found on Google Drive.")
-
-        request = self._service.files().get_media(fileId=file_id)
-        fh = io.BytesIO()
-        downloader = MediaIoBaseDownload(fh, request)
-        done = False
-        while not done:
-            status, done = downloader.next_chunk()
-        fh.seek(0)
-        return fh.read()
+        if file_id is not None:
+            try:
+                return self._thread_service().files().get(fileId=file_id, fields=DRIVE_METADATA_FIELDS).execute()
+            except HttpError as e:
+                if e.resp.status != 404:
+                    raise
+            self._file_ids.discard(filepath)
+            file_id = self._get_file_id_by_path(filepath)
+            if file_id is not None:
+                return self._thread_service().files().get(fileId=file_id, fields=DRIVE_METADATA_FIELDS).execute()
+        raise FileNotFoundError(f"File '{filepath}' not found on Google Drive.")
+
+    def _download_ranges(self, file_id: str, key: str, size: int | None):
+        """
+        Append the missing byte ranges of `file_id` to the `.part` file of `key`, resuming after what is there.
+        """
+        part_path = self._blobs.part_path(key)
+        offset = part_path.stat().st_size if part_path.exists() else 0
+        with open(part_path, "ab") as f:
+            while size is None or offset < size:
+                end = offset + self._chunk_size - 1 if size is None else min(offset + self._chunk_size, size) - 1
+                request = self._thread_service().files().get_media(fileId=file_id)
+                request.headers["Range"] = f"bytes={offset}-{end}"
+                chunk = request.execute()
+                f.write(chunk)
+                f.flush()
+                offset += len(chunk)
+                if not chunk or (size is None and len(chunk) < self._chunk_size):
+                    break
+
+    def _thread_service(self) -> Any:
+        if threading.current_thread() is threading.main_thread():
+            return self._service
+        service = getattr(self._thread_services, "service", None)
+        if service is None:
+            service = self._thread_services.service = self._service_factory()
+        return service
 
     def upload_file(self, filepath: str) -> bytes:
         filename = os.path.basename(filepath)
@@ -67,50 +315,10 @@ class GoogleDriveStorage(FileStorage):
         file_id = self._get_file_id_by_path(filepath)
         return file_id is not None
 
-    def download_dataframe(self, filepath: str) -> pd.DataFrame:
-        file_bytes = self.download_file(filepath)
-        ext = os.path.splitext(filepath)[1].lstrip('.').lower()
-        file_format = ext
-
-        if file_format == 'csv':
-            df = pd.read_csv(io.BytesIO(file_bytes), low_memory=False)
-        elif file_format in ['xlsx', 'xls']:
-            df = pd.read_excel(io.BytesIO(file_bytes))
-        elif file_format == 'parquet':
-            df = pd.read_parquet(io.BytesIO(file_bytes))
-        elif file_format == 'pkl':
-            df = pd.read_pickle(io.BytesIO(file_bytes))
-        else:
-            raise ValueError(
-                "Unsupported file format. Use 'csv', 'xlsx', 'parquet' or 'pkl.")
-        return df
-
-    # noinspection PyTypeChecker
-    def upload_dataframe(self, dataframe: pd.DataFrame, filepath: str, file_format: str) -> str:
-        filename = os.path.basename(filepath)
-        if file_format.lower() == 'csv':
-            buffer = io.StringIO()
-            dataframe.to_csv(buffer, index=False)
-            content = buffer.getvalue().encode('utf-8')
-            mime_type = 'text/csv'
-        elif file_format.lower() in ['xlsx', 'xls']:
-            buffer = io.BytesIO()
-            dataframe.to_excel(buffer, index=False, engine='openpyxl')
-            content = buffer.getvalue()
-            mime_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        elif file_format.lower() == 'parquet':
-            buffer = io.BytesIO()
-            dataframe.to_parquet(buffer, index=False)
-            content = buffer.getvalue()
-            mime_type = 'application/octet-stream'
-        else:
-            raise ValueError(
-                "Unsupported file format. Use 'csv', 'xlsx', or 'parquet'.")
-
-        file_metadata = {'name': filename}
-        file_buffer = io.BytesIO(content)
-        media = MediaIoBaseUpload(
-            file_buffer, mimetype=mime_type, resumable=True)
+    def upload_file_from_path(self, local_path: Path, filepath: str, mime_type: str) -> str:
+        file_metadata = {'name': os.path.basename(filepath)}
+        # resumable upload streamed from disk in chunks
+        media = MediaFileUpload(str(local_path), mimetype=mime_type, chunksize=DRIVE_UPLOAD_CHUNK_SIZE, resumable=True)
         file = self._service.files().create(
             body=file_metadata,
             media_body=media,
@@ -119,8 +327,11 @@ class GoogleDriveStorage(FileStorage):
         return file.get('id')
 
     def _get_file_id_by_path(self, filepath: str) -> str | None:
+        file_id = self._file_ids.get(filepath)
+        if file_id is not None:
+            return file_id
         filename = os.path.basename(filepath)
-        file_id = self._service.files().list(
+        file_id = self._thread_service().files().list(
             q=f'name="{filename}"',
             spaces='drive',
             fields='files(id, name)',
@@ -128,4 +339,6 @@ class GoogleDriveStorage(FileStorage):
         files = file_id.get('files', [])
         if len(files) == 0:
             return None
-        return files[0].get('id')
+        file_id = files[0].get('id')
+        self._file_ids.put(filepath, file_id)
+        return file_id
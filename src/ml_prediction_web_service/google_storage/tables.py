@@ -0,0 +1,91 @@
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator, List
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+TABLE_CHUNK_SIZE = 10_000
+
+# DNF filters as accepted by pyarrow.parquet, [("col", ">", 1), ...] or [[...], [...]], or a dataset expression
+ParquetFilters = list | ds.Expression
+
+
+def iter_table_chunks(
+        file: BinaryIO | str | Path, file_format: str, chunk_size: int = TABLE_CHUNK_SIZE,
+        columns: List[str] | None = None, filters: ParquetFilters | None = None
+) -> Iterator[pd.DataFrame]:
+    """
+    Read a CSV or Parquet table chunk by chunk, at most `chunk_size` rows are in memory at once.
+    Only `columns` are read when given. `filters` skip Parquet row groups by their statistics
+    and drop the non-matching rows of the others, they are not supported for CSV.
+    """
+    if file_format == "csv":
+        if filters is not None:
+            raise ValueError("Filters are only supported for Parquet tables.")
+        yield from pd.read_csv(file, chunksize=chunk_size, usecols=columns)
+    elif file_format == "parquet":
+        for batch in iter_parquet_batches(file, chunk_size, columns, filters):
+            yield batch.to_pandas()
+    else:
+        raise ValueError("Unsupported file format. Use 'csv' or 'parquet'.")
+
+
+def iter_parquet_batches(
+        file: BinaryIO | str | Path, batch_size: int = TABLE_CHUNK_SIZE,
+        columns: List[str] | None = None, filters: ParquetFilters | None = None
+) -> Iterator[pa.RecordBatch]:
+    """
+    Record batches of a Parquet file with column projection and row group predicate pushdown.
+    """
+    if filters is None:
+        yield from pq.ParquetFile(file).iter_batches(batch_size=batch_size, columns=columns)
+        return
+    expression = filters if isinstance(filters, ds.Expression) else pq.filters_to_expression(filters)
+    if isinstance(file, (str, Path)):
+        # a fragment made from a path needs a filesystem, the dataset resolves the local one
+        source = ds.dataset(file, format="parquet")
+    else:
+        source = ds.ParquetFileFormat().make_fragment(file)
+    yield from source.to_batches(columns=columns, filter=expression, batch_size=batch_size)
+
+
+def write_parquet_chunks(chunks: Iterable[pd.DataFrame], path: str | Path) -> int:
+    """
+    Write chunks as row groups of one Parquet file.
+
+    Returns:
+        int: Number of written rows.
+    """
+    writer, schema, rows = None, None, 0
+    try:
+        for chunk in chunks:
+            if writer is None:
+                schema = pa.Schema.from_pandas(chunk, preserve_index=False)
+                # slots that are empty in the first chunk must still accept names later
+                for i, field in enumerate(schema):
+                    if pa.types.is_null(field.type):
+                        schema = schema.set(i, field.with_type(pa.string()))
+                writer = pq.ParquetWriter(path, schema)
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def write_csv_chunks(chunks: Iterable[pd.DataFrame], path: str | Path) -> int:
+    """
+    Append chunks to one CSV file, the header is written with the first chunk.
+
+    Returns:
+        int: Number of written rows.
+    """
+    rows = 0
+    with open(path, "w", newline="") as f:
+        for i, chunk in enumerate(chunks):
+            chunk.to_csv(f, index=False, header=i == 0)
+            rows += len(chunk)
+    return rows
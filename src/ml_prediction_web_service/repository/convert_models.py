@@ -0,0 +1,51 @@
+"""
+Convert the joblib models of a model store directory to the native fast-load format and write their manifests.
+
+    python -m ml_prediction_web_service.repository.convert_models --models-path ml_models
+    python -m ml_prediction_web_service.repository.convert_models --model BAND_GAP_XGB --version 2025.1 \
+        --training-metadata band_gap_training.json
+
+Models whose joblib artifact is missing are skipped.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from ml_prediction_web_service.entities.model_dictionary import SavedModelName
+from ml_prediction_web_service.repository.model_store import convert_model
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--models-path", default=os.environ.get("MODELS_PATH"))
+    parser.add_argument("--model", choices=[model_name.name for model_name in SavedModelName], action="append")
+    parser.add_argument("--version", help="version to record, defaults to the artifact checksum")
+    parser.add_argument("--training-metadata", help="JSON file with training metadata to record")
+    args = parser.parse_args(argv)
+    if not args.models_path:
+        parser.error("--models-path or MODELS_PATH is required")
+
+    training = None
+    if args.training_metadata:
+        with open(args.training_metadata) as f:
+            training = json.load(f)
+
+    model_names = [SavedModelName[name] for name in args.model] if args.model else list(SavedModelName)
+    for model_name in model_names:
+        if not os.path.exists(os.path.join(args.models_path, model_name.value)):
+            print(f"{model_name.name}: {model_name.value} not found, skipped")
+            continue
+        started_at = time.perf_counter()
+        manifest = convert_model(args.models_path, model_name, version=args.version, training=training)
+        print(
+            f"{model_name.name}: version {manifest.version}, {len(manifest.feature_schema)} features, "
+            f"wrote {manifest.booster.file} and {manifest.preprocessor.file} "
+            f"in {time.perf_counter() - started_at:.2f}s"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
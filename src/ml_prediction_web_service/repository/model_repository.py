@@ -1,61 +1,359 @@
+import hashlib
+import logging
 import os
+import shutil
 import tempfile
+import threading
+import time
 from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import Any
+from typing import Any, Dict, List
 
 import joblib
-from xgboost import XGBRegressor
+from xgboost import XGBModel, XGBRegressor
 
 from ml_prediction_web_service.entities.model_dictionary import SavedModelName
+from ml_prediction_web_service.google_storage.cache import content_key
 from ml_prediction_web_service.google_storage.storage import GoogleDriveStorage
+from ml_prediction_web_service.repository.model_store import (
+    load_native,
+    read_manifest,
+    validate_feature_schema,
+    validate_manifest
+)
+from ml_prediction_web_service.services.metrics import MODEL_LOAD_SECONDS
+
+logger = logging.getLogger(__name__)
+
+MODELS_REFRESH_INTERVAL_SECONDS = 300.
 
 
 class ModelRepository(ABC):
+    """
+    Registry of loaded models. Every SavedModelName is deserialized once and the same
+    in-memory model is handed to every caller until `reload` swaps in a newer artifact.
+    """
+
+    def __init__(self):
+        self._models: Dict[SavedModelName, Any] = {}
+        self._versions: Dict[SavedModelName, str] = {}
+        self._load_seconds: Dict[SavedModelName, float] = {}
+        self._load_formats: Dict[SavedModelName, str] = {}
+        self._lock = threading.Lock()
+        self._model_threads: int | None = None
+        self._refresh_stop: threading.Event | None = None
+        self._refresh_thread: threading.Thread | None = None
+
     @staticmethod
-    def _load_model(path: str | Path) -> Any:
-        return joblib.load(path)
+    def _load_model(path: str | Path, mmap_mode: str | None = None) -> Any:
+        return joblib.load(path, mmap_mode=mmap_mode)
+
+    def _load_from_store(self, models_path: Path, model_name: SavedModelName, mmap_mode: str | None = None) -> Any:
+        """
+        Load `model_name` from a model store directory: checked against its manifest and from the native
+        format when the store has one, the plain joblib artifact otherwise.
+
+        Raises:
+            ModelManifestError: If the artifacts don't match the manifest.
+        """
+        manifest = read_manifest(models_path, model_name)
+        if manifest is None:
+            model_format, model = "joblib", self._load_model(models_path / model_name.value, mmap_mode)
+        else:
+            validate_manifest(manifest, models_path, model_name)
+            if manifest.has_native:
+                model_format, model = "native", load_native(models_path, manifest, mmap_mode)
+            else:
+                model_format, model = "joblib", self._load_model(models_path / model_name.value, mmap_mode)
+            validate_feature_schema(model, manifest)
+        self._load_formats[model_name] = model_format
+        return model
 
     @abstractmethod
-    def get_band_gap_xgb_model(self):
+    def _fetch_model(self, model_name: SavedModelName) -> Any:
+        """Deserialize the current artifact of `model_name`."""
         pass
 
     @abstractmethod
-    def get_pce_t80_xgb_model(self):
+    def _get_model_version(self, model_name: SavedModelName) -> str:
+        """Cheap fingerprint of the current artifact, used by `reload` to detect changes."""
         pass
 
+    def get_model(self, model_name: SavedModelName) -> Any:
+        model = self._models.get(model_name)
+        if model is not None:
+            return model
+        with self._lock:
+            model = self._models.get(model_name)
+            if model is None:
+                version = self._get_model_version(model_name)
+                model = self._timed_fetch(model_name)
+                self._swap(model_name, model, version)
+        return model
+
+    def _timed_fetch(self, model_name: SavedModelName) -> Any:
+        started_at = time.perf_counter()
+        model = self._fetch_model(model_name)
+        duration = time.perf_counter() - started_at
+        MODEL_LOAD_SECONDS.observe(
+            duration, model=model_name.name, format=self._load_formats.get(model_name, "joblib")
+        )
+        self._load_seconds = {**self._load_seconds, model_name: duration}
+        return model
+
+    def get_load_seconds(self, model_name: SavedModelName) -> float | None:
+        """
+        How long the last load of `model_name` took, None if it was never loaded.
+        """
+        return self._load_seconds.get(model_name)
+
+    def get_model_version(self, model_name: SavedModelName) -> str | None:
+        return self._versions.get(model_name)
+
+    def pin_model_threads(self, n_threads: int | None):
+        """
+        Limit the threads XGBoost uses per prediction call, for loaded and later loaded models.
+        Inference already runs on a pool of workers, unpinned boosters would oversubscribe the cores.
+        """
+        with self._lock:
+            self._model_threads = n_threads
+            for model in self._models.values():
+                self._pin_threads(model)
+
+    def _pin_threads(self, model: Any):
+        if self._model_threads is None:
+            return
+        estimator = model.steps[-1][1] if hasattr(model, "steps") else model
+        if isinstance(estimator, XGBModel):
+            estimator.set_params(n_jobs=self._model_threads)
+
+    def get_band_gap_xgb_model(self) -> XGBRegressor:
+        return self.get_model(SavedModelName.BAND_GAP_XGB)
+
+    def get_pce_t80_xgb_model(self) -> XGBRegressor:
+        return self.get_model(SavedModelName.PCE_T80_XGB)
+
+    def get_jv_pce_xgb_model(self) -> XGBRegressor:
+        return self.get_model(SavedModelName.JV_PCE_XGB)
+
+    def load_models(self) -> List[SavedModelName]:
+        """
+        Eagerly load every known model and log how long each took. Missing artifacts are logged
+        and skipped, so they are loaded lazily (and fail) only when actually requested.
+        Artifacts that don't match their manifest fail the startup.
+        """
+        loaded = []
+        for model_name in SavedModelName:
+            try:
+                self.get_model(model_name)
+            except FileNotFoundError as e:
+                logger.warning("Model %s is not available: %s", model_name.name, e)
+                continue
+            logger.info(
+                "Loaded model %s, version %s, from %s in %.3fs",
+                model_name.name, self.get_model_version(model_name),
+                self._load_formats.get(model_name, "joblib"), self.get_load_seconds(model_name) or 0.
+            )
+            loaded.append(model_name)
+        return loaded
+
+    def reload(self) -> List[SavedModelName]:
+        """
+        Reload every loaded model whose artifact changed since it was loaded.
+        The new model is fully deserialized before it replaces the old one,
+        so concurrent requests see either the old or the new model, never a partial one.
+
+        Returns:
+            List[SavedModelName]: Models that were swapped.
+        """
+        reloaded = []
+        for model_name in list(self._models):
+            try:
+                version = self._get_model_version(model_name)
+                if version == self._versions.get(model_name):
+                    continue
+                model = self._timed_fetch(model_name)
+            except Exception:
+                logger.exception("Could not reload model %s, keeping the loaded version", model_name.name)
+                continue
+            with self._lock:
+                self._swap(model_name, model, version)
+            logger.info("Reloaded model %s, version %s", model_name.name, version)
+            reloaded.append(model_name)
+        return reloaded
+
+    def start_background_refresh(self, interval_seconds: float = MODELS_REFRESH_INTERVAL_SECONDS):
+        """
+        Call `reload` every `interval_seconds` on a daemon thread, so new artifacts are hot-swapped
+        without a request to `/models/reload`.
+        """
+        if self._refresh_thread is not None:
+            return
+        self._refresh_stop = threading.Event()
+        self._refresh_thread = threading.Thread(
+            target=self._refresh_loop, args=(self._refresh_stop, interval_seconds),
+            name="model-refresh", daemon=True
+        )
+        self._refresh_thread.start()
+
+    def stop_background_refresh(self):
+        if self._refresh_thread is None:
+            return
+        self._refresh_stop.set()
+        self._refresh_thread.join()
+        self._refresh_thread = None
+
+    def _refresh_loop(self, stop: threading.Event, interval_seconds: float):
+        while not stop.wait(interval_seconds):
+            try:
+                self.reload()
+            except Exception:
+                logger.exception("Background model refresh failed")
+
+    def _swap(self, model_name: SavedModelName, model: Any, version: str):
+        self._pin_threads(model)
+        # copy-on-write, readers always see a complete dict
+        self._models = {**self._models, model_name: model}
+        self._versions = {**self._versions, model_name: version}
+
     @staticmethod
-    def _write_to_temp_file(model_bytes: bytes):
-        with tempfile.NamedTemporaryFile(suffix=".json", delete=True) as f:
-            f.write(model_bytes)
+    def _copy_to_temp_file(source: str | Path, directory: str | Path | None = None) -> str:
+        """
+        Put the contents of `source` in a new temporary file in `directory` and return its path, hard-linked
+        when both are on one filesystem and copied otherwise, never read into memory.
+        The file is kept, the caller moves it into place or removes it.
+        """
+        with tempfile.NamedTemporaryFile(suffix=".joblib.tmp", dir=directory, delete=False) as f:
             tmp_path = f.name
+        try:
+            os.remove(tmp_path)
+            os.link(source, tmp_path)
+        except OSError:
+            shutil.copyfile(source, tmp_path)
         return tmp_path
 
 
 class GoogleModelRepository(ModelRepository):
+    """
+    Models pulled from `remote_path` on Google Drive into the local `cache_path` and served from memory.
+
+    Downloaded artifacts are kept in `cache_path` with a `.version` file next to each. On a cold start a
+    cached artifact is loaded without contacting Drive, `reload` (or the background refresh) then picks up
+    newer versions. When Drive is unreachable the cached version keeps being served.
+    """
+
     def __init__(
             self,
-            google_drive: GoogleDriveStorage
+            google_drive: GoogleDriveStorage,
+            cache_path: str,
+            remote_path: str = "",
+            mmap_mode: str | None = None,
     ):
+        super().__init__()
         self._drive = google_drive
+        self._cache_path = Path(cache_path)
+        self._cache_path.mkdir(parents=True, exist_ok=True)
+        self._remote_path = remote_path
+        self._mmap_mode = mmap_mode
 
-    def get_band_gap_xgb_model(self) -> XGBRegressor:
-        pass
+    def _remote_model_path(self, model_name: SavedModelName) -> str:
+        return f"{self._remote_path.rstrip('/')}/{model_name.value}" if self._remote_path else model_name.value
 
-    def get_pce_t80_xgb_model(self) -> XGBRegressor:
-        pass
+    def _cached_model_path(self, model_name: SavedModelName) -> Path:
+        return self._cache_path / model_name.value
+
+    def _cached_version(self, model_name: SavedModelName) -> str | None:
+        version_path = self._cache_path / f"{model_name.value}.version"
+        if not version_path.exists() or not self._cached_model_path(model_name).exists():
+            return None
+        return version_path.read_text().strip()
+
+    def _get_model_version(self, model_name: SavedModelName) -> str:
+        cached_version = self._cached_version(model_name)
+        if model_name not in self._models and cached_version is not None:
+            # cold start, serve the cached artifact and let `reload` catch up with Drive
+            return cached_version
+        try:
+            return content_key(self._drive.get_metadata(self._remote_model_path(model_name)))
+        except FileNotFoundError:
+            if cached_version is None:
+                raise
+            logger.warning("Model %s was removed from Google Drive, serving cached version", model_name.name)
+            return cached_version
+        except Exception as e:
+            if cached_version is None:
+                raise FileNotFoundError(
+                    f"Model {model_name.name} is not cached and could not be fetched from Google Drive"
+                ) from e
+            logger.warning(
+                "Could not check model %s on Google Drive, serving cached version %s",
+                model_name.name, cached_version, exc_info=True
+            )
+            return cached_version
+
+    def _fetch_model(self, model_name: SavedModelName) -> Any:
+        cached_path = self._cached_model_path(model_name)
+        if model_name not in self._models and self._cached_version(model_name) is not None:
+            return self._load_model(cached_path, self._mmap_mode)
+
+        blob_path = self._drive.download_file_to_path(self._remote_model_path(model_name))
+        if blob_path.name == self._cached_version(model_name):
+            return self._load_model(cached_path, self._mmap_mode)
+        tmp_path = self._copy_to_temp_file(blob_path, self._cache_path)
+        try:
+            model = self._load_model(tmp_path)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+        # the artifact is replaced atomically, memory-mapped readers of the old one keep their pages
+        os.replace(tmp_path, cached_path)
+        (self._cache_path / f"{model_name.value}.version").write_text(blob_path.name)
+        return model if self._mmap_mode is None else self._load_model(cached_path, self._mmap_mode)
 
 
 class LocalModelRepository(ModelRepository):
+    """
+    Models read from the model store in `models_path`, see `ModelManifest` for its layout.
+
+    With `mmap_mode` ("r") array-backed parts of uncompressed artifacts are memory-mapped, so server
+    worker processes share their pages. For converted models that includes the flattened trees the
+    "trees" engine evaluates, the XGBoost booster itself is still deserialized into each process.
+    Artifacts must then be replaced atomically (write + rename), never rewritten in place.
+    """
+
     def __init__(
-            self, models_path: str
+            self, models_path: str, mmap_mode: str | None = None
     ):
+        super().__init__()
         self._models_path = Path(models_path)
+        self._mmap_mode = mmap_mode
+        self._fingerprints: Dict[Path, tuple[int, int, str]] = {}
 
-    def get_band_gap_xgb_model(self) -> XGBRegressor:
-        path_to_model = self._models_path / SavedModelName.BAND_GAP_XGB.value
-        return self._load_model(path_to_model)
+    def _model_path(self, model_name: SavedModelName) -> Path:
+        return self._models_path / model_name.value
 
-    def get_pce_t80_xgb_model(self) -> XGBRegressor:
-        path_to_model = self._models_path / SavedModelName.PCE_T80_XGB.value
-        return self._load_model(path_to_model)
+    def _fetch_model(self, model_name: SavedModelName) -> Any:
+        return self._load_from_store(self._models_path, model_name, self._mmap_mode)
+
+    def _get_model_version(self, model_name: SavedModelName) -> str:
+        """
+        Version in the model's manifest with its artifact checksum, or the content hash of the model file
+        when it has none. The hash is recomputed only when mtime or size changes.
+        """
+        manifest = read_manifest(self._models_path, model_name)
+        if manifest is not None:
+            # a model converted again under the same version still counts as changed
+            return f"{manifest.version}+{manifest.artifact.sha256[:8]}"
+        path = self._model_path(model_name)
+        stat = os.stat(path)
+        cached = self._fingerprints.get(path)
+        if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            return cached[2]
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        version = digest.hexdigest()[:16]
+        self._fingerprints[path] = (stat.st_mtime_ns, stat.st_size, version)
+        return version
@@ -0,0 +1,286 @@
+import datetime
+import hashlib
+import json
+import os
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict
+
+import joblib
+import sklearn
+import xgboost
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder
+from xgboost import XGBModel, XGBRegressor
+
+from ml_prediction_web_service.entities.model_dictionary import SavedModelName
+from ml_prediction_web_service.services.tree_evaluator import FlatTreeEnsemble, register_tree_ensemble
+
+MANIFEST_SUFFIX = ".manifest.json"
+BOOSTER_SUFFIX = ".ubj"
+PREPROCESSOR_SUFFIX = ".preprocessor.joblib"
+TREES_SUFFIX = ".trees.npy"
+MANIFEST_FORMAT_VERSION = 1
+FEATURE_NUMERIC = "numeric"
+FEATURE_CATEGORICAL = "categorical"
+
+
+class ModelManifestError(ValueError):
+    """
+    A manifest that can't be read or doesn't match the artifacts next to it.
+    """
+
+
+@dataclass
+class ArtifactFile:
+    file: str
+    sha256: str
+
+
+@dataclass
+class ModelManifest:
+    """
+    Description of one model in a model store directory. Per SavedModelName `<stem>.joblib` the store holds:
+
+        <stem>.joblib                 the trained sklearn pipeline
+        <stem>.manifest.json          this manifest
+        <stem>.ubj                    the pipeline's XGBoost booster in native UBJSON
+        <stem>.preprocessor.joblib    the pipeline without its regressor step
+        <stem>.trees.npy              the booster's trees as packed FlatTreeEnsemble node arrays
+
+    The native files are written by `convert_model` and are optional, without them the joblib pipeline is loaded.
+    The trees file is missing for boosters the "trees" engine can't evaluate.
+    """
+    model: str
+    version: str
+    artifact: ArtifactFile
+    # pipeline input column -> FEATURE_NUMERIC or FEATURE_CATEGORICAL, in input order
+    feature_schema: Dict[str, str]
+    training: Dict[str, Any] = field(default_factory=dict)
+    booster: ArtifactFile | None = None
+    preprocessor: ArtifactFile | None = None
+    regressor_step: str | None = None
+    trees: ArtifactFile | None = None
+    # array offsets and ensemble parameters of the trees file, see `FlatTreeEnsemble.save`
+    tree_layout: Dict[str, Any] | None = None
+    format_version: int = MANIFEST_FORMAT_VERSION
+
+    @property
+    def has_native(self) -> bool:
+        return self.booster is not None and self.preprocessor is not None and self.regressor_step is not None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ModelManifest":
+        """
+        Raises:
+            ModelManifestError: If fields are missing or the manifest is of a newer format.
+        """
+        try:
+            format_version = data.get("format_version", MANIFEST_FORMAT_VERSION)
+            if format_version > MANIFEST_FORMAT_VERSION:
+                raise ModelManifestError(f"Unsupported manifest format {format_version}")
+            return cls(
+                model=data["model"],
+                version=data["version"],
+                artifact=ArtifactFile(**data["artifact"]),
+                feature_schema=dict(data["feature_schema"]),
+                training=dict(data.get("training") or {}),
+                booster=ArtifactFile(**data["booster"]) if data.get("booster") else None,
+                preprocessor=ArtifactFile(**data["preprocessor"]) if data.get("preprocessor") else None,
+                regressor_step=data.get("regressor_step"),
+                trees=ArtifactFile(**data["trees"]) if data.get("trees") else None,
+                tree_layout=data.get("tree_layout"),
+                format_version=format_version,
+            )
+        except (KeyError, TypeError) as e:
+            raise ModelManifestError(f"Malformed model manifest: {e}") from e
+
+    @classmethod
+    def read(cls, path: str | Path) -> "ModelManifest":
+        """
+        Raises:
+            ModelManifestError: If the file is not a valid manifest.
+        """
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except ValueError as e:
+            raise ModelManifestError(f"Model manifest {path} is not valid JSON: {e}") from e
+        return cls.from_dict(data)
+
+    def write(self, path: str | Path):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(asdict(self), f, indent=2, default=str)
+        os.replace(tmp_path, path)
+
+
+def model_stem(model_name: SavedModelName) -> str:
+    return Path(model_name.value).stem
+
+
+def manifest_path(models_path: str | Path, model_name: SavedModelName) -> Path:
+    return Path(models_path) / f"{model_stem(model_name)}{MANIFEST_SUFFIX}"
+
+
+def file_sha256(path: str | Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_manifest(models_path: str | Path, model_name: SavedModelName) -> ModelManifest | None:
+    """
+    Manifest of `model_name` in `models_path`, None for artifacts stored without one.
+    """
+    path = manifest_path(models_path, model_name)
+    if not path.exists():
+        return None
+    return ModelManifest.read(path)
+
+
+def validate_manifest(manifest: ModelManifest, models_path: str | Path, model_name: SavedModelName) -> ModelManifest:
+    """
+    Check that `manifest` describes `model_name` and that every file it lists is there with its checksum.
+
+    Raises:
+        ModelManifestError: On the first mismatch.
+    """
+    if manifest.model != model_name.name or manifest.artifact.file != model_name.value:
+        raise ModelManifestError(
+            f"Manifest of {manifest.model} ({manifest.artifact.file}) found for model {model_name.name}"
+        )
+    for artifact in (manifest.artifact, manifest.booster, manifest.preprocessor, manifest.trees):
+        if artifact is None:
+            continue
+        path = Path(models_path) / artifact.file
+        if not path.exists():
+            raise ModelManifestError(f"Model {model_name.name}: {artifact.file} listed in its manifest is missing")
+        if file_sha256(path) != artifact.sha256:
+            raise ModelManifestError(
+                f"Model {model_name.name}: checksum of {artifact.file} doesn't match its manifest, "
+                f"convert the model again"
+            )
+    return manifest
+
+
+def validate_feature_schema(model: Any, manifest: ModelManifest):
+    """
+    Raises:
+        ModelManifestError: If the loaded model takes other input columns than the manifest lists.
+    """
+    feature_names = [str(name) for name in getattr(model, "feature_names_in_", [])]
+    if feature_names != list(manifest.feature_schema):
+        raise ModelManifestError(
+            f"Model {manifest.model} takes {feature_names}, its manifest lists {list(manifest.feature_schema)}"
+        )
+
+
+def load_native(models_path: str | Path, manifest: ModelManifest, mmap_mode: str | None = None) -> Pipeline:
+    """
+    Rebuild the pipeline of `manifest` from its preprocessor and native booster. Loading the UBJSON booster
+    skips unpickling the sklearn wrapper around it, which dominates the load time of the joblib pipeline.
+
+    The booster's flattened trees are loaded from the trees file, memory-mapped with `mmap_mode`, and
+    registered for the "trees" engine: server workers evaluating them share one copy of the node arrays.
+    """
+    preprocessor = joblib.load(Path(models_path) / manifest.preprocessor.file, mmap_mode=mmap_mode)
+    regressor = XGBRegressor()
+    regressor.load_model(Path(models_path) / manifest.booster.file)
+    if manifest.trees is not None:
+        ensemble = FlatTreeEnsemble.load(Path(models_path) / manifest.trees.file, manifest.tree_layout, mmap_mode)
+        register_tree_ensemble(regressor.get_booster(), ensemble)
+    return Pipeline(preprocessor.steps + [(manifest.regressor_step, regressor)])
+
+
+def feature_schema(pipeline: Pipeline) -> Dict[str, str]:
+    """
+    Input columns of a `ColumnTransformer -> regressor` pipeline with how they are encoded.
+    """
+    kinds = {}
+    preprocessor = pipeline.steps[0][1]
+    for _, transformer, columns in getattr(preprocessor, "transformers_", []):
+        if transformer == "drop":
+            continue
+        steps = transformer.steps if isinstance(transformer, Pipeline) else [(None, transformer)]
+        is_categorical = any(isinstance(step, OneHotEncoder) for _, step in steps)
+        for column in columns:
+            kinds[str(column)] = FEATURE_CATEGORICAL if is_categorical else FEATURE_NUMERIC
+    return {str(name): kinds.get(str(name), FEATURE_NUMERIC) for name in pipeline.feature_names_in_}
+
+
+def convert_model(
+        models_path: str | Path,
+        model_name: SavedModelName,
+        version: str | None = None,
+        training: Dict[str, Any] | None = None
+) -> ModelManifest:
+    """
+    Write the native booster, the preprocessor and the manifest of the joblib pipeline of `model_name`.
+    `version` defaults to the artifact's checksum prefix, the version the repository reports for
+    artifacts without a manifest. `training` metadata is added to what is read from the model.
+
+    Raises:
+        FileNotFoundError: If the joblib artifact is missing.
+        ValueError: If the artifact is not a pipeline ending in an XGBoost model.
+    """
+    models_path = Path(models_path)
+    artifact_path = models_path / model_name.value
+    pipeline = joblib.load(artifact_path)
+    if not isinstance(pipeline, Pipeline) or not isinstance(pipeline.steps[-1][1], XGBModel):
+        raise ValueError(f"{artifact_path} is not a pipeline ending in an XGBoost model")
+    regressor_step, regressor = pipeline.steps[-1]
+    stem = model_stem(model_name)
+
+    # written under temporary names and moved into place, a running server never reads half a file
+    booster_path = models_path / f"{stem}{BOOSTER_SUFFIX}"
+    tmp_booster_path = models_path / f"{stem}.tmp{BOOSTER_SUFFIX}"
+    regressor.save_model(tmp_booster_path)
+    os.replace(tmp_booster_path, booster_path)
+    preprocessor_path = models_path / f"{stem}{PREPROCESSOR_SUFFIX}"
+    tmp_preprocessor_path = models_path / f"{stem}.tmp{PREPROCESSOR_SUFFIX}"
+    joblib.dump(Pipeline(pipeline.steps[:-1]), tmp_preprocessor_path)
+    os.replace(tmp_preprocessor_path, preprocessor_path)
+
+    booster = regressor.get_booster()
+    trees, tree_layout = None, None
+    try:
+        ensemble = FlatTreeEnsemble.from_booster(booster)
+    except NotImplementedError:
+        ensemble = None
+    if ensemble is not None:
+        trees_path = models_path / f"{stem}{TREES_SUFFIX}"
+        tmp_trees_path = models_path / f"{stem}.tmp{TREES_SUFFIX}"
+        tree_layout = ensemble.save(tmp_trees_path)
+        os.replace(tmp_trees_path, trees_path)
+        trees = ArtifactFile(file=trees_path.name, sha256=file_sha256(trees_path))
+
+    checksum = file_sha256(artifact_path)
+    manifest = ModelManifest(
+        model=model_name.name,
+        version=version or checksum[:16],
+        artifact=ArtifactFile(file=model_name.value, sha256=checksum),
+        feature_schema=feature_schema(pipeline),
+        training={
+            "sklearn_version": sklearn.__version__,
+            "xgboost_version": xgboost.__version__,
+            "n_features": booster.num_features(),
+            "n_boosted_rounds": booster.num_boosted_rounds(),
+            "params": {
+                key: value for key, value in regressor.get_params().items()
+                if isinstance(value, (str, int, float, bool)) or value is None
+            },
+            "converted_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            **(training or {}),
+        },
+        booster=ArtifactFile(file=booster_path.name, sha256=file_sha256(booster_path)),
+        preprocessor=ArtifactFile(file=preprocessor_path.name, sha256=file_sha256(preprocessor_path)),
+        regressor_step=regressor_step,
+        trees=trees,
+        tree_layout=tree_layout,
+    )
+    validate_feature_schema(load_native(models_path, manifest), manifest)
+    manifest.write(manifest_path(models_path, model_name))
+    return manifest
@@ -0,0 +1,248 @@
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+from pydantic import ValidationError
+
+from ml_prediction_web_service.entities.composition_batch import CompositionBatch, find_site_sum_errors
+from ml_prediction_web_service.entities.dictionary import Dimension, Element, Site, SpaceGroup
+from ml_prediction_web_service.entities.entities import SITE_SLOTS, BandGapPredictionRequest
+
+_ELEMENT_CODES = Element.code_by_name()
+_SPACE_GROUP_NAMES = frozenset(SpaceGroup.code_by_name())
+_DIMENSION_NAMES = frozenset(Dimension.code_by_name())
+
+_ELEMENT_NAME_SET = pa.array(list(_ELEMENT_CODES), type=pa.string())
+_ELEMENT_CODE_BY_POSITION = np.array(list(_ELEMENT_CODES.values()), dtype=np.int16)
+BAND_GAP_TABLE_REQUEST_COLUMNS = ("space_group", "composition_inorganic", "dimension_list_of_layers", "dimension")
+
+
+@dataclass
+class ParsedBandGapBatch:
+    """
+    Valid items of a band gap batch payload as arrays, row `i` is item `indices[i]`.
+    Invalid items are in `errors`, by item index.
+    """
+    indices: np.ndarray
+    compositions: CompositionBatch
+    space_group: np.ndarray
+    composition_inorganic: np.ndarray
+    dimension_list_of_layers: np.ndarray
+    dimension: np.ndarray
+    errors: Dict[int, str]
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """
+        Non-composition columns of the band gap input schema.
+        """
+        return {
+            "space_group": self.space_group,
+            "composition_inorganic": self.composition_inorganic,
+            "dimension_list_of_layers": self.dimension_list_of_layers,
+            "dimension": self.dimension,
+        }
+
+
+class _BandGapArrays:
+    def __init__(self, n_items: int):
+        self.codes = {site: np.zeros((n_items, SITE_SLOTS[site]), dtype=np.int16) for site in Site}
+        self.fractions = {site: np.zeros((n_items, SITE_SLOTS[site]), dtype=np.float64) for site in Site}
+        self.totals = {site: np.zeros(n_items, dtype=np.float64) for site in Site}
+        self.space_group = np.empty(n_items, dtype=object)
+        self.composition_inorganic = np.zeros(n_items, dtype=bool)
+        self.dimension_list_of_layers = np.zeros(n_items, dtype=np.float64)
+        self.dimension = np.empty(n_items, dtype=object)
+
+    def fill(self, i: int, item: Any) -> bool:
+        """
+        Fill row `i` from a payload that only uses plain JSON types the way clients send them.
+        False if the item needs full model validation, the row may then be partially written.
+        """
+        if type(item) is not dict or type(item.get("perovskite_composition")) is not dict:
+            return False
+        composition = item["perovskite_composition"]
+        for site in Site:
+            site_list = composition.get(f"{site.value}_site")
+            if type(site_list) is not list:
+                return False
+            total = 0
+            for slot, element_fraction in enumerate(site_list):
+                if type(element_fraction) is not dict:
+                    return False
+                name, frequence = element_fraction.get("name"), element_fraction.get("frequence")
+                if type(name) is not str or name not in _ELEMENT_CODES or type(frequence) not in (int, float):
+                    return False
+                total += frequence
+                if slot < SITE_SLOTS[site]:
+                    self.codes[site][i, slot] = _ELEMENT_CODES[name]
+                    self.fractions[site][i, slot] = frequence
+            self.totals[site][i] = total
+
+        space_group, dimension = item.get("space_group"), item.get("dimension")
+        inorganic, layers = item.get("inorganic_composition"), item.get("dimension_list_of_layers")
+        if (
+                type(space_group) is not str or space_group not in _SPACE_GROUP_NAMES
+                or type(dimension) is not str or dimension not in _DIMENSION_NAMES
+                or type(inorganic) is not bool or type(layers) not in (int, float)
+        ):
+            return False
+        self.space_group[i], self.dimension[i] = space_group, dimension
+        self.composition_inorganic[i], self.dimension_list_of_layers[i] = inorganic, layers
+        return True
+
+    def fill_from_request(self, i: int, request: BandGapPredictionRequest):
+        for site in Site:
+            self.codes[site][i], self.fractions[site][i] = 0, 0.
+            site_list = getattr(request.perovskite_composition, f"{site.value}_site")
+            for slot, element_fraction in enumerate(site_list[:SITE_SLOTS[site]]):
+                self.codes[site][i, slot] = element_fraction.name.code
+                self.fractions[site][i, slot] = element_fraction.frequence
+        self.space_group[i], self.dimension[i] = request.space_group.nm, request.dimension.nm
+        self.composition_inorganic[i] = request.inorganic_composition
+        self.dimension_list_of_layers[i] = request.dimension_list_of_layers
+
+    def take(self, indices: np.ndarray) -> Dict[str, Any]:
+        return {
+            "indices": indices,
+            "compositions": CompositionBatch.from_arrays(
+                {site: self.codes[site][indices] for site in Site},
+                {site: self.fractions[site][indices] for site in Site},
+            ),
+            "space_group": self.space_group[indices],
+            "composition_inorganic": self.composition_inorganic[indices],
+            "dimension_list_of_layers": self.dimension_list_of_layers[indices],
+            "dimension": self.dimension[indices],
+        }
+
+
+def parse_band_gap_items(items: List[Any]) -> ParsedBandGapBatch:
+    """
+    Parse a list of band gap request payloads into arrays in one pass, without building a
+    BandGapPredictionRequest per item. Element and enum names are resolved through their indexes
+    and the site sums of all items are checked at once.
+
+    Items the fast path can't take as they are (lax types, missing fields, wrong site sums)
+    go through `BandGapPredictionRequest` validation, so accepted items and error messages are
+    the same as for single requests.
+    """
+    arrays = _BandGapArrays(len(items))
+    parsed = np.fromiter((arrays.fill(i, item) for i, item in enumerate(items)), dtype=bool, count=len(items))
+    for i in find_site_sum_errors(arrays.totals):
+        parsed[i] = False
+
+    errors = {}
+    for i in np.flatnonzero(~parsed):
+        try:
+            request = BandGapPredictionRequest.model_validate(items[i])
+        except ValidationError as e:
+            errors[int(i)] = format_validation_error(e)
+            continue
+        arrays.fill_from_request(i, request)
+        parsed[i] = True
+    return ParsedBandGapBatch(**arrays.take(np.flatnonzero(parsed)), errors=errors)
+
+
+def parse_band_gap_table(table: pa.Table) -> ParsedBandGapBatch:
+    """
+    Parse a table with the prepared band gap input columns (`A_1`, `A_1_coef`, ..., `space_group`,
+    `composition_inorganic`, `dimension_list_of_layers`, `dimension`), a row per request.
+    Element names are resolved in Arrow and numeric columns are taken over without a copy
+    where their type allows it. Element slot columns and their fractions may be left out when unused.
+
+    Rows with unknown names, missing values or wrong site sums are reported in `errors`.
+
+    Raises:
+        ValueError: If a request column is missing or can't be read as its type.
+    """
+    missing = [column for column in BAND_GAP_TABLE_REQUEST_COLUMNS if column not in table.column_names]
+    if missing:
+        raise ValueError(f"Input is missing columns: {missing}")
+    n_rows = table.num_rows
+    row_errors: Dict[int, str] = {}
+
+    def add_errors(mask: np.ndarray, message: Callable[[int], str]):
+        for index in np.flatnonzero(mask):
+            row_errors.setdefault(int(index), message(int(index)))
+
+    codes, fractions = {}, {}
+    for site in Site:
+        codes[site] = np.zeros((n_rows, SITE_SLOTS[site]), dtype=np.int16)
+        fractions[site] = np.zeros((n_rows, SITE_SLOTS[site]), dtype=np.float64)
+        for slot in range(SITE_SLOTS[site]):
+            name_column = f"{site.value}_{slot + 1}"
+            if name_column in table.column_names:
+                names = _as_strings(table.column(name_column))
+                positions = pc.index_in(names, value_set=_ELEMENT_NAME_SET)
+                unknown = pc.and_(pc.is_valid(names), pc.is_null(positions)).to_numpy(zero_copy_only=False)
+                add_errors(unknown, lambda i: f"{name_column}: No element found with name '{names[i].as_py()}'")
+                positions = pc.fill_null(positions, -1).to_numpy(zero_copy_only=False)
+                codes[site][:, slot] = np.where(positions >= 0, _ELEMENT_CODE_BY_POSITION[positions], 0)
+            if f"{name_column}_coef" in table.column_names:
+                fractions[site][:, slot] = _as_numpy(table.column(f"{name_column}_coef"), pa.float64(), fill=0.)
+
+    site_errors = find_site_sum_errors({site: fractions[site].sum(axis=1) for site in Site})
+    site_error_mask = np.zeros(n_rows, dtype=bool)
+    site_error_mask[list(site_errors)] = True
+    add_errors(site_error_mask, lambda i: f"perovskite_composition: Value error, {site_errors[i]}")
+
+    columns = {}
+    for name in BAND_GAP_TABLE_REQUEST_COLUMNS:
+        column = table.column(name)
+        add_errors(pc.is_null(column).to_numpy(zero_copy_only=False), lambda i: f"{name}: Field required")
+    for name, valid_names in (("space_group", _SPACE_GROUP_NAMES), ("dimension", _DIMENSION_NAMES)):
+        values = _as_strings(table.column(name))
+        unknown = ~pc.is_in(values, value_set=pa.array(sorted(valid_names))).to_numpy(zero_copy_only=False)
+        add_errors(unknown, lambda i: f"{name}: Unknown {name} '{values[i].as_py()}'")
+        columns[name] = values.to_numpy(zero_copy_only=False)
+    columns["composition_inorganic"] = _as_numpy(table.column("composition_inorganic"), pa.bool_(), fill=False)
+    columns["dimension_list_of_layers"] = _as_numpy(table.column("dimension_list_of_layers"), pa.float64(), fill=0.)
+
+    indices = np.setdiff1d(np.arange(n_rows), np.fromiter(row_errors, dtype=np.int64, count=len(row_errors)))
+    return ParsedBandGapBatch(
+        indices=indices,
+        compositions=CompositionBatch.from_arrays(
+            {site: codes[site][indices] for site in Site},
+            {site: fractions[site][indices] for site in Site},
+        ),
+        **{name: values[indices] for name, values in columns.items()},
+        errors=row_errors,
+    )
+
+
+def _as_strings(column: pa.ChunkedArray) -> pa.ChunkedArray:
+    if pa.types.is_string(column.type):
+        return column
+    return _cast(column, pa.string())
+
+
+def _as_numpy(column: pa.ChunkedArray, arrow_type: pa.DataType, fill: Any) -> np.ndarray:
+    """
+    Column values as a numpy array, cast to `arrow_type` with nulls replaced by `fill`.
+    A single null-free chunk of a numeric `arrow_type` is a view of the Arrow buffer, not a copy.
+    """
+    if column.type != arrow_type:
+        column = _cast(column, arrow_type)
+    if column.null_count:
+        column = pc.fill_null(column, fill)
+    if column.num_chunks == 1:
+        return column.chunk(0).to_numpy(zero_copy_only=False)
+    return column.to_numpy()
+
+
+def _cast(column: pa.ChunkedArray, arrow_type: pa.DataType) -> pa.ChunkedArray:
+    try:
+        return column.cast(arrow_type)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+        raise ValueError(f"Column of type {column.type} can't be read as {arrow_type}: {e}") from e
+
+
+def format_validation_error(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}" if err["loc"] else err["msg"]
+        for err in error.errors()
+    )
@@ -0,0 +1,158 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Generic, List, Sequence, Tuple, TypeVar
+
+from ml_prediction_web_service.services.metrics import collect_server_timings, current_server_timings
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+@dataclass
+class _PendingItem(Generic[T]):
+    item: T
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.perf_counter)
+    # Server-Timing stages of the submitting request, None outside a request
+    timings: List[Tuple[str, str, float]] | None = None
+
+
+@dataclass
+class BatchingStats:
+    batches_total: int = 0
+    items_total: int = 0
+    max_batch_size: int = 0
+    wait_seconds_total: float = 0.
+    max_wait_seconds: float = 0.
+    failed_batches_total: int = 0
+
+    def record(self, batch_size: int, wait_seconds: List[float]):
+        self.batches_total += 1
+        self.items_total += batch_size
+        self.max_batch_size = max(self.max_batch_size, batch_size)
+        self.wait_seconds_total += sum(wait_seconds)
+        self.max_wait_seconds = max(self.max_wait_seconds, *wait_seconds)
+
+
+class MicroBatcher(Generic[T, R]):
+    """
+    Collects concurrently submitted items for up to `max_wait_ms` or until `max_batch_size`
+    items are queued, runs `batch_fn` once for the whole batch in an executor
+    and resolves every caller with its own result. The stages `batch_fn` observes are added
+    to the Server-Timing of every caller in the batch.
+
+    `batch_fn` must return one result per item, in the same order.
+    """
+
+    def __init__(
+            self,
+            batch_fn: Callable[[List[T]], Sequence[R]],
+            max_batch_size: int = 64,
+            max_wait_ms: float = 5.,
+            executor: Any = None,
+    ):
+        if max_batch_size < 1:
+            raise ValueError(f"max_batch_size must be positive, got {max_batch_size}")
+        self._batch_fn = batch_fn
+        self._max_batch_size = max_batch_size
+        self._max_wait = max_wait_ms / 1000.
+        self._executor = executor
+        self._stats = BatchingStats()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._queue: asyncio.Queue | None = None
+        self._worker: asyncio.Task | None = None
+
+    async def submit(self, item: T) -> R:
+        self._ensure_started()
+        pending = _PendingItem(item=item, future=self._loop.create_future(), timings=current_server_timings())
+        self._queue.put_nowait(pending)
+        return await pending.future
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._loop, self._queue, self._worker = None, None, None
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def stats(self) -> Dict[str, float]:
+        stats = self._stats
+        return {
+            "queue_depth": self.queue_depth,
+            "batches_total": stats.batches_total,
+            "items_total": stats.items_total,
+            "failed_batches_total": stats.failed_batches_total,
+            "mean_batch_size": stats.items_total / stats.batches_total if stats.batches_total else 0.,
+            "max_batch_size": stats.max_batch_size,
+            "mean_wait_ms": 1000. * stats.wait_seconds_total / stats.items_total if stats.items_total else 0.,
+            "max_wait_ms": 1000. * stats.max_wait_seconds,
+        }
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._worker is not None and not self._worker.done():
+            return
+        # the batcher outlives event loops (e.g. one per test client), bind to the current one
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._worker = loop.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            deadline = batch[0].enqueued_at + self._max_wait
+            while len(batch) < self._max_batch_size:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            while len(batch) < self._max_batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            await self._process(batch)
+
+    async def _process(self, batch: List[_PendingItem]):
+        started_at = time.perf_counter()
+        self._stats.record(len(batch), [started_at - pending.enqueued_at for pending in batch])
+        batch_timings: List[Tuple[str, str, float]] = []
+        error = None
+        try:
+            results = await self._loop.run_in_executor(
+                self._executor, self._run_batch, [pending.item for pending in batch], batch_timings
+            )
+            if len(results) != len(batch):
+                raise RuntimeError(f"Batch function returned {len(results)} results for {len(batch)} items")
+        except Exception as e:
+            error = e
+
+        # before the futures resolve, so the stages are in place when the callers' responses are sent
+        for pending in batch:
+            if pending.timings is not None:
+                pending.timings.extend(batch_timings)
+        if error is not None:
+            self._stats.failed_batches_total += 1
+            for pending in batch:
+                if not pending.future.done():
+                    pending.future.set_exception(error)
+            return
+
+        for pending, result in zip(batch, results):
+            if not pending.future.done():
+                pending.future.set_result(result)
+
+    def _run_batch(self, items: List[T], timings: List[Tuple[str, str, float]]) -> Sequence[R]:
+        # runs in the executor, outside the context of any caller
+        with collect_server_timings() as batch_timings:
+            try:
+                return self._batch_fn(items)
+            finally:
+                timings.extend(batch_timings)
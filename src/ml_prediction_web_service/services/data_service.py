@@ -0,0 +1,96 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator
+
+import pandas as pd
+
+from ml_prediction_web_service.components import AppComponents
+from ml_prediction_web_service.google_storage.tables import iter_table_chunks, write_parquet_chunks
+from ml_prediction_web_service.repository.model_repository import LocalModelRepository
+from ml_prediction_web_service.services.prediction_service import (
+    BAND_GAP_FEATURE_COLUMNS,
+    SITE_COLS,
+    predict_band_gap_for_frame
+)
+
+BULK_SCORING_CHUNK_SIZE = 10_000
+BAND_GAP_INPUT_COLUMNS = [
+    col for col in BAND_GAP_FEATURE_COLUMNS
+    if col not in ("r_A", "r_B", "r_C", "octahedral_factor", "tolerance_factor")
+]
+PREDICTED_BAND_GAP_COLUMN = "predicted_band_gap"
+
+
+def get_table_format(filename: str | None, file_format: str | None = None) -> str:
+    file_format = file_format or os.path.splitext(filename or "")[1].lstrip(".")
+    file_format = file_format.lower()
+    if file_format not in ("csv", "parquet"):
+        raise ValueError("Unsupported file format. Use 'csv' or 'parquet'.")
+    return file_format
+
+
+def score_band_gap_chunks(chunks: Iterable[pd.DataFrame], components: AppComponents) -> Iterator[pd.DataFrame]:
+    """
+    Add perovskite factors and the predicted band gap to every chunk of prepared composition rows.
+
+    Raises:
+        ValueError: If a chunk lacks the columns produced by `prepare_perovskites_composition_input`.
+    """
+    model = components.model_repository.get_band_gap_xgb_model()
+    for chunk in chunks:
+        missing = [col for col in BAND_GAP_INPUT_COLUMNS if col not in chunk.columns]
+        if missing:
+            raise ValueError(f"Input is missing columns: {missing}")
+        # empty slots are None in requests, readers give NaN (or an all-NaN float column)
+        for col in SITE_COLS:
+            if col in chunk.columns:
+                chunk[col] = chunk[col].astype(object).where(chunk[col].notna(), None)
+        chunk[PREDICTED_BAND_GAP_COLUMN] = predict_band_gap_for_frame(chunk, model)
+        yield chunk
+
+
+def serialize_chunks(chunks: Iterable[pd.DataFrame], output_format: str) -> Iterator[bytes]:
+    """
+    Serialize chunks as one CSV document (header on the first chunk only) or as NDJSON.
+    """
+    if output_format not in ("csv", "ndjson"):
+        raise ValueError("Unsupported output format. Use 'csv' or 'ndjson'.")
+    for i, chunk in enumerate(chunks):
+        if output_format == "csv":
+            yield chunk.to_csv(index=False, header=i == 0).encode("utf-8")
+        else:
+            yield chunk.to_json(orient="records", lines=True).rstrip("\n").encode("utf-8") + b"\n"
+
+
+_worker_components: AppComponents | None = None
+
+
+def _init_scoring_worker(models_path: str):
+    global _worker_components
+    _worker_components = AppComponents(model_repository=LocalModelRepository(models_path))
+    _worker_components.model_repository.get_band_gap_xgb_model()
+
+
+def _score_band_gap_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    return next(score_band_gap_chunks([chunk], _worker_components))
+
+
+def score_band_gap_chunks_parallel(
+        chunks: Iterable[pd.DataFrame], models_path: str, workers: int | None = None
+) -> Iterator[pd.DataFrame]:
+    """
+    Score chunks in a process pool, every worker loads the models once.
+    Chunks are yielded in input order and at most two chunks per worker are in flight.
+    """
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_scoring_worker, initargs=(models_path,)
+    ) as executor:
+        in_flight = deque()
+        for chunk in chunks:
+            in_flight.append(executor.submit(_score_band_gap_chunk, chunk))
+            if len(in_flight) >= 2 * workers:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
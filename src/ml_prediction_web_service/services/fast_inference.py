@@ -0,0 +1,232 @@
+import logging
+import math
+import weakref
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping
+
+import numpy as np
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from ml_prediction_web_service.entities.composition_batch import CompositionBatch
+from ml_prediction_web_service.entities.dictionary import Element
+from ml_prediction_web_service.entities.entities import BandGapPredictionRequest, PCET80PredictionRequest
+from ml_prediction_web_service.services.features.vectorized_features import calculate_composition_factors
+from ml_prediction_web_service.services.preparation import TS80_REQUEST_FIELDS, prepare_composition_batch
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+def _category_key(value: Any) -> Any:
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return _MISSING
+    return value
+
+
+@dataclass
+class _NumericColumn:
+    name: str
+    position: int
+    mean: float
+    scale: float
+
+
+@dataclass
+class _CategoricalColumn:
+    name: str
+    positions: Dict[Any, int]  # category -> output position
+    code_positions: np.ndarray | None  # element code -> output position, -1 if not a category
+
+
+class CompiledPipeline:
+    """
+    A fitted `ColumnTransformer(StandardScaler, OneHotEncoder) -> XGBRegressor` pipeline, compiled
+    into direct encoding of input columns into the float32 matrix the booster was trained on.
+
+    This skips DataFrame construction, column selection and the sklearn transformers:
+    inputs are column arrays keyed by the pipeline's input column names, element slot columns
+    may be given as element codes.
+    """
+
+    def __init__(
+            self,
+            numeric: List[_NumericColumn],
+            categorical: List[_CategoricalColumn],
+            n_features: int,
+            zeros_are_missing: bool,
+            booster: Any,
+            missing: float,
+    ):
+        self._numeric = numeric
+        self._categorical = categorical
+        self._n_features = n_features
+        self._zeros_are_missing = zeros_are_missing
+        self._booster = booster
+        self._missing = missing
+
+    @property
+    def booster(self) -> Any:
+        return self._booster
+
+    @property
+    def input_columns(self) -> List[str]:
+        return [column.name for column in self._numeric] + [column.name for column in self._categorical]
+
+    @classmethod
+    def from_sklearn(cls, pipeline: Pipeline) -> "CompiledPipeline":
+        """
+        Raises:
+            NotImplementedError: If the pipeline uses transformers other than StandardScaler/OneHotEncoder.
+        """
+        if not isinstance(pipeline, Pipeline) or len(pipeline.steps) != 2:
+            raise NotImplementedError("Expected a (preprocessor, regressor) pipeline")
+        preprocessor, regressor = pipeline.steps[0][1], pipeline.steps[1][1]
+        if not hasattr(preprocessor, "transformers_") or not hasattr(regressor, "get_booster"):
+            raise NotImplementedError("Expected a fitted ColumnTransformer and an XGBoost regressor")
+
+        numeric, categorical, position = [], [], 0
+        for name, transformer, columns in preprocessor.transformers_:
+            if transformer == "drop" or len(columns) == 0:
+                continue
+            step = cls._single_step(transformer)
+            if isinstance(step, StandardScaler):
+                for i, column in enumerate(columns):
+                    numeric.append(_NumericColumn(
+                        name=column, position=position,
+                        mean=float(step.mean_[i]) if step.with_mean else 0.,
+                        scale=float(step.scale_[i]) if step.with_std else 1.,
+                    ))
+                    position += 1
+            elif isinstance(step, OneHotEncoder):
+                if step.drop_idx_ is not None or getattr(step, "_infrequent_enabled", False):
+                    raise NotImplementedError("Dropped or infrequent one-hot categories are not supported")
+                for column, categories in zip(columns, step.categories_):
+                    positions = {_category_key(category): position + i for i, category in enumerate(categories)}
+                    categorical.append(_CategoricalColumn(
+                        name=column, positions=positions, code_positions=cls._code_positions(positions)
+                    ))
+                    position += len(categories)
+            else:
+                raise NotImplementedError(f"Unsupported transformer {type(step).__name__} in '{name}'")
+
+        return cls(
+            numeric=numeric,
+            categorical=categorical,
+            n_features=position,
+            zeros_are_missing=bool(preprocessor.sparse_output_),
+            booster=regressor.get_booster(),
+            missing=regressor.missing,
+        )
+
+    @staticmethod
+    def _single_step(transformer: Any) -> Any:
+        if isinstance(transformer, Pipeline):
+            if len(transformer.steps) != 1:
+                raise NotImplementedError("Only single-step column transformers are supported")
+            return transformer.steps[0][1]
+        return transformer
+
+    @staticmethod
+    def _code_positions(positions: Dict[Any, int]) -> np.ndarray | None:
+        names = [category for category in positions if category is not _MISSING]
+        if not names or not all(name in Element.code_by_name() for name in names):
+            return None
+        code_positions = np.full(max(element.code for element in Element) + 1, -1, dtype=np.int64)
+        code_positions[0] = positions.get(_MISSING, -1)
+        for name in names:
+            code_positions[Element.get_code_by_name(name)] = positions[name]
+        return code_positions
+
+    def encode(self, columns: Mapping[str, np.ndarray]) -> np.ndarray:
+        """
+        Encode column arrays into the booster's float32 feature matrix.
+        Element slot columns may hold int element codes (0 for empty) or element names.
+        """
+        n_rows = len(next(iter(columns.values())))
+        matrix = np.zeros((n_rows, self._n_features), dtype=np.float32)
+        for column in self._numeric:
+            values = np.asarray(columns[column.name], dtype=np.float64)
+            matrix[:, column.position] = (values - column.mean) / column.scale
+
+        rows = np.arange(n_rows)
+        for column in self._categorical:
+            values = np.asarray(columns[column.name])
+            if column.code_positions is not None and np.issubdtype(values.dtype, np.integer):
+                positions = column.code_positions[values]
+            else:
+                positions = np.fromiter(
+                    (column.positions.get(_category_key(value), -1) for value in values), dtype=np.int64, count=n_rows
+                )
+            known = positions >= 0
+            matrix[rows[known], positions[known]] = 1.
+
+        if self._zeros_are_missing:
+            # the booster was trained on sparse input, where absent entries are missing values
+            matrix[matrix == 0] = np.nan
+        return matrix
+
+    def predict(self, columns: Mapping[str, np.ndarray]) -> np.ndarray:
+        return self._booster.inplace_predict(self.encode(columns), missing=self._missing)
+
+
+_compiled_pipelines: "weakref.WeakKeyDictionary[Any, CompiledPipeline | None]" = weakref.WeakKeyDictionary()
+
+
+def get_compiled_pipeline(model: Any) -> CompiledPipeline | None:
+    """
+    Compiled form of `model`, built once per model object. None if the model can't be compiled.
+    """
+    try:
+        return _compiled_pipelines[model]
+    except KeyError:
+        pass
+    try:
+        compiled = CompiledPipeline.from_sklearn(model)
+    except NotImplementedError as e:
+        logger.warning("Falling back to DataFrame inference for %s: %s", type(model).__name__, e)
+        compiled = None
+    _compiled_pipelines[model] = compiled
+    return compiled
+
+
+def composition_columns(compositions: CompositionBatch) -> Dict[str, np.ndarray]:
+    """
+    Composition slot columns (element codes and fractions) with their perovskite factors.
+    """
+    columns = compositions.to_columns()
+    columns.update(calculate_composition_factors(compositions))
+    return columns
+
+
+def build_band_gap_columns(
+        requests: List[BandGapPredictionRequest],
+        compositions: CompositionBatch | None = None
+) -> Dict[str, np.ndarray]:
+    """
+    Column arrays of the band gap input schema, with element slots as element codes.
+    """
+    columns = composition_columns(compositions if compositions is not None else prepare_composition_batch(requests))
+    columns["space_group"] = np.array([request.space_group.nm for request in requests], dtype=object)
+    columns["composition_inorganic"] = np.array(
+        [request.inorganic_composition for request in requests], dtype=np.float64
+    )
+    columns["dimension_list_of_layers"] = np.array(
+        [request.dimension_list_of_layers for request in requests], dtype=np.float64
+    )
+    columns["dimension"] = np.array([request.dimension.nm for request in requests], dtype=object)
+    return columns
+
+
+def build_pce_t80_columns(
+        requests: List[PCET80PredictionRequest],
+        compositions: CompositionBatch | None = None
+) -> Dict[str, np.ndarray]:
+    """
+    Column arrays of the PCE T80 input schema, with element slots as element codes.
+    """
+    columns = composition_columns(compositions if compositions is not None else prepare_composition_batch(requests))
+    for name, get_value in TS80_REQUEST_FIELDS.items():
+        columns[name] = np.array([get_value(request) for request in requests], dtype=object)
+    return columns
@@ -0,0 +1,106 @@
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Mapping, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ml_prediction_web_service.entities.composition_batch import CompositionBatch
+from ml_prediction_web_service.entities.dictionary import Site
+from ml_prediction_web_service.entities.entities import SITE_SLOTS
+from ml_prediction_web_service.services.features.vectorized_features import (
+    calculate_composition_factors,
+    calculate_composition_formulas
+)
+
+ELEMENT_SLOT_COLUMNS = [f"{site.value}_{slot + 1}" for site in Site for slot in range(SITE_SLOTS[site])]
+FRACTION_COLUMNS = [f"{column}_coef" for column in ELEMENT_SLOT_COLUMNS]
+FACTOR_COLUMNS = ["r_A", "r_B", "r_C", "octahedral_factor", "tolerance_factor"]
+FORMULA_COLUMNS = ["composition_long_form", "composition_short_form"]
+
+# derived columns -> how to compute all of them from the batch's compositions
+_DERIVED_COLUMNS: List[Tuple[FrozenSet[str], Callable[[CompositionBatch], Dict[str, np.ndarray]]]] = [
+    (frozenset(ELEMENT_SLOT_COLUMNS + FRACTION_COLUMNS), CompositionBatch.to_columns),
+    (frozenset(FACTOR_COLUMNS), calculate_composition_factors),
+    (frozenset(FORMULA_COLUMNS), calculate_composition_formulas),
+]
+
+
+class FeatureContext:
+    """
+    Input columns of one batch, shared by every model that predicts it.
+
+    Columns derived from the compositions (element slots as codes, fractions, radii, perovskite
+    factors, formulas) are computed on first use and kept, so models chained on the same batch
+    don't compute them again. Request fields and predictions of earlier models are added with `set`.
+    """
+
+    def __init__(self, compositions: CompositionBatch, columns: Mapping[str, np.ndarray] | None = None):
+        self._compositions = compositions
+        self._columns: Dict[str, np.ndarray] = dict(columns or {})
+        self._element_names: Dict[str, np.ndarray] | None = None
+
+    def __len__(self) -> int:
+        return len(self._compositions)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._columns
+
+    @property
+    def compositions(self) -> CompositionBatch:
+        return self._compositions
+
+    def set(self, name: str, values: Any):
+        values = np.asarray(values)
+        if len(values) != len(self):
+            raise ValueError(f"Column '{name}' has {len(values)} values for {len(self)} rows")
+        self._columns[name] = values
+
+    def set_fields(self, sources: List[Any], fields: Mapping[str, Callable[[Any], Any]]):
+        """
+        Add a column per field, its values taken from the row's source (request or conditions) object.
+        """
+        for name, get_value in fields.items():
+            self.set(name, np.array([get_value(source) for source in sources], dtype=object))
+
+    def get(self, name: str) -> np.ndarray:
+        """
+        Raises:
+            KeyError: If the column was not set and can't be derived from the compositions.
+        """
+        values = self._columns.get(name)
+        if values is not None:
+            return values
+        for names, derive in _DERIVED_COLUMNS:
+            if name in names:
+                self._columns.update(derive(self._compositions))
+                return self._columns[name]
+        raise KeyError(f"No column '{name}' in the feature context")
+
+    def columns(self, names: Iterable[str]) -> Dict[str, np.ndarray]:
+        """
+        Column arrays of `names`, element slots as element codes.
+        """
+        return {name: self.get(name) for name in names}
+
+    def frame(self, names: Iterable[str]) -> pd.DataFrame:
+        """
+        DataFrame of `names` as the sklearn pipelines take it, element slots as element names.
+        """
+        data = {}
+        for name in names:
+            if name in ELEMENT_SLOT_COLUMNS:
+                if self._element_names is None:
+                    names_frame = self._compositions.to_frame()
+                    self._element_names = {column: names_frame[column].to_numpy() for column in ELEMENT_SLOT_COLUMNS}
+                data[name] = self._element_names[name]
+            else:
+                data[name] = self.get(name)
+        return pd.DataFrame(data)
+
+    def take(self, indices: np.ndarray) -> "FeatureContext":
+        """
+        Context of the rows `indices`, with the columns computed so far.
+        """
+        return FeatureContext(
+            self._compositions.take(indices),
+            {name: values[indices] for name, values in self._columns.items()}
+        )
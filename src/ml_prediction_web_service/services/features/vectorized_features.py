@@ -0,0 +1,133 @@
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from ml_prediction_web_service.entities.composition_batch import CompositionBatch
+from ml_prediction_web_service.entities.dictionary import Element, Site
+
+_ELEMENT_CODES = pd.Series(dict(Element.code_by_name()))
+
+
+def get_site_columns(df_input: pd.DataFrame, site: Site) -> List[str]:
+    return [col for col in df_input.columns if col.startswith(f"{site.value}_") and not col.endswith("_coef")]
+
+
+def get_element_codes(names: pd.Series) -> np.ndarray:
+    """
+    Maps a column of element names to element codes, 0 for empty slots.
+
+    Raises:
+        ValueError: If a name is not a known element.
+    """
+    codes = names.map(_ELEMENT_CODES)
+    unknown = names.notna() & codes.isna()
+    if unknown.any():
+        raise ValueError(f"No element found with name '{names[unknown].iloc[0]}'")
+    return codes.fillna(0).to_numpy(dtype=np.int16)
+
+
+def calculate_effective_radii(df_input: pd.DataFrame, site: Site) -> np.ndarray:
+    """
+    Vectorized version of `structure_features.calculate_effective_radii_for_site`
+    for all rows of `df_input` at once.
+
+    Returns:
+        np.ndarray: Effective radius of the site per row.
+    """
+    site_cols = get_site_columns(df_input, site)
+    if not site_cols:
+        return np.zeros(len(df_input), dtype=np.float64)
+    codes = np.column_stack([get_element_codes(df_input[site_col]) for site_col in site_cols])
+    coefs = np.column_stack([df_input[f"{site_col}_coef"].to_numpy(dtype=np.float64) for site_col in site_cols])
+    return effective_radii_from_codes(codes, coefs)
+
+
+def effective_radii_from_codes(codes: np.ndarray, coefs: np.ndarray) -> np.ndarray:
+    """
+    Effective site radius per row of (n, slots) element code and fraction arrays, code 0 is an empty slot.
+    """
+    ionic_radii = Element.property_table("ionic_radii")
+    r_eff = np.zeros(len(codes), dtype=np.float64)
+    for slot in range(codes.shape[1]):
+        r_eff += np.where(codes[:, slot] != 0, coefs[:, slot] / 3.0 * ionic_radii[codes[:, slot]], 0.)
+    return r_eff
+
+
+def compute_tolerance_factors(r_A_eff: np.ndarray, r_B: np.ndarray, r_C_eff: np.ndarray) -> np.ndarray:
+    """
+    Vectorized `calc_factors.compute_tolerance_factor`.
+    """
+    denominator = np.sqrt(2) * (r_B + r_C_eff)
+    result = np.full_like(denominator, np.inf, dtype=np.float64)
+    np.divide(r_A_eff + r_C_eff, denominator, out=result, where=(r_B + r_C_eff) != 0)
+    return result
+
+
+def compute_octahedral_factors(r_B: np.ndarray, r_C_eff: np.ndarray) -> np.ndarray:
+    """
+    Vectorized `calc_factors.compute_octahedral_factor`.
+    """
+    result = np.full_like(r_C_eff, np.inf, dtype=np.float64)
+    np.divide(r_B, r_C_eff, out=result, where=r_C_eff != 0)
+    return result
+
+
+def calculate_base_perovskite_factors(df_input: pd.DataFrame) -> pd.DataFrame:
+    """
+    Add effective site radii, octahedral and tolerance factors to `df_input` in one pass.
+    """
+    for site in Site:
+        df_input[f"r_{site.value}"] = calculate_effective_radii(df_input, site)
+    if df_input[["r_A", "r_B", "r_C"]].isnull().any().any():
+        raise ValueError("Could not compute effective radii")
+
+    r_a, r_b, r_c = (df_input[col].to_numpy() for col in ("r_A", "r_B", "r_C"))
+    df_input["octahedral_factor"] = compute_octahedral_factors(r_b, r_c)
+    df_input["tolerance_factor"] = compute_tolerance_factors(r_a, r_b, r_c)
+    return df_input
+
+
+def calculate_composition_factors(batch: CompositionBatch) -> Dict[str, np.ndarray]:
+    """
+    Effective site radii, octahedral and tolerance factors of every composition of `batch`,
+    without building a DataFrame.
+    """
+    r_a, r_b, r_c = (effective_radii_from_codes(batch.codes[site], batch.site_fractions(site)) for site in Site)
+    return {
+        "r_A": r_a, "r_B": r_b, "r_C": r_c,
+        "octahedral_factor": compute_octahedral_factors(r_b, r_c),
+        "tolerance_factor": compute_tolerance_factors(r_a, r_b, r_c),
+    }
+
+
+def calculate_composition_formulas(batch: CompositionBatch) -> Dict[str, np.ndarray]:
+    """
+    Long (`FA0.8MA0.2PbI3`) and short (`FAMAPbI`) formulas of every composition of `batch`.
+    Elements are sorted by name within a site, fractions of 1 are left out of the long form.
+    Repeated compositions are formatted once.
+    """
+    if len(batch) == 0:
+        return {"composition_long_form": np.empty(0, dtype=object), "composition_short_form": np.empty(0, dtype=object)}
+    keys = np.concatenate(
+        [np.concatenate([batch.codes[site], batch.site_fractions(site)], axis=1) for site in Site], axis=1
+    )
+    unique_keys, inverse = np.unique(keys, axis=0, return_inverse=True)
+    long_forms = np.empty(len(unique_keys), dtype=object)
+    short_forms = np.empty(len(unique_keys), dtype=object)
+    for i, key in enumerate(unique_keys):
+        long_form, short_form, offset = [], [], 0
+        for site in Site:
+            n_slots = batch.codes[site].shape[1]
+            codes, fractions = key[offset:offset + n_slots], key[offset + n_slots:offset + 2 * n_slots]
+            offset += 2 * n_slots
+            elements = sorted(
+                (Element.get_member_by_code(int(code)).nm, fraction)
+                for code, fraction in zip(codes, fractions) if code != 0
+            )
+            for name, fraction in elements:
+                short_form.append(name)
+                long_form.append(name if fraction == 1 else f"{name}{fraction:g}")
+        long_forms[i], short_forms[i] = "".join(long_form), "".join(short_form)
+    inverse = inverse.reshape(-1)
+    return {"composition_long_form": long_forms[inverse], "composition_short_form": short_forms[inverse]}
@@ -0,0 +1,117 @@
+import asyncio
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, TypeVar
+
+R = TypeVar("R")
+
+INFERENCE_WORKERS = min(4, os.cpu_count() or 1)
+INFERENCE_MAX_IN_FLIGHT = 256
+INFERENCE_RETRY_AFTER_SECONDS = 1.
+
+_EXHAUSTED = object()
+
+
+class InferenceOverloadedError(Exception):
+    def __init__(self, in_flight: int, retry_after_seconds: float):
+        super().__init__(f"Inference is overloaded, {in_flight} requests in flight")
+        self.in_flight = in_flight
+        self.retry_after_seconds = retry_after_seconds
+
+
+class _Admission:
+    def __init__(self, release: Callable[[], None]):
+        self._release = release
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._release()
+
+
+class InferenceExecutor:
+    """
+    Dedicated, sized thread pool for CPU-bound inference, kept apart from the server's default
+    threadpool so prediction bursts can't starve other routes.
+
+    Admission is bounded: at most `max_in_flight` admitted requests (queued or running) at once,
+    further requests are rejected immediately instead of queueing without limit.
+    """
+
+    def __init__(
+            self,
+            workers: int = INFERENCE_WORKERS,
+            max_in_flight: int = INFERENCE_MAX_IN_FLIGHT,
+            retry_after_seconds: float = INFERENCE_RETRY_AFTER_SECONDS,
+    ):
+        if workers < 1 or max_in_flight < 1:
+            raise ValueError(f"workers and max_in_flight must be positive, got {workers} and {max_in_flight}")
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="inference")
+        self._workers = workers
+        self._max_in_flight = max_in_flight
+        self._retry_after_seconds = retry_after_seconds
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._admitted_total = 0
+        self._rejected_total = 0
+
+    @property
+    def pool(self) -> ThreadPoolExecutor:
+        return self._pool
+
+    @property
+    def workers(self) -> int:
+        return self._workers
+
+    def admit(self) -> _Admission:
+        """
+        Admit one request, use the result as a context manager that releases the slot.
+
+        Raises:
+            InferenceOverloadedError: If `max_in_flight` requests are already admitted.
+        """
+        with self._lock:
+            if self._in_flight >= self._max_in_flight:
+                self._rejected_total += 1
+                raise InferenceOverloadedError(self._in_flight, self._retry_after_seconds)
+            self._in_flight += 1
+            self._admitted_total += 1
+        return _Admission(self._release)
+
+    def _release(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    async def run(self, fn: Callable[..., R], *args: Any, **kwargs: Any) -> R:
+        # carry the request's context variables (e.g. its Server-Timing collector) into the worker thread
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(
+            self._pool, partial(context.run, fn, *args, **kwargs)
+        )
+
+    async def iterate(self, iterator: Iterator[R]) -> AsyncIterator[R]:
+        """
+        Consume a CPU-bound iterator in the pool, one item per task.
+        """
+        while True:
+            item = await self.run(next, iterator, _EXHAUSTED)
+            if item is _EXHAUSTED:
+                return
+            yield item
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "workers": self._workers,
+                "in_flight": self._in_flight,
+                "max_in_flight": self._max_in_flight,
+                "admitted_total": self._admitted_total,
+                "rejected_total": self._rejected_total,
+            }
+
+    def shutdown(self, wait: bool = True):
+        self._pool.shutdown(wait=wait)
@@ -0,0 +1,197 @@
+import bisect
+import contextvars
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Mapping, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1., 2.5, 5., 10.)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 1024, 4096)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1., **labels: str):
+        key = tuple(str(labels[name]) for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(tuple(str(labels[name]) for name in self.label_names), 0.)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(
+            self, name: str, documentation: str, label_names: Sequence[str] = (),
+            buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: non-cumulative bucket counts (last one is +Inf), sum
+        self._series: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str):
+        key = tuple(str(labels[name]) for name in self.label_names)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = ([0] * (len(self.buckets) + 1), [0.])
+            series[0][index] += 1
+            series[1][0] += value
+
+    def count(self, **labels: str) -> int:
+        series = self._series.get(tuple(str(labels[name]) for name in self.label_names))
+        return sum(series[0]) if series is not None else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        label_names = self.label_names + ("le",)
+        with self._lock:
+            for key, (counts, total) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (math.inf,), counts):
+                    cumulative += count
+                    labels = _format_labels(label_names, key + (_format_value(bound),))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.label_names, key)
+                lines.append(f"{self.name}_sum{labels} {_format_value(total[0])}")
+                lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: List[Counter | Histogram] = []
+
+    def counter(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, documentation, label_names)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(
+            self, name: str, documentation: str, label_names: Sequence[str] = (),
+            buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        metric = Histogram(name, documentation, label_names, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(line for metric in self._metrics for line in metric.render()) + "\n"
+
+
+def render_gauge(
+        name: str, documentation: str, samples: Mapping[LabelValues, float], label_names: Sequence[str]
+) -> str:
+    """
+    Prometheus text of a gauge whose samples are read at scrape time (queue depths, cache sizes).
+    """
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} gauge"]
+    for key, value in samples.items():
+        lines.append(f"{name}{_format_labels(label_names, key)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "route", "status")
+)
+PREDICTION_STAGE_SECONDS = REGISTRY.histogram(
+    "prediction_stage_duration_seconds", "Latency of prediction pipeline stages", ("model", "stage")
+)
+PREDICTION_BATCH_SIZE = REGISTRY.histogram(
+    "prediction_batch_size", "Requests per model call", ("model",), buckets=BATCH_SIZE_BUCKETS
+)
+PREDICTION_ERRORS = REGISTRY.counter("prediction_errors_total", "Failed model calls", ("model",))
+PREDICTION_CACHE_LOOKUPS = REGISTRY.counter(
+    "prediction_cache_lookups_total", "Prediction cache lookups", ("model", "result")
+)
+MODEL_LOAD_SECONDS = REGISTRY.histogram(
+    "model_load_duration_seconds", "Time to load a model artifact into memory", ("model", "format")
+)
+
+# stage durations of the current request, set by the Server-Timing middleware
+_server_timings: contextvars.ContextVar[List[Tuple[str, str, float]] | None] = contextvars.ContextVar(
+    "server_timings", default=None
+)
+
+
+@contextmanager
+def observe_stage(model: str, stage: str) -> Iterator[None]:
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - started_at
+        PREDICTION_STAGE_SECONDS.observe(duration, model=model, stage=stage)
+        timings = _server_timings.get()
+        if timings is not None:
+            timings.append((stage, model, duration))
+
+
+@contextmanager
+def collect_server_timings() -> Iterator[List[Tuple[str, str, float]]]:
+    """
+    Collect the stages observed while handling one request,
+    including those run in executor threads the request's context is copied to.
+    """
+    timings: List[Tuple[str, str, float]] = []
+    token = _server_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _server_timings.reset(token)
+
+
+def current_server_timings() -> List[Tuple[str, str, float]] | None:
+    """
+    Stages collected for the current request, None outside one. Work done on its behalf outside
+    its context (e.g. in a shared micro-batch) reports its stages by extending this list.
+    """
+    return _server_timings.get()
+
+
+def format_server_timing(timings: List[Tuple[str, str, float]], total_seconds: float) -> str:
+    merged: Dict[Tuple[str, str], float] = {}
+    for stage, model, duration in timings:
+        merged[(stage, model)] = merged.get((stage, model), 0.) + duration
+    entries = [f'{stage};desc="{model}";dur={1000 * duration:.3f}' for (stage, model), duration in merged.items()]
+    entries.append(f"total;dur={1000 * total_seconds:.3f}")
+    return ", ".join(entries)
@@ -0,0 +1,88 @@
+import logging
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+
+from ml_prediction_web_service.components import AppComponents
+from ml_prediction_web_service.entities.entities import MultiTargetPredictionRequest, MultiTargetPredictionResponse
+from ml_prediction_web_service.entities.model_dictionary import SavedModelName
+from ml_prediction_web_service.services.features.feature_context import FeatureContext
+from ml_prediction_web_service.services.prediction_service import predict_from_context
+from ml_prediction_web_service.services.preparation import (
+    BAND_GAP_REQUEST_FIELDS,
+    DEVICE_CONDITION_FIELDS,
+    STABILITY_CONDITION_FIELDS,
+    prepare_composition_batch
+)
+
+logger = logging.getLogger(__name__)
+
+
+def predict_all_targets_service(
+        request: MultiTargetPredictionRequest,
+        components: AppComponents
+) -> MultiTargetPredictionResponse:
+    return predict_all_targets_batch_service([request], components)[0]
+
+
+def predict_all_targets_batch_service(
+        requests: List[MultiTargetPredictionRequest],
+        components: AppComponents
+) -> List[MultiTargetPredictionResponse]:
+    """
+    Predict the band gap of every request and feed it into the PCE T80 and JV PCE models,
+    for the requests that carry their conditions.
+
+    The composition features are computed once for the batch and shared by all three models.
+    """
+    context = FeatureContext(prepare_composition_batch(requests))
+    context.set_fields(requests, BAND_GAP_REQUEST_FIELDS)
+    band_gaps = predict_from_context(context, components, SavedModelName.BAND_GAP_XGB)
+    context.set("band_gap", band_gaps)
+
+    pce_t80, pce_t80_error = _predict_chained(
+        context, components, SavedModelName.PCE_T80_XGB,
+        [request.stability for request in requests], STABILITY_CONDITION_FIELDS
+    )
+    jv_pce, jv_pce_error = _predict_chained(
+        context, components, SavedModelName.JV_PCE_XGB,
+        [request.device for request in requests], DEVICE_CONDITION_FIELDS
+    )
+    return [
+        MultiTargetPredictionResponse(
+            band_gap=float(band_gap),
+            pce_t80=None if np.isnan(t80) else float(t80),
+            jv_pce=None if np.isnan(jv) else float(jv),
+            errors={
+                **({"pce_t80": pce_t80_error} if pce_t80_error and request.stability is not None else {}),
+                **({"jv_pce": jv_pce_error} if jv_pce_error and request.device is not None else {}),
+            },
+        )
+        for request, band_gap, t80, jv in zip(requests, band_gaps, pce_t80, jv_pce)
+    ]
+
+
+def _predict_chained(
+        context: FeatureContext,
+        components: AppComponents,
+        model_name: SavedModelName,
+        conditions: List[Any | None],
+        fields: Dict[str, Callable[[Any], Any]]
+) -> Tuple[np.ndarray, str | None]:
+    """
+    Predictions of `model_name` for the rows with `conditions`, NaN for the others.
+    A missing model artifact leaves every row NaN and is returned as the error, the band gap
+    and the other chained targets are still answered.
+    """
+    results = np.full(len(context), np.nan)
+    indices = np.array([i for i, row in enumerate(conditions) if row is not None], dtype=np.int64)
+    if len(indices) == 0:
+        return results, None
+    rows = context if len(indices) == len(context) else context.take(indices)
+    rows.set_fields([conditions[i] for i in indices], fields)
+    try:
+        results[indices] = predict_from_context(rows, components, model_name)
+    except FileNotFoundError as e:
+        logger.warning("Model %s is not available: %s", model_name.name, e)
+        return results, f"Model {model_name.name} is not available"
+    return results, None
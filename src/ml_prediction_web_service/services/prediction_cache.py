@@ -0,0 +1,116 @@
+import threading
+import time
+from collections import OrderedDict
+from enum import Enum
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from pydantic import BaseModel
+
+from ml_prediction_web_service.entities.dictionary import Site
+from ml_prediction_web_service.entities.entities import PerovskiteComposition
+
+PREDICTION_CACHE_SIZE = 100_000
+PREDICTION_CACHE_TTL_SECONDS = 3600.
+PREDICTION_CACHE_FRACTION_TOLERANCE = 1e-3
+
+
+def _freeze(value: Any) -> Hashable:
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, Enum):
+        return value.name
+    return value
+
+
+def canonicalize_composition(composition: PerovskiteComposition, fraction_tolerance: float) -> Tuple:
+    """
+    Order-independent form of a composition: per site, fractions of the same element are merged,
+    elements are sorted by name and fractions are rounded to multiples of `fraction_tolerance`.
+    """
+    canonical = []
+    for site in Site:
+        fractions: Dict[str, float] = {}
+        for element_fraction in getattr(composition, f"{site.value}_site"):
+            name = element_fraction.name.nm
+            fractions[name] = fractions.get(name, 0.) + element_fraction.frequence
+        canonical.append(tuple(
+            (name, round(fraction / fraction_tolerance)) for name, fraction in sorted(fractions.items())
+        ))
+    return tuple(canonical)
+
+
+class PredictionCache:
+    """
+    Thread-safe LRU cache of predictions with a per-entry TTL.
+    Keys include the model version, so entries of a replaced model are never hit again and age out.
+    """
+
+    def __init__(
+            self,
+            max_size: int = PREDICTION_CACHE_SIZE,
+            ttl_seconds: float = PREDICTION_CACHE_TTL_SECONDS,
+            fraction_tolerance: float = PREDICTION_CACHE_FRACTION_TOLERANCE,
+            clock: Callable[[], float] = time.monotonic,
+    ):
+        self._max_size = max_size
+        self._ttl_seconds = ttl_seconds
+        self._fraction_tolerance = fraction_tolerance
+        self._clock = clock
+        self._entries: OrderedDict[Hashable, Tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def make_key(self, request: BaseModel, model_version: str | None) -> Hashable:
+        fields = request.model_dump(exclude={"perovskite_composition"})
+        return (
+            type(request).__name__,
+            model_version,
+            canonicalize_composition(request.perovskite_composition, self._fraction_tolerance),
+            _freeze(fields),
+        )
+
+    def get(self, key: Hashable) -> float | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                self._expirations += 1
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def put(self, key: Hashable, value: float):
+        with self._lock:
+            self._entries[key] = (self._clock() + self._ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._entries),
+                "max_size": self._max_size,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "hit_ratio": self._hits / lookups if lookups else 0.,
+            }
@@ -1,65 +1,375 @@
-from typing import Dict
+from typing import Any, Callable, Dict, List
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+from pydantic import BaseModel, ValidationError
 
 from ml_prediction_web_service.components import AppComponents
+from ml_prediction_web_service.entities.model_dictionary import SavedModelName
 from ml_prediction_web_service.services.preparation import (
-    prepare_perovskites_composition_input,
-    prepare_ts80_prediction_df
+    JV_REQUEST_FIELDS,
+    prepare_composition_batch,
+    prepare_perovskites_composition_batch_input,
+    prepare_ts80_prediction_batch_df
 )
-from ml_prediction_web_service.entities.dictionary import Site
-from ml_prediction_web_service.entities.entities import BandGapPredictionRequest, PCET80PredictionRequest
-from ml_prediction_web_service.services.features import structure_features
-from ml_prediction_web_service.services.features.calc_factors import compute_octahedral_factor, compute_tolerance_factor
+from ml_prediction_web_service.entities.entities import (
+    BandGapBatchItemResult,
+    BandGapBatchPredictionResponse,
+    BandGapPredictionRequest,
+    JVPCEPredictionRequest,
+    PCET80PredictionRequest
+)
+from ml_prediction_web_service.services.batch_parsing import (
+    ParsedBandGapBatch,
+    format_validation_error,
+    parse_band_gap_items,
+    parse_band_gap_table
+)
+from ml_prediction_web_service.services.fast_inference import (
+    build_band_gap_columns,
+    build_pce_t80_columns,
+    composition_columns,
+    get_compiled_pipeline
+)
+from ml_prediction_web_service.services.features import vectorized_features
+from ml_prediction_web_service.services.features.feature_context import FeatureContext
+from ml_prediction_web_service.services.metrics import (
+    PREDICTION_BATCH_SIZE,
+    PREDICTION_CACHE_LOOKUPS,
+    PREDICTION_ERRORS,
+    observe_stage
+)
+from ml_prediction_web_service.services.tree_evaluator import get_tree_ensemble
+
+PREDICTION_ENGINE_ARRAY = "array"
+PREDICTION_ENGINE_TREES = "trees"
+PREDICTION_ENGINE_DATAFRAME = "dataframe"
+PREDICTION_ENGINES = (PREDICTION_ENGINE_ARRAY, PREDICTION_ENGINE_TREES, PREDICTION_ENGINE_DATAFRAME)
+# batch payloads from this size on are parsed into arrays instead of one request model per item
+BATCH_FAST_PARSE_MIN_ITEMS = 64
 
 SITE_COLS = ["A_1", "A_2", "A_3", "B_1", "B_2", "C_1", "C_2", "C_3"]
+BAND_GAP_FEATURE_COLUMNS = [
+    "composition_inorganic", "A_1", "A_2", "A_3", "A_1_coef", "A_2_coef", "A_3_coef", "B_1", "B_2", "B_1_coef",
+    "B_2_coef", "C_1", "C_2", "C_3", "C_1_coef", "C_2_coef", "C_3_coef", "r_A", "r_B", "r_C", "octahedral_factor",
+    "tolerance_factor", "space_group", "dimension_list_of_layers", "dimension"
+]
 
 
 def _calculate_base_perovskite_factors(df_input: pd.DataFrame) -> pd.DataFrame:
-    for site in Site:
-        df_input[f"r_{site.value}"] = df_input.apply(
-            lambda row: structure_features.calculate_effective_radii_for_site(row, site), axis=1
-        )
-    if df_input[["r_A", "r_B", "r_C"]].isnull().any().any():
-        raise ValueError("Could not compute effective radii")
-
-    df_input["octahedral_factor"] = df_input.apply(
-        lambda row: compute_octahedral_factor(
-            row["r_B"], row["r_C"]
-        ), axis=1
-    )
-    df_input["tolerance_factor"] = df_input.apply(
-        lambda row: compute_tolerance_factor(
-            row["r_A"], row["r_B"], row["r_C"]
-        ), axis=1
-    )
-    return df_input
+    return vectorized_features.calculate_base_perovskite_factors(df_input)
+
+
+def predict_band_gap_for_frame(df_input: pd.DataFrame, model: Any) -> np.ndarray:
+    """
+    Compute perovskite factors for prepared rows and predict their band gaps with a single `predict` call.
+    """
+    model_label = SavedModelName.BAND_GAP_XGB.name
+    with observe_stage(model_label, "factors"):
+        df_input = _calculate_base_perovskite_factors(df_input)
+    with observe_stage(model_label, "predict"):
+        return model.predict(df_input[BAND_GAP_FEATURE_COLUMNS])
+
+
+def warm_up_models(components: AppComponents):
+    """
+    Build the configured engine's compiled forms of every loaded model, so the first requests don't pay for it.
+    """
+    repository = components.model_repository
+    for model_name in SavedModelName:
+        if repository.get_model_version(model_name) is not None:
+            get_engine_predictor(components, repository.get_model(model_name))
 
 
 def predict_band_gap_service(
         request: BandGapPredictionRequest,
         components: AppComponents
-) -> Dict[str, float]:
-    df_input = prepare_perovskites_composition_input(request)
-    df_input = _calculate_base_perovskite_factors(df_input)
-    df_input = df_input[
-        ["composition_inorganic", "A_1", "A_2", "A_3", "A_1_coef", "A_2_coef", "A_3_coef", "B_1", "B_2", "B_1_coef",
-         "B_2_coef", "C_1", "C_2", "C_3", "C_1_coef", "C_2_coef", "C_3_coef", "r_A", "r_B", "r_C", "octahedral_factor",
-         "tolerance_factor", "space_group", "dimension_list_of_layers", "dimension"]
+) -> float:
+    return float(predict_band_gap_batch([request], components)[0])
+
+
+def predict_band_gap_batch(
+        requests: List[BandGapPredictionRequest],
+        components: AppComponents
+) -> np.ndarray:
+    model_label = SavedModelName.BAND_GAP_XGB.name
+
+    def predict_fn(missed: List[BandGapPredictionRequest], model: Any) -> np.ndarray:
+        predict_columns = get_engine_predictor(components, model)
+        if predict_columns is not None:
+            with observe_stage(model_label, "prepare"):
+                columns = build_band_gap_columns(missed)
+            with observe_stage(model_label, "predict"):
+                return predict_columns(columns)
+        with observe_stage(model_label, "prepare"):
+            df_input = prepare_perovskites_composition_batch_input(missed)
+        return predict_band_gap_for_frame(df_input, model)
+
+    return _predict_with_cache(requests, components, SavedModelName.BAND_GAP_XGB, predict_fn)
+
+
+def get_engine_predictor(
+        components: AppComponents,
+        model: Any
+) -> Callable[[Dict[str, np.ndarray]], np.ndarray] | None:
+    """
+    Column-array predictor of `model` for the configured engine, None if the DataFrame path has to be used.
+    The "trees" engine falls back to the booster when the ensemble can't be flattened.
+    """
+    if components.prediction_engine == PREDICTION_ENGINE_DATAFRAME:
+        return None
+    compiled = get_compiled_pipeline(model)
+    if compiled is None:
+        return None
+    if components.prediction_engine == PREDICTION_ENGINE_TREES:
+        ensemble = get_tree_ensemble(compiled.booster)
+        if ensemble is not None:
+            return lambda columns: ensemble.predict(compiled.encode(columns))
+    return compiled.predict
+
+
+def _predict_with_cache(
+        requests: List[BaseModel],
+        components: AppComponents,
+        model_name: SavedModelName,
+        predict_fn: Callable[[List[BaseModel], Any], np.ndarray]
+) -> np.ndarray:
+    """
+    Serve cached predictions and run `predict_fn` only for the requests that missed the cache.
+    """
+    model_label = model_name.name
+    PREDICTION_BATCH_SIZE.observe(len(requests), model=model_label)
+    repository = components.model_repository
+    cache = components.prediction_cache
+    if cache is None:
+        with observe_stage(model_label, "model_fetch"):
+            model = repository.get_model(model_name)
+        return _call_predict_fn(predict_fn, requests, model, model_label)
+
+    # read the version before taking the model, a concurrent reload then can't store old predictions under a new key
+    with observe_stage(model_label, "model_fetch"):
+        repository.get_model(model_name)
+        model_version = repository.get_model_version(model_name)
+        model = repository.get_model(model_name)
+
+    keys = [cache.make_key(request, model_version) for request in requests]
+    results = np.empty(len(requests), dtype=np.float64)
+    missed = []
+    for i, key in enumerate(keys):
+        cached = cache.get(key)
+        if cached is None:
+            missed.append(i)
+        else:
+            results[i] = cached
+    PREDICTION_CACHE_LOOKUPS.inc(len(requests) - len(missed), model=model_label, result="hit")
+    PREDICTION_CACHE_LOOKUPS.inc(len(missed), model=model_label, result="miss")
+    if missed:
+        predictions = _call_predict_fn(predict_fn, [requests[i] for i in missed], model, model_label)
+        for i, prediction in zip(missed, predictions):
+            results[i] = prediction
+            cache.put(keys[i], float(prediction))
+    return results
+
+
+def _call_predict_fn(
+        predict_fn: Callable[[Any, Any], np.ndarray],
+        requests: List[BaseModel] | ParsedBandGapBatch | FeatureContext,
+        model: Any,
+        model_label: str
+) -> np.ndarray:
+    try:
+        return predict_fn(requests, model)
+    except Exception:
+        PREDICTION_ERRORS.inc(model=model_label)
+        raise
+
+
+def predict_band_gap_batch_service(
+        items: List[Dict[str, Any]],
+        components: AppComponents
+) -> BandGapBatchPredictionResponse:
+    """
+    Validate every item separately and predict all valid ones at once.
+    Invalid items get an error in their result instead of failing the whole batch.
+    Large batches are parsed into arrays and skip the prediction cache.
+    """
+    if len(items) >= BATCH_FAST_PARSE_MIN_ITEMS:
+        return _predict_band_gap_items_parsed(items, components)
+    results = [BandGapBatchItemResult(index=index) for index in range(len(items))]
+    valid_requests, valid_indices = [], []
+    with observe_stage(SavedModelName.BAND_GAP_XGB.name, "validation"):
+        for index, item in enumerate(items):
+            try:
+                valid_requests.append(BandGapPredictionRequest.model_validate(item))
+            except ValidationError as e:
+                results[index].error = format_validation_error(e)
+                continue
+            valid_indices.append(index)
+
+    if valid_requests:
+        band_gaps = predict_band_gap_batch(valid_requests, components)
+        for index, band_gap in zip(valid_indices, band_gaps):
+            results[index].band_gap = float(band_gap)
+    return BandGapBatchPredictionResponse(results=results)
+
+
+def _predict_band_gap_items_parsed(
+        items: List[Any],
+        components: AppComponents
+) -> BandGapBatchPredictionResponse:
+    model_label = SavedModelName.BAND_GAP_XGB.name
+    with observe_stage(model_label, "validation"):
+        parsed = parse_band_gap_items(items)
+    band_gaps = predict_band_gap_parsed(parsed, components) if len(parsed) else np.empty(0)
 
-    ]
-    model = components.model_repository.get_band_gap_xgb_model()
-    return model.predict(df_input)[0]
+    results = [BandGapBatchItemResult(index=index) for index in range(len(items))]
+    for index, error in parsed.errors.items():
+        results[index].error = error
+    for index, band_gap in zip(parsed.indices.tolist(), band_gaps.tolist()):
+        results[index].band_gap = band_gap
+    return BandGapBatchPredictionResponse(results=results)
+
+
+def predict_band_gap_table_service(table: pa.Table, components: AppComponents) -> pa.Table:
+    """
+    Predict the rows of a columnar band gap request (prepared input columns, see `parse_band_gap_table`).
+    Returns a table with a row per input row: `index`, `band_gap` (null for invalid rows) and `error`.
+
+    Raises:
+        ValueError: If the table is missing a request column or a column has an unusable type.
+    """
+    with observe_stage(SavedModelName.BAND_GAP_XGB.name, "validation"):
+        parsed = parse_band_gap_table(table)
+    band_gaps = np.full(table.num_rows, np.nan)
+    if len(parsed):
+        band_gaps[parsed.indices] = predict_band_gap_parsed(parsed, components)
+    errors = [parsed.errors.get(index) for index in range(table.num_rows)]
+    return pa.table({
+        "index": pa.array(np.arange(table.num_rows, dtype=np.int64)),
+        "band_gap": pa.array(band_gaps, from_pandas=True),
+        "error": pa.array(errors, type=pa.string()),
+    })
+
+
+def band_gap_response_from_table(table: pa.Table) -> BandGapBatchPredictionResponse:
+    return BandGapBatchPredictionResponse(
+        results=[BandGapBatchItemResult(**row) for row in table.to_pylist()]
+    )
+
+
+def band_gap_response_to_table(response: BandGapBatchPredictionResponse) -> pa.Table:
+    return pa.table({
+        "index": pa.array([result.index for result in response.results], type=pa.int64()),
+        "band_gap": pa.array([result.band_gap for result in response.results], type=pa.float64()),
+        "error": pa.array([result.error for result in response.results], type=pa.string()),
+    })
+
+
+def predict_band_gap_parsed(
+        parsed: ParsedBandGapBatch,
+        components: AppComponents
+) -> np.ndarray:
+    """
+    Band gaps of the rows of `parsed`, straight from its arrays.
+    """
+    model_label = SavedModelName.BAND_GAP_XGB.name
+    PREDICTION_BATCH_SIZE.observe(len(parsed), model=model_label)
+    with observe_stage(model_label, "model_fetch"):
+        model = components.model_repository.get_model(SavedModelName.BAND_GAP_XGB)
+
+    def predict_fn(batch: ParsedBandGapBatch, model: Any) -> np.ndarray:
+        predict_columns = get_engine_predictor(components, model)
+        if predict_columns is not None:
+            with observe_stage(model_label, "prepare"):
+                columns = composition_columns(batch.compositions)
+                columns.update(batch.columns())
+            with observe_stage(model_label, "predict"):
+                return predict_columns(columns)
+        with observe_stage(model_label, "prepare"):
+            df_input = batch.compositions.to_frame()
+            for name, values in batch.columns().items():
+                df_input[name] = values
+        return predict_band_gap_for_frame(df_input, model)
+
+    return _call_predict_fn(predict_fn, parsed, model, model_label)
 
 
 def predict_pce_t80_service(
         request: PCET80PredictionRequest,
         components: AppComponents
-) -> Dict[str, float]:
-    df_input = prepare_ts80_prediction_df(request)
-    df_input = _calculate_base_perovskite_factors(df_input)
-    df_input = df_input[
-        []
-    ]
-    model = components.model_repository.get_pce_t80_xgb_model()
-    return model.predict(df_input)[0]
+) -> float:
+    return float(predict_pce_t80_batch([request], components)[0])
+
+
+def predict_pce_t80_batch(
+        requests: List[PCET80PredictionRequest],
+        components: AppComponents
+) -> np.ndarray:
+    model_label = SavedModelName.PCE_T80_XGB.name
+
+    def predict_fn(missed: List[PCET80PredictionRequest], model: Any) -> np.ndarray:
+        predict_columns = get_engine_predictor(components, model)
+        if predict_columns is not None:
+            with observe_stage(model_label, "prepare"):
+                columns = build_pce_t80_columns(missed)
+            with observe_stage(model_label, "predict"):
+                return predict_columns(columns)
+        return _predict_pce_t80(missed, model)
+
+    return _predict_with_cache(requests, components, SavedModelName.PCE_T80_XGB, predict_fn)
+
+
+def _predict_pce_t80(requests: List[PCET80PredictionRequest], model: Any) -> np.ndarray:
+    model_label = SavedModelName.PCE_T80_XGB.name
+    with observe_stage(model_label, "prepare"):
+        df_input = prepare_ts80_prediction_batch_df(requests)
+    with observe_stage(model_label, "factors"):
+        df_input = _calculate_base_perovskite_factors(df_input)
+    with observe_stage(model_label, "predict"):
+        return model.predict(df_input[list(model.feature_names_in_)])
+
+
+def predict_jv_pce_service(
+        request: JVPCEPredictionRequest,
+        components: AppComponents
+) -> float:
+    return float(predict_jv_pce_batch([request], components)[0])
+
+
+def predict_jv_pce_batch(
+        requests: List[JVPCEPredictionRequest],
+        components: AppComponents
+) -> np.ndarray:
+    context = FeatureContext(prepare_composition_batch(requests))
+    context.set_fields(requests, JV_REQUEST_FIELDS)
+    return predict_from_context(context, components, SavedModelName.JV_PCE_XGB)
+
+
+def predict_from_context(
+        context: FeatureContext,
+        components: AppComponents,
+        model_name: SavedModelName
+) -> np.ndarray:
+    """
+    Predict the rows of `context` with `model_name`, its input columns taken from the context.
+    Derived columns the model needs are computed once and stay in the context for the next model.
+    """
+    model_label = model_name.name
+    PREDICTION_BATCH_SIZE.observe(len(context), model=model_label)
+    with observe_stage(model_label, "model_fetch"):
+        model = components.model_repository.get_model(model_name)
+
+    def predict_fn(context: FeatureContext, model: Any) -> np.ndarray:
+        predict_columns = get_engine_predictor(components, model)
+        if predict_columns is not None:
+            with observe_stage(model_label, "prepare"):
+                columns = context.columns(get_compiled_pipeline(model).input_columns)
+            with observe_stage(model_label, "predict"):
+                return predict_columns(columns)
+        with observe_stage(model_label, "prepare"):
+            df_input = context.frame(model.feature_names_in_)
+        with observe_stage(model_label, "predict"):
+            return model.predict(df_input)
+
+    return _call_predict_fn(predict_fn, context, model, model_label)
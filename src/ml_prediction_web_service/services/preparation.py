@@ -1,66 +1,106 @@
-from typing import Any, Dict
+from typing import Any, Callable, Dict, List
 
 import pandas as pd
 
+from ml_prediction_web_service.entities.composition_batch import CompositionBatch
 from ml_prediction_web_service.entities.dictionary import (
     Site
 )
 from ml_prediction_web_service.entities.entities import (
+    SITE_SLOTS,
+    DeviceConditions,
+    JVPCEPredictionRequest,
     PerovskiteComposition,
     PCET80PredictionRequest,
     BandGapPredictionRequest,
+    StabilityConditions,
 )
 
+# input column -> value of the PCE T80 model's stability conditions
+STABILITY_CONDITION_FIELDS: Dict[str, Callable[[StabilityConditions], Any]] = {
+    "cell_architecture": lambda conditions: conditions.cell_architecture.nm,
+    "ETL_stack_sequence": lambda conditions: conditions.etl_stack_sequence.nm,
+    "backcontact_stack_sequence": lambda conditions: conditions.backcontact.nm,
+    "stability_time_total_exposure": lambda conditions: conditions.stability_time_total_exposure,
+    "stability_light_intensity": lambda conditions: conditions.stability_light_intensity,
+    "stability_protocol": lambda conditions: conditions.stability_protocol,  # TODO to enums
+    "PCE_initial": lambda conditions: conditions.pce_initial,
+    "cell_area_measured": lambda conditions: conditions.cell_area,
+    "encapsulation": lambda conditions: conditions.encapsulation,
+    "stability_temperature_start": lambda conditions: conditions.temperature_range.temperature_start,
+    "stability_temperature_end": lambda conditions: conditions.temperature_range.temperature_end,
+}
+# input column -> request value of the PCE T80 model, besides the composition columns
+TS80_REQUEST_FIELDS: Dict[str, Callable[[PCET80PredictionRequest], Any]] = {
+    **STABILITY_CONDITION_FIELDS,
+    "band_gap": lambda request: request.band_gap,
+    "dimension_list_of_layers": lambda request: request.dimension_list_of_layers,
+}
+# input column -> value of the JV PCE model's device conditions, None for unknown values
+DEVICE_CONDITION_FIELDS: Dict[str, Callable[[DeviceConditions], Any]] = {
+    "Cell_architecture": lambda conditions: conditions.cell_architecture.nm,
+    "Perovskite_thickness": lambda conditions: conditions.perovskite_thickness,
+    "ETL_thickness": lambda conditions: conditions.etl_thickness,
+    "HTL_thickness": lambda conditions: conditions.htl_thickness,
+    "Perovskite_deposition_thermal_annealing_temperature": lambda conditions: conditions.annealing_temperature,
+    "Perovskite_deposition_solvents": lambda conditions: conditions.deposition_solvents,
+    "JV_hysteresis_index": lambda conditions: conditions.jv_hysteresis_index,
+}
+# input column -> request value of the band gap model, besides the composition columns
+BAND_GAP_REQUEST_FIELDS: Dict[str, Callable[[BandGapPredictionRequest], Any]] = {
+    "space_group": lambda request: request.space_group.nm,
+    "composition_inorganic": lambda request: float(request.inorganic_composition),
+    "dimension_list_of_layers": lambda request: request.dimension_list_of_layers,
+    "dimension": lambda request: request.dimension.nm,
+}
+# input column -> request value of the JV PCE model, besides the composition columns
+JV_REQUEST_FIELDS: Dict[str, Callable[[JVPCEPredictionRequest], Any]] = {
+    **DEVICE_CONDITION_FIELDS,
+    "composition_inorganic": lambda request: float(request.inorganic_composition),
+    "band_gap": lambda request: request.band_gap,
+    "dimension_list_of_layers": lambda request: request.dimension_list_of_layers,
+    "dimension": lambda request: request.dimension.nm,
+}
 
-def _create_features_df(composition_entity: PerovskiteComposition) -> Dict[str, Any]:
-    features = {
-        "A_1": None, "A_2": None, "A_3": None,
-        "A_1_coef": 0, "A_2_coef": 0, "A_3_coef": 0,
-        "B_1": None, "B_2": None,
-        "B_1_coef": 0, "B_2_coef": 0,
-        "C_1": None, "C_2": None, "C_3": None,
-        "C_1_coef": 0, "C_2_coef": 0, "C_3_coef": 0
-    }
 
-    def __fill_site(site_list, prefix, max_count):
-        for i, element_fraction in enumerate(site_list[:max_count], start=1):
-            features[f"{prefix}_{i}"] = element_fraction.name.nm
-            features[f"{prefix}_{i}_coef"] = element_fraction.frequence
-
-    __fill_site(composition_entity.A_site, Site.A.value, 3)
-    __fill_site(composition_entity.B_site, Site.B.value, 2)
-    __fill_site(composition_entity.C_site, Site.C.value, 3)
+def prepare_perovskites_composition_input(request: BandGapPredictionRequest) -> pd.DataFrame:
+    return prepare_perovskites_composition_batch_input([request])
 
-    return features
 
+def prepare_composition_batch(
+        requests: List[BandGapPredictionRequest | PCET80PredictionRequest | JVPCEPredictionRequest]
+) -> CompositionBatch:
+    return CompositionBatch.from_compositions(request.perovskite_composition for request in requests)
 
-def prepare_perovskites_composition_input(request: BandGapPredictionRequest) -> pd.DataFrame:
-    composition_entity: PerovskiteComposition = request.perovskite_composition
-    features = _create_features_df(composition_entity)
-    df = pd.DataFrame([features])
 
-    df["space_group"] = request.space_group.nm
-    df["composition_inorganic"] = request.inorganic_composition
-    df["dimension_list_of_layers"] = request.dimension_list_of_layers
-    df["dimension"] = request.dimension.nm
-    return df
+def prepare_perovskites_composition_batch_input(
+        requests: List[BandGapPredictionRequest],
+        compositions: CompositionBatch | None = None
+) -> pd.DataFrame:
+    """
+    Build one input DataFrame, a row per request. The composition columns come from `compositions`
+    when the caller already holds the requests' CompositionBatch.
+    """
+    df_input = (compositions if compositions is not None else prepare_composition_batch(requests)).to_frame()
+    df_input["space_group"] = [request.space_group.nm for request in requests]
+    df_input["composition_inorganic"] = [request.inorganic_composition for request in requests]
+    df_input["dimension_list_of_layers"] = [request.dimension_list_of_layers for request in requests]
+    df_input["dimension"] = [request.dimension.nm for request in requests]
+    return df_input
 
 
 def prepare_ts80_prediction_df(request: PCET80PredictionRequest) -> pd.DataFrame:
-    composition_entity: PerovskiteComposition = request.perovskite_composition
-    features = _create_features_df(composition_entity)
-    df = pd.DataFrame([features])
-    df["cell_architecture"] = request.cell_architecture.nm
-    df["etl_stack_sequence"] = request.etl_stack_sequence.nm
-    df["backcontact_stack_sequence"] = request.backcontact_stack_sequence.nm
-    df["stability_time_total_exposure"] = request.stability_time_total_exposure
-    df["stability_light_intensity"] = request.stability_light_intensity
-    df["stability_protocol"] = request.stability_protocol # TODO to enums
-    df["PCE_initial"] = request.pce_initial
-    df["cell_area_measured"] = request.cell_area_measured
-    df["encapsulation"] = request.encapsulation
-    df["band_gap"] = request.band_gap
-    df["dimension_list_of_layers"] = request.dimension_list_of_layers
-    df["stability_temperature_start"] = request.stability_temperature_start
-    df["stability_temperature_end"] = request.stability_temperature_end
-    return df
+    return prepare_ts80_prediction_batch_df([request])
+
+
+def prepare_ts80_prediction_batch_df(
+        requests: List[PCET80PredictionRequest],
+        compositions: CompositionBatch | None = None
+) -> pd.DataFrame:
+    """
+    Build one input DataFrame, a row per request, see `prepare_perovskites_composition_batch_input`.
+    """
+    df_input = (compositions if compositions is not None else prepare_composition_batch(requests)).to_frame()
+    for column, get_value in TS80_REQUEST_FIELDS.items():
+        df_input[column] = [get_value(request) for request in requests]
+    return df_input
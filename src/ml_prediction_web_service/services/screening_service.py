@@ -0,0 +1,222 @@
+import heapq
+from dataclasses import dataclass
+from itertools import combinations
+from typing import Any, Dict, Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ml_prediction_web_service.components import AppComponents
+from ml_prediction_web_service.entities.dictionary import Element, Site
+from ml_prediction_web_service.entities.entities import BandGapScreeningRequest, SITE_FRACTION_TOTALS
+from ml_prediction_web_service.entities.model_dictionary import SavedModelName
+from ml_prediction_web_service.services.features.vectorized_features import (
+    compute_octahedral_factors,
+    compute_tolerance_factors
+)
+from ml_prediction_web_service.services.metrics import observe_stage
+from ml_prediction_web_service.services.prediction_service import BAND_GAP_FEATURE_COLUMNS, get_engine_predictor
+from ml_prediction_web_service.services.preparation import SITE_SLOTS
+
+SiteComposition = Tuple[Tuple[Element, float], ...]
+
+
+@dataclass
+class SiteCandidates:
+    """
+    All compositions enumerated for one site, as slot-padded arrays.
+    """
+    compositions: List[SiteComposition]
+    names: np.ndarray  # (n, slots), object, None for empty slots
+    codes: np.ndarray  # (n, slots), element codes, 0 for empty slots
+    coefs: np.ndarray  # (n, slots), float
+    radii: np.ndarray  # (n,), effective site radius
+
+    def __len__(self):
+        return len(self.compositions)
+
+
+def _integer_compositions(total: int, parts: int) -> Iterator[Tuple[int, ...]]:
+    """
+    All ordered tuples of `parts` positive integers that sum to `total`.
+    """
+    if parts == 1:
+        yield (total,)
+        return
+    for first in range(1, total - parts + 2):
+        for rest in _integer_compositions(total - first, parts - 1):
+            yield (first,) + rest
+
+
+def enumerate_site_compositions(
+        elements: List[Element], max_components: int, site_total: float, fraction_step: float
+) -> List[SiteComposition]:
+    """
+    Every mix of up to `max_components` distinct elements whose fractions lie on the
+    `fraction_step` grid (relative to `site_total`) and sum to `site_total`.
+    """
+    n_steps = round(1 / fraction_step)
+    elements = list(dict.fromkeys(elements))
+    site_compositions = []
+    for n_components in range(1, min(max_components, len(elements), n_steps) + 1):
+        for combo in combinations(elements, n_components):
+            for parts in _integer_compositions(n_steps, n_components):
+                site_compositions.append(
+                    tuple((element, site_total * part / n_steps) for element, part in zip(combo, parts))
+                )
+    return site_compositions
+
+
+def build_site_candidates(site_compositions: List[SiteComposition], slots: int) -> SiteCandidates:
+    names = np.full((len(site_compositions), slots), None, dtype=object)
+    coefs = np.zeros((len(site_compositions), slots), dtype=np.float64)
+    for i, site_composition in enumerate(site_compositions):
+        for j, (element, fraction) in enumerate(site_composition):
+            names[i, j] = element.nm
+            coefs[i, j] = fraction
+
+    codes = Element.codes_from_names(names.ravel()).reshape(names.shape)
+    radii_table = Element.property_table("ionic_radii")
+    radii = np.zeros(len(site_compositions), dtype=np.float64)
+    for j in range(slots):
+        radii += np.where(codes[:, j] != 0, coefs[:, j] / 3.0 * radii_table[codes[:, j]], 0.)
+    return SiteCandidates(compositions=site_compositions, names=names, codes=codes, coefs=coefs, radii=radii)
+
+
+def _in_range(values: np.ndarray, low: float | None, high: float | None) -> np.ndarray:
+    mask = np.ones(len(values), dtype=bool)
+    if low is not None:
+        mask &= values >= low
+    if high is not None:
+        mask &= values <= high
+    return mask
+
+
+def _candidate_to_dict(
+        rank: int, band_gap: float, tolerance_factor: float, octahedral_factor: float,
+        site_compositions: Dict[Site, SiteComposition]
+) -> Dict[str, Any]:
+    candidate = {"type": "candidate", "rank": rank, "band_gap": band_gap}
+    for site, site_composition in site_compositions.items():
+        candidate[f"{site.value}_site"] = [
+            {"name": element.nm, "frequence": fraction} for element, fraction in site_composition
+        ]
+    candidate["tolerance_factor"] = tolerance_factor
+    candidate["octahedral_factor"] = octahedral_factor
+    return candidate
+
+
+def _candidate_columns(
+        request: BandGapScreeningRequest,
+        sites: Dict[Site, SiteCandidates],
+        kept: Dict[Site, np.ndarray],
+        element_codes: bool
+) -> Dict[str, np.ndarray]:
+    """
+    Band gap input columns of the kept candidates, besides their perovskite factors. Element slots hold
+    element codes for the array engines and element names for the DataFrame pipeline.
+    """
+    n_rows = len(kept[Site.A])
+    columns = {}
+    for site in Site:
+        slot_values = sites[site].codes if element_codes else sites[site].names
+        for j in range(SITE_SLOTS[site]):
+            columns[f"{site.value}_{j + 1}"] = slot_values[kept[site], j]
+            columns[f"{site.value}_{j + 1}_coef"] = sites[site].coefs[kept[site], j]
+    columns["space_group"] = np.full(n_rows, request.space_group.nm, dtype=object)
+    columns["composition_inorganic"] = np.full(n_rows, request.inorganic_composition)
+    columns["dimension_list_of_layers"] = np.full(n_rows, request.dimension_list_of_layers, dtype=np.float64)
+    columns["dimension"] = np.full(n_rows, request.dimension.nm, dtype=object)
+    return columns
+
+
+def screen_band_gap_candidates(
+        request: BandGapScreeningRequest,
+        components: AppComponents
+) -> Iterator[Dict[str, Any]]:
+    """
+    Enumerate the A/B/C composition space of `request`, filter it on tolerance and octahedral factors,
+    predict band gaps chunk by chunk and keep the `top_k` candidates closest to the center of the
+    target band gap window.
+
+    The Cartesian product of site compositions is never materialized: each chunk is a range of
+    flat indices into it. Yields a progress event per chunk, then the ranked candidates.
+    """
+    site_elements = {Site.A: request.A_elements, Site.B: request.B_elements, Site.C: request.C_elements}
+    max_components = {
+        Site.A: request.max_A_components, Site.B: request.max_B_components, Site.C: request.max_C_components
+    }
+    sites = {
+        site: build_site_candidates(
+            enumerate_site_compositions(
+                site_elements[site], max_components[site], SITE_FRACTION_TOTALS[site], request.fraction_step
+            ),
+            SITE_SLOTS[site]
+        )
+        for site in Site
+    }
+    shape = tuple(len(sites[site]) for site in Site)
+    total = int(np.prod(shape))
+
+    model_label = SavedModelName.BAND_GAP_XGB.name
+    with observe_stage(model_label, "model_fetch"):
+        model = components.model_repository.get_band_gap_xgb_model()
+    predict_columns = get_engine_predictor(components, model)
+    target_center = (request.band_gap_min + request.band_gap_max) / 2
+    # min-heap on (-distance to the window center, -position), its root is the worst kept candidate
+    top_candidates: List[Tuple[float, int, float, float, float, Tuple[int, int, int]]] = []
+    evaluated, passed_filters, in_window = 0, 0, 0
+
+    for start in range(0, total, request.chunk_size):
+        flat = np.arange(start, min(start + request.chunk_size, total))
+        indices = dict(zip(Site, np.unravel_index(flat, shape)))
+        with observe_stage(model_label, "factors"):
+            r_a, r_b, r_c = (sites[site].radii[indices[site]] for site in Site)
+            tolerance_factors = compute_tolerance_factors(r_a, r_b, r_c)
+            octahedral_factors = compute_octahedral_factors(r_b, r_c)
+        mask = (
+            _in_range(tolerance_factors, request.tolerance_factor_min, request.tolerance_factor_max)
+            & _in_range(octahedral_factors, request.octahedral_factor_min, request.octahedral_factor_max)
+        )
+        evaluated += len(flat)
+        passed_filters += int(mask.sum())
+
+        if mask.any():
+            kept = {site: site_indices[mask] for site, site_indices in indices.items()}
+            kept_tolerance_factors, kept_octahedral_factors = tolerance_factors[mask], octahedral_factors[mask]
+            with observe_stage(model_label, "prepare"):
+                columns = _candidate_columns(request, sites, kept, predict_columns is not None)
+                columns.update({
+                    "r_A": r_a[mask], "r_B": r_b[mask], "r_C": r_c[mask],
+                    "octahedral_factor": kept_octahedral_factors,
+                    "tolerance_factor": kept_tolerance_factors,
+                })
+                if predict_columns is None:
+                    df_input = pd.DataFrame(columns)[BAND_GAP_FEATURE_COLUMNS]
+            with observe_stage(model_label, "predict"):
+                band_gaps = predict_columns(columns) if predict_columns is not None else model.predict(df_input)
+            window = (band_gaps >= request.band_gap_min) & (band_gaps <= request.band_gap_max)
+            in_window += int(window.sum())
+            for row in np.flatnonzero(window):
+                band_gap = float(band_gaps[row])
+                entry = (
+                    -abs(band_gap - target_center), -(start + int(row)), band_gap,
+                    float(kept_tolerance_factors[row]), float(kept_octahedral_factors[row]),
+                    tuple(int(kept[site][row]) for site in Site)
+                )
+                if len(top_candidates) < request.top_k:
+                    heapq.heappush(top_candidates, entry)
+                elif entry > top_candidates[0]:
+                    heapq.heapreplace(top_candidates, entry)
+
+        yield {
+            "type": "progress", "total": total, "evaluated": evaluated,
+            "passed_filters": passed_filters, "in_window": in_window,
+        }
+
+    ranked = sorted(top_candidates, reverse=True)
+    for rank, (_, _, band_gap, tolerance_factor, octahedral_factor, site_indices) in enumerate(ranked, start=1):
+        yield _candidate_to_dict(
+            rank, band_gap, tolerance_factor, octahedral_factor,
+            {site: sites[site].compositions[index] for site, index in zip(Site, site_indices)}
+        )
@@ -0,0 +1,211 @@
+import json
+import logging
+import weakref
+from pathlib import Path
+from typing import Any, Dict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# objectives whose prediction is base_score + sum of leaf values
+_IDENTITY_LINK_OBJECTIVES = {
+    "reg:squarederror", "reg:linear", "reg:absoluteerror", "reg:pseudohubererror", "reg:quantileerror"
+}
+
+
+# node arrays of a FlatTreeEnsemble, in the order they are packed by `FlatTreeEnsemble.save`
+TREE_ARRAYS = ("roots", "features", "thresholds", "left", "right", "default_left", "values")
+# packed arrays start at multiples of this many bytes, so every array view is aligned
+_PACK_ALIGNMENT = 8
+
+
+def _parse_base_score(value: str) -> float:
+    # scalar ("5E-1") in older model files, one-element vector ("[5E-1]") in newer ones
+    values = value.strip("[]").split(",")
+    if len(values) != 1:
+        raise NotImplementedError("Multi-target models are not supported")
+    return float(values[0])
+
+
+class FlatTreeEnsemble:
+    """
+    A gradient boosted tree ensemble flattened into NumPy node arrays, evaluated without XGBoost.
+
+    All trees share one node table, children are absolute node indices and leaves point at
+    themselves, so a fixed number of `max_depth` steps walks every (row, tree) pair to its leaf
+    at once. Splits follow XGBoost: `x < threshold` goes left, missing values take the default direction.
+    """
+
+    def __init__(
+            self,
+            roots: np.ndarray,
+            features: np.ndarray,
+            thresholds: np.ndarray,
+            left: np.ndarray,
+            right: np.ndarray,
+            default_left: np.ndarray,
+            values: np.ndarray,
+            max_depth: int,
+            base_score: float,
+            n_features: int,
+    ):
+        self.roots = roots
+        self.features = features
+        self.thresholds = thresholds
+        self.left = left
+        self.right = right
+        self.default_left = default_left
+        self.values = values
+        self.max_depth = max_depth
+        self.base_score = base_score
+        self.n_features = n_features
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @classmethod
+    def from_booster(cls, booster: Any) -> "FlatTreeEnsemble":
+        """
+        Raises:
+            NotImplementedError: For boosters this evaluator can't reproduce exactly
+                (non-tree or dart boosters, categorical splits, vector leaves, non-identity objectives).
+        """
+        learner = json.loads(booster.save_raw(raw_format="json"))["learner"]
+        objective = learner["objective"]["name"]
+        if objective not in _IDENTITY_LINK_OBJECTIVES:
+            raise NotImplementedError(f"Objective {objective} is not supported")
+        gradient_booster = learner["gradient_booster"]
+        if gradient_booster["name"] != "gbtree":
+            raise NotImplementedError(f"Booster {gradient_booster['name']} is not supported")
+
+        trees = gradient_booster["model"]["trees"]
+        roots, features, thresholds, left, right, default_left, values = [], [], [], [], [], [], []
+        max_depth, offset = 0, 0
+        for tree in trees:
+            if tree.get("categories_nodes") or int(tree["tree_param"].get("size_leaf_vector", "1")) > 1:
+                raise NotImplementedError("Categorical splits and vector leaves are not supported")
+            tree_left = np.asarray(tree["left_children"], dtype=np.int32)
+            tree_right = np.asarray(tree["right_children"], dtype=np.int32)
+            conditions = np.asarray(tree["split_conditions"], dtype=np.float32)
+            is_leaf = tree_left == -1
+            nodes = np.arange(len(tree_left), dtype=np.int32)
+
+            roots.append(offset)
+            features.append(np.where(is_leaf, 0, np.asarray(tree["split_indices"], dtype=np.int32)))
+            thresholds.append(np.where(is_leaf, np.float32(0), conditions))
+            left.append(np.where(is_leaf, nodes, tree_left) + offset)
+            right.append(np.where(is_leaf, nodes, tree_right) + offset)
+            default_left.append(np.asarray(tree["default_left"], dtype=bool))
+            # leaf values are stored in the split conditions of leaf nodes
+            values.append(np.where(is_leaf, conditions, np.float32(0)))
+            max_depth = max(max_depth, cls._depth(tree_left, tree_right))
+            offset += len(tree_left)
+
+        return cls(
+            roots=np.asarray(roots, dtype=np.int32),
+            features=np.concatenate(features).astype(np.int32),
+            thresholds=np.concatenate(thresholds).astype(np.float32),
+            left=np.concatenate(left).astype(np.int32),
+            right=np.concatenate(right).astype(np.int32),
+            default_left=np.concatenate(default_left),
+            values=np.concatenate(values).astype(np.float32),
+            max_depth=max_depth,
+            base_score=_parse_base_score(learner["learner_model_param"]["base_score"]),
+            n_features=int(learner["learner_model_param"]["num_feature"]),
+        )
+
+    def save(self, path: str | Path) -> Dict[str, Any]:
+        """
+        Write the node arrays packed into one `.npy` file at `path`.
+
+        Returns:
+            Dict[str, Any]: Layout of the packed arrays and the ensemble's parameters, for `load`.
+        """
+        parts, arrays, offset = [], {}, 0
+        for name in TREE_ARRAYS:
+            array = np.ascontiguousarray(getattr(self, name))
+            raw = array.view(np.uint8)
+            padding = -len(raw) % _PACK_ALIGNMENT
+            parts += [raw, np.zeros(padding, dtype=np.uint8)]
+            arrays[name] = {"offset": offset, "length": len(array), "dtype": array.dtype.str}
+            offset += len(raw) + padding
+        with open(path, "wb") as f:
+            np.save(f, np.concatenate(parts))
+        return {
+            "arrays": arrays,
+            "max_depth": self.max_depth,
+            "base_score": self.base_score,
+            "n_features": self.n_features,
+        }
+
+    @classmethod
+    def load(cls, path: str | Path, layout: Dict[str, Any], mmap_mode: str | None = None) -> "FlatTreeEnsemble":
+        """
+        Read an ensemble written by `save`. With `mmap_mode` ("r") the node arrays are views of the
+        memory-mapped file, so processes evaluating the same ensemble share its pages.
+        """
+        packed = np.load(path, mmap_mode=mmap_mode)
+        arrays = {}
+        for name in TREE_ARRAYS:
+            spec = layout["arrays"][name]
+            dtype = np.dtype(spec["dtype"])
+            arrays[name] = packed[spec["offset"]:spec["offset"] + spec["length"] * dtype.itemsize].view(dtype)
+        return cls(
+            **arrays,
+            max_depth=int(layout["max_depth"]),
+            base_score=float(layout["base_score"]),
+            n_features=int(layout["n_features"]),
+        )
+
+    @staticmethod
+    def _depth(left: np.ndarray, right: np.ndarray) -> int:
+        depth, level = 0, [0]
+        while True:
+            level = [child for node in level for child in (left[node], right[node]) if child != -1]
+            if not level:
+                return depth
+            depth += 1
+
+    def predict(self, matrix: np.ndarray) -> np.ndarray:
+        matrix = np.asarray(matrix, dtype=np.float32)
+        if matrix.ndim == 1:
+            matrix = matrix[np.newaxis, :]
+        if matrix.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got {matrix.shape[1]}")
+
+        rows = np.arange(len(matrix))[:, np.newaxis]
+        nodes = np.broadcast_to(self.roots, (len(matrix), self.n_trees))
+        for _ in range(self.max_depth):
+            values = matrix[rows, self.features[nodes]]
+            go_left = np.where(np.isnan(values), self.default_left[nodes], values < self.thresholds[nodes])
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return self.values[nodes].sum(axis=1, dtype=np.float32) + np.float32(self.base_score)
+
+
+_tree_ensembles: "weakref.WeakKeyDictionary[Any, FlatTreeEnsemble | None]" = weakref.WeakKeyDictionary()
+
+
+def get_tree_ensemble(booster: Any) -> FlatTreeEnsemble | None:
+    """
+    Flattened form of `booster`, built once per booster object. None if it can't be flattened.
+    """
+    try:
+        return _tree_ensembles[booster]
+    except KeyError:
+        pass
+    try:
+        ensemble = FlatTreeEnsemble.from_booster(booster)
+    except NotImplementedError as e:
+        logger.warning("Falling back to XGBoost inference: %s", e)
+        ensemble = None
+    _tree_ensembles[booster] = ensemble
+    return ensemble
+
+
+def register_tree_ensemble(booster: Any, ensemble: FlatTreeEnsemble):
+    """
+    Use `ensemble`, e.g. one loaded from a model store, as the flattened form of `booster`.
+    """
+    _tree_ensembles[booster] = ensemble
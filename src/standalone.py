@@ -1,14 +1,17 @@
 from dotenv import load_dotenv
 import uvicorn
 
-from ml_prediction_web_service.app import app
+from ml_prediction_web_service.configuration import get_server_workers
 
 
 load_dotenv()
 
 def main():
-    uvicorn.run(app, host="0.0.0.0", port=8080)
+    # an import string lets uvicorn start each worker process with its own app and models
+    uvicorn.run(
+        "ml_prediction_web_service.app:app", host="0.0.0.0", port=8080, workers=get_server_workers()
+    )
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
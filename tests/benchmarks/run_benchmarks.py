@@ -0,0 +1,210 @@
+"""
+Reproducible benchmarks of feature computation, input preparation, model loading and prediction.
+
+    python tests/benchmarks/run_benchmarks.py --output results.json
+    python tests/benchmarks/run_benchmarks.py --baseline baseline.json --threshold 0.25
+
+Inputs are synthetic compositions drawn from the Element enum with fixed seeds. Results are written
+as JSON (median, p95 and min seconds per case). With --baseline the run fails when the median
+of a case is more than --threshold slower than in the baseline file.
+"""
+import argparse
+import dataclasses
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from typing import Callable, Dict, Iterator, List, Tuple
+
+from dotenv import load_dotenv
+from fastapi.testclient import TestClient
+
+from ml_prediction_web_service.app import app
+from ml_prediction_web_service.components import AppComponents
+from ml_prediction_web_service.entities.dictionary import Element
+from ml_prediction_web_service.repository.model_repository import LocalModelRepository
+from ml_prediction_web_service.services.prediction_service import (
+    PREDICTION_ENGINES,
+    _calculate_base_perovskite_factors,
+    predict_band_gap_batch
+)
+from ml_prediction_web_service.services.preparation import (
+    prepare_perovskites_composition_batch_input,
+    prepare_perovskites_composition_input
+)
+from synthetic import band_gap_payload, random_band_gap_requests, random_composition_frame
+
+load_dotenv()
+
+SEED = 20250101
+ROW_COUNTS = (1, 100, 10_000, 1_000_000)
+BATCH_SIZES = (1, 64)
+DEFAULT_THRESHOLD = 0.25
+END_TO_END_CASE = "api./prediction/band_gap[TestClient]"
+
+Case = Tuple[str, Callable[[], object], int]
+
+
+def _repeats_for(rows: int) -> int:
+    return max(3, min(200, 200_000 // max(rows, 1)))
+
+
+def _feature_cases(max_rows: int) -> Iterator[Case]:
+    names = random_composition_frame(10_000, SEED)["C_1"].tolist()
+    yield "element.get_element_by_name[10k]", lambda: [Element.get_element_by_name(name) for name in names], 20
+    yield "element.codes_from_names[10k]", lambda: Element.codes_from_names(names), 20
+
+    for n_rows in ROW_COUNTS:
+        if n_rows > max_rows:
+            continue
+        df_input = random_composition_frame(n_rows, SEED)
+        yield (
+            f"prediction_service._calculate_base_perovskite_factors[{n_rows}]",
+            lambda df_input=df_input: _calculate_base_perovskite_factors(df_input),
+            _repeats_for(n_rows)
+        )
+
+
+def _preparation_cases() -> Iterator[Case]:
+    requests = random_band_gap_requests(1_000, SEED)
+    yield (
+        "preparation.prepare_perovskites_composition_input[1]",
+        lambda: prepare_perovskites_composition_input(requests[0]), 200
+    )
+    yield (
+        "preparation.prepare_perovskites_composition_batch_input[1k]",
+        lambda: prepare_perovskites_composition_batch_input(requests), 20
+    )
+
+
+def _model_cases(models_path: str) -> Iterator[Case]:
+    yield (
+        "model_repository.load_band_gap_model",
+        lambda: LocalModelRepository(models_path).get_band_gap_xgb_model(), 10
+    )
+
+    # no prediction cache, every call runs the engine
+    components = AppComponents(model_repository=LocalModelRepository(models_path))
+    for batch_size in BATCH_SIZES:
+        requests = random_band_gap_requests(batch_size, SEED)
+        for engine in PREDICTION_ENGINES:
+            engine_components = dataclasses.replace(components, prediction_engine=engine)
+            yield (
+                f"prediction_service.predict_band_gap_batch[{engine},{batch_size}]",
+                lambda requests=requests, engine_components=engine_components:
+                    predict_band_gap_batch(requests, engine_components),
+                200
+            )
+
+
+def _run_end_to_end(models_path: str, repeats: int) -> List[float]:
+    # read when the app builds its components on startup, every request must reach the model
+    os.environ["MODELS_PATH"] = models_path
+    os.environ["PREDICTION_CACHE_SIZE"] = "0"
+    payloads = [band_gap_payload(request) for request in random_band_gap_requests(repeats, SEED)]
+    timings = []
+    with TestClient(app) as client:
+        client.post("/prediction/band_gap", json=payloads[0]).raise_for_status()
+        for payload in payloads:
+            started_at = time.perf_counter()
+            client.post("/prediction/band_gap", json=payload).raise_for_status()
+            timings.append(time.perf_counter() - started_at)
+    return timings
+
+
+def _measure(fn: Callable[[], object], repeats: int) -> List[float]:
+    fn()  # warm up lazily built caches, compiled pipelines and tree tables
+    timings = []
+    for _ in range(repeats):
+        started_at = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started_at)
+    return timings
+
+
+def _summarize(timings: List[float]) -> Dict[str, float]:
+    return {
+        "repeats": len(timings),
+        "median_s": statistics.median(timings),
+        "p95_s": statistics.quantiles(timings, n=20)[-1] if len(timings) > 1 else timings[0],
+        "min_s": min(timings),
+    }
+
+
+def find_regressions(
+        results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], threshold: float
+) -> List[str]:
+    """
+    Cases whose median got slower than the baseline median by more than `threshold` (0.25 = 25%).
+    Cases missing from either side are not compared.
+    """
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        ratio = result["median_s"] / reference["median_s"]
+        if ratio > 1 + threshold:
+            regressions.append(
+                f"{name}: {1000 * result['median_s']:.3f}ms vs {1000 * reference['median_s']:.3f}ms ({ratio:.2f}x)"
+            )
+    return regressions
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the benchmark suite.")
+    parser.add_argument("--output", default=None, help="write results JSON here, printed to stdout otherwise")
+    parser.add_argument("--baseline", default=None, help="results JSON of a reference run to check against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--filter", default=None, help="only run cases whose name contains this")
+    parser.add_argument("--max-rows", type=int, default=max(ROW_COUNTS))
+    parser.add_argument("--models-path", default=os.environ.get("MODELS_PATH"))
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = _parse_args()
+    cases = list(_feature_cases(args.max_rows)) + list(_preparation_cases())
+    if args.models_path:
+        cases += list(_model_cases(args.models_path))
+
+    results = {}
+    for name, fn, repeats in cases:
+        if args.filter and args.filter not in name:
+            continue
+        results[name] = _summarize(_measure(fn, repeats))
+        print(f"{name}: median {1000 * results[name]['median_s']:.3f}ms", file=sys.stderr)
+    if args.models_path and (not args.filter or args.filter in END_TO_END_CASE):
+        results[END_TO_END_CASE] = _summarize(_run_end_to_end(args.models_path, 200))
+        print(f"{END_TO_END_CASE}: median {1000 * results[END_TO_END_CASE]['median_s']:.3f}ms", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "seed": SEED,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = find_regressions(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
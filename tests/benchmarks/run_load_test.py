@@ -0,0 +1,199 @@
+"""
+Load test of the prediction API: ramps closed-loop concurrency and reports latency percentiles,
+throughput and error rates per step, plus the highest throughput that stayed within the SLO.
+
+    python tests/benchmarks/run_load_test.py                       # in-process, through the ASGI app
+    python tests/benchmarks/run_load_test.py --url http://localhost:8080
+
+In-process runs serve the artifacts of MODELS_PATH and train small stand-in models for missing ones.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Tuple
+
+import httpx
+import numpy as np
+from dotenv import load_dotenv
+
+from ml_prediction_web_service.app import app
+from stand_in_models import prepare_models_dir
+from synthetic import band_gap_payload, random_band_gap_requests, random_pce_t80_payloads
+
+load_dotenv()
+
+SEED = 20250101
+PAYLOADS_PER_ROUTE = 2_000
+ROUTES = {
+    "band_gap": "/prediction/band_gap",
+    "stability_pce_t80": "/prediction/stability_pce_t80",
+}
+DEFAULT_MIX = "band_gap=0.8,stability_pce_t80=0.2"
+
+
+@dataclass
+class StepResult:
+    concurrency: int
+    duration_s: float
+    latencies_s: List[float] = field(default_factory=list)
+    errors: int = 0
+    rejected: int = 0
+
+    @property
+    def requests(self) -> int:
+        return len(self.latencies_s) + self.errors + self.rejected
+
+    def report(self) -> Dict[str, float]:
+        latencies = np.array(self.latencies_s) if self.latencies_s else np.array([np.nan])
+        return {
+            "concurrency": self.concurrency,
+            "requests": self.requests,
+            "throughput_rps": len(self.latencies_s) / self.duration_s,
+            "error_rate": self.errors / self.requests if self.requests else 0.,
+            "rejected_rate": self.rejected / self.requests if self.requests else 0.,
+            "p50_ms": 1000 * float(np.percentile(latencies, 50)),
+            "p95_ms": 1000 * float(np.percentile(latencies, 95)),
+            "p99_ms": 1000 * float(np.percentile(latencies, 99)),
+        }
+
+
+def parse_mix(mix: str) -> List[Tuple[str, float]]:
+    weights = []
+    for part in mix.split(","):
+        route, weight = part.split("=")
+        if route not in ROUTES:
+            raise ValueError(f"Unknown route '{route}', expected one of {list(ROUTES)}")
+        weights.append((route, float(weight)))
+    return weights
+
+
+async def _user(
+        client: httpx.AsyncClient, payloads: Dict[str, List[Dict[str, Any]]], mix: List[Tuple[str, float]],
+        rng: random.Random, deadline: float, result: StepResult
+):
+    routes, weights = zip(*mix)
+    while time.perf_counter() < deadline:
+        route = rng.choices(routes, weights)[0]
+        payload = rng.choice(payloads[route])
+        started_at = time.perf_counter()
+        try:
+            response = await client.post(ROUTES[route], json=payload)
+        except httpx.HTTPError:
+            result.errors += 1
+            continue
+        if response.status_code in (429, 503):
+            result.rejected += 1
+        elif response.is_success:
+            result.latencies_s.append(time.perf_counter() - started_at)
+        else:
+            result.errors += 1
+
+
+async def run_step(
+        client: httpx.AsyncClient, payloads: Dict[str, List[Dict[str, Any]]], mix: List[Tuple[str, float]],
+        concurrency: int, duration_s: float
+) -> StepResult:
+    result = StepResult(concurrency=concurrency, duration_s=duration_s)
+    deadline = time.perf_counter() + duration_s
+    await asyncio.gather(*(
+        _user(client, payloads, mix, random.Random(SEED + user), deadline, result) for user in range(concurrency)
+    ))
+    return result
+
+
+def ramp(max_concurrency: int) -> List[int]:
+    steps, concurrency = [], 1
+    while concurrency < max_concurrency:
+        steps.append(concurrency)
+        concurrency *= 2
+    return steps + [max_concurrency]
+
+
+def max_sustainable(reports: List[Dict[str, float]], p99_slo_ms: float, max_error_rate: float) -> Dict | None:
+    """
+    The step with the highest throughput whose p99 latency and error rate stayed within the limits.
+    """
+    within = [
+        report for report in reports
+        if report["p99_ms"] <= p99_slo_ms and report["error_rate"] + report["rejected_rate"] <= max_error_rate
+    ]
+    return max(within, key=lambda report: report["throughput_rps"], default=None)
+
+
+async def run_load_test(client: httpx.AsyncClient, args: argparse.Namespace) -> Dict[str, Any]:
+    payloads = {
+        "band_gap": [band_gap_payload(request) for request in random_band_gap_requests(PAYLOADS_PER_ROUTE, SEED)],
+        "stability_pce_t80": random_pce_t80_payloads(PAYLOADS_PER_ROUTE, SEED),
+    }
+    mix = parse_mix(args.mix)
+    await run_step(client, payloads, mix, concurrency=1, duration_s=args.warmup)
+
+    reports = []
+    for concurrency in ramp(args.max_concurrency):
+        report = (await run_step(client, payloads, mix, concurrency, args.step_duration)).report()
+        reports.append(report)
+        print(
+            f"concurrency={concurrency:<4} rps={report['throughput_rps']:8.1f} p50={report['p50_ms']:7.2f}ms "
+            f"p95={report['p95_ms']:7.2f}ms p99={report['p99_ms']:7.2f}ms errors={report['error_rate']:.2%} "
+            f"rejected={report['rejected_rate']:.2%}",
+            file=sys.stderr
+        )
+    return {
+        "mix": dict(mix),
+        "steps": reports,
+        "max_sustainable": max_sustainable(reports, args.p99_slo_ms, args.max_error_rate),
+    }
+
+
+async def _run_in_process(args: argparse.Namespace) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory() as models_dir:
+        stand_ins = prepare_models_dir(models_dir, os.environ.get("MODELS_PATH"), SEED)
+        if stand_ins:
+            print(f"Using stand-in models for {[model_name.name for model_name in stand_ins]}", file=sys.stderr)
+        # read when the app builds its components on startup
+        os.environ["MODELS_PATH"] = models_dir
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://load-test") as client:
+                result = await run_load_test(client, args)
+        result["stand_in_models"] = [model_name.name for model_name in stand_ins]
+        return result
+
+
+async def _run_against_url(args: argparse.Namespace) -> Dict[str, Any]:
+    limits = httpx.Limits(max_connections=args.max_concurrency)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=30.) as client:
+        return await run_load_test(client, args)
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Ramp concurrency against the prediction API.")
+    parser.add_argument("--url", default=None, help="base URL of a running server, in-process app by default")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="route weights, e.g. band_gap=0.8,stability_pce_t80=0.2")
+    parser.add_argument("--max-concurrency", type=int, default=64)
+    parser.add_argument("--step-duration", type=float, default=10., help="seconds per concurrency step")
+    parser.add_argument("--warmup", type=float, default=2., help="seconds of single-user warm-up")
+    parser.add_argument("--p99-slo-ms", type=float, default=250.)
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--output", default=None, help="write the JSON report here, printed to stdout otherwise")
+    return parser.parse_args()
+
+
+def main():
+    args = _parse_args()
+    result = asyncio.run(_run_against_url(args) if args.url else _run_in_process(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+    else:
+        print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import os
+from typing import List
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+from xgboost import XGBRegressor
+
+from ml_prediction_web_service.entities.entities import PCET80PredictionRequest
+from ml_prediction_web_service.entities.model_dictionary import SavedModelName
+from ml_prediction_web_service.services.prediction_service import (
+    BAND_GAP_FEATURE_COLUMNS,
+    _calculate_base_perovskite_factors
+)
+from ml_prediction_web_service.services.preparation import prepare_ts80_prediction_batch_df
+from synthetic import random_composition_frame, random_pce_t80_payloads
+
+STAND_IN_ROWS = 2_000
+
+
+def _fit_pipeline(df: pd.DataFrame, target: np.ndarray, seed: int) -> Pipeline:
+    """
+    Same layout as the trained models: scaled numeric and one-hot categorical columns into XGBoost.
+    """
+    categorical = [column for column in df.columns if df[column].dtype == object]
+    numeric = [column for column in df.columns if column not in categorical]
+    pipeline = Pipeline([
+        ("preprocessor", ColumnTransformer([
+            ("num", StandardScaler(), numeric),
+            ("cat", OneHotEncoder(handle_unknown="ignore"), categorical),
+        ])),
+        ("regressor", XGBRegressor(n_estimators=50, max_depth=4, random_state=seed)),
+    ])
+    return pipeline.fit(df, target)
+
+
+def build_band_gap_stand_in(seed: int) -> Pipeline:
+    rng = np.random.default_rng(seed)
+    df = random_composition_frame(STAND_IN_ROWS, seed)
+    df["composition_inorganic"] = rng.integers(0, 2, size=len(df)).astype(bool)
+    df["space_group"] = "Pm3m"
+    df["dimension_list_of_layers"] = 3.0
+    df["dimension"] = "3D"
+    df = _calculate_base_perovskite_factors(df)[BAND_GAP_FEATURE_COLUMNS]
+    # a smooth function of the structure, only the latency of the model matters
+    target = 1.2 + 0.4 * df["r_C"] - 0.2 * df["tolerance_factor"] + rng.normal(0, 0.05, len(df))
+    return _fit_pipeline(df, target.to_numpy(), seed)
+
+
+def build_pce_t80_stand_in(seed: int) -> Pipeline:
+    rng = np.random.default_rng(seed)
+    requests = [
+        PCET80PredictionRequest.model_validate(payload) for payload in random_pce_t80_payloads(STAND_IN_ROWS, seed)
+    ]
+    df = _calculate_base_perovskite_factors(prepare_ts80_prediction_batch_df(requests))
+    target = 500. + 20. * df["PCE_initial"] - 100. * df["encapsulation"] + rng.normal(0, 10., len(df))
+    return _fit_pipeline(df, target.to_numpy(), seed)
+
+
+STAND_IN_BUILDERS = {
+    SavedModelName.BAND_GAP_XGB: build_band_gap_stand_in,
+    SavedModelName.PCE_T80_XGB: build_pce_t80_stand_in,
+}
+
+
+def prepare_models_dir(target_path: str, models_path: str | None, seed: int) -> List[SavedModelName]:
+    """
+    Fill `target_path` with the artifacts of `models_path` (linked, not copied) and train small
+    stand-in models on synthetic data for every SavedModelName that has no artifact there.
+
+    Returns:
+        List[SavedModelName]: Models replaced by stand-ins.
+    """
+    os.makedirs(target_path, exist_ok=True)
+    stand_ins = []
+    for model_name, build in STAND_IN_BUILDERS.items():
+        path = os.path.join(target_path, model_name.value)
+        source = os.path.join(models_path, model_name.value) if models_path else None
+        if source is not None and os.path.exists(source):
+            os.symlink(os.path.abspath(source), path)
+        else:
+            joblib.dump(build(seed), path)
+            stand_ins.append(model_name)
+    return stand_ins
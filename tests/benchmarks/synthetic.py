@@ -0,0 +1,134 @@
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from ml_prediction_web_service.entities.dictionary import (
+    BackContact,
+    CellArchitecture,
+    Dimension,
+    ETLStack,
+    Element,
+    Site,
+    SpaceGroup
+)
+from ml_prediction_web_service.entities.entities import (
+    BandGapPredictionRequest,
+    ElementFraction,
+    PerovskiteComposition,
+    SITE_FRACTION_TOTALS
+)
+from ml_prediction_web_service.services.preparation import SITE_SLOTS
+
+# Element lists its A-site ions first, then B-site ions from Pb on, then the halides from Br on
+SITE_ELEMENTS: Dict[Site, List[Element]] = {
+    Site.A: [element for element in Element if element.code < Element.PB.code],
+    Site.B: [element for element in Element if Element.PB.code <= element.code < Element.BR.code],
+    Site.C: [element for element in Element if element.code >= Element.BR.code],
+}
+
+
+def _random_fractions(rng: np.random.Generator, n_rows: int, slots: int, total: float) -> np.ndarray:
+    """
+    (n_rows, slots) fractions summing to `total` per row, with a random number of used slots, rounded to 0.01.
+    """
+    used = rng.integers(1, slots + 1, size=n_rows)
+    weights = rng.integers(1, 20, size=(n_rows, slots)).astype(np.float64)
+    weights[np.arange(slots) >= used[:, np.newaxis]] = 0.
+    fractions = np.round(weights / weights.sum(axis=1, keepdims=True) * total, 2)
+    # put the rounding remainder on the first slot, so sites still sum to their total
+    fractions[:, 0] += total - fractions.sum(axis=1)
+    return fractions
+
+
+def random_composition_frame(n_rows: int, seed: int) -> pd.DataFrame:
+    """
+    Prepared composition rows (site names and coefficients) with elements drawn from the Element enum.
+    """
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for site in Site:
+        slots = SITE_SLOTS[site]
+        names = np.array([element.nm for element in SITE_ELEMENTS[site]], dtype=object)
+        fractions = _random_fractions(rng, n_rows, slots, SITE_FRACTION_TOTALS[site])
+        chosen = names[rng.integers(0, len(names), size=(n_rows, slots))]
+        chosen[fractions == 0] = None
+        for slot in range(slots):
+            columns[f"{site.value}_{slot + 1}"] = chosen[:, slot]
+            columns[f"{site.value}_{slot + 1}_coef"] = fractions[:, slot]
+    return pd.DataFrame(columns)
+
+
+def random_band_gap_requests(n_requests: int, seed: int) -> List[BandGapPredictionRequest]:
+    rng = np.random.default_rng(seed)
+    requests = []
+    for _ in range(n_requests):
+        sites = {}
+        for site in Site:
+            fractions = _random_fractions(rng, 1, SITE_SLOTS[site], SITE_FRACTION_TOTALS[site])[0]
+            elements = rng.choice(len(SITE_ELEMENTS[site]), size=SITE_SLOTS[site], replace=False)
+            sites[f"{site.value}_site"] = [
+                ElementFraction(name=SITE_ELEMENTS[site][index], frequence=float(fraction))
+                for index, fraction in zip(elements, fractions) if fraction > 0
+            ]
+        requests.append(BandGapPredictionRequest(
+            perovskite_composition=PerovskiteComposition(**sites),
+            space_group=SpaceGroup.CUBIC,
+            dimension_list_of_layers=3.0,
+            inorganic_composition=bool(rng.integers(0, 2)),
+            dimension=Dimension.THREE_DIM
+        ))
+    return requests
+
+
+def band_gap_payload(request: BandGapPredictionRequest) -> Dict[str, Any]:
+    """
+    JSON body of `request` with enums given by name, as clients send them.
+    """
+    return {
+        "perovskite_composition": {
+            f"{site.value}_site": [
+                {"name": element_fraction.name.nm, "frequence": element_fraction.frequence}
+                for element_fraction in getattr(request.perovskite_composition, f"{site.value}_site")
+            ]
+            for site in Site
+        },
+        "inorganic_composition": request.inorganic_composition,
+        "dimension_list_of_layers": request.dimension_list_of_layers,
+        "dimension": request.dimension.nm,
+        "space_group": request.space_group.nm,
+    }
+
+
+def random_pce_t80_payloads(n_requests: int, seed: int) -> List[Dict[str, Any]]:
+    """
+    JSON bodies of PCE T80 requests with random compositions and device/stability conditions.
+    """
+    rng = np.random.default_rng(seed)
+    payloads = []
+    for request in random_band_gap_requests(n_requests, seed):
+        temperature_start = float(rng.choice([25., 65., 85.]))
+        payloads.append({
+            "perovskite_composition": band_gap_payload(request)["perovskite_composition"],
+            "temperature_range": {
+                "temperature_start": temperature_start,
+                "temperature_end": temperature_start + float(rng.integers(0, 5)),
+            },
+            "band_gap": float(rng.uniform(1.2, 2.3)),
+            "dimension_list_of_layers": int(rng.integers(1, 4)),
+            "cell_area": float(rng.uniform(0.04, 1.)),
+            "pce_initial": float(rng.uniform(5., 25.)),
+            "stability_protocol": str(rng.choice(["ISOS-D-1", "ISOS-L-1", "ISOS-L-2"])),
+            "stability_light_intensity": float(rng.choice([0., 100.])),
+            "stability_time_total_exposure": float(rng.uniform(10., 2000.)),
+            "backcontact": _random_member(rng, BackContact).nm,
+            "etl_stack_sequence": _random_member(rng, ETLStack).nm,
+            "cell_architecture": _random_member(rng, CellArchitecture).nm,
+            "encapsulation": bool(rng.integers(0, 2)),
+        })
+    return payloads
+
+
+def _random_member(rng: np.random.Generator, enum_class):
+    members = list(enum_class)
+    return members[rng.integers(0, len(members))]
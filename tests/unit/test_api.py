@@ -0,0 +1,72 @@
+import io
+from functools import partial
+
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+from conftest import BAND_GAP_PREDICTION_REQUESTS
+from ml_prediction_web_service import app as app_module
+from ml_prediction_web_service.app import app
+from ml_prediction_web_service.configuration import build_components
+from ml_prediction_web_service.services.batching import MicroBatcher
+from ml_prediction_web_service.services.data_service import PREDICTED_BAND_GAP_COLUMN
+from ml_prediction_web_service.services.inference_executor import InferenceExecutor
+from ml_prediction_web_service.services.prediction_service import predict_band_gap_batch
+from ml_prediction_web_service.services.preparation import prepare_perovskites_composition_batch_input
+
+
+@pytest.fixture
+def client(test_components):
+    test_components.inference_executor = InferenceExecutor(workers=2)
+    test_components.band_gap_batcher = MicroBatcher(
+        partial(predict_band_gap_batch, components=test_components), executor=test_components.inference_executor.pool
+    )
+    app.dependency_overrides[build_components] = lambda: test_components
+    # not entered as a context manager, the lifespan would build and load the configured components
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+    test_components.inference_executor.shutdown()
+
+
+@pytest.mark.parametrize("file_format", ["csv", "parquet"])
+def test_score_band_gap_table_streams_every_chunk(client, file_format):
+    requests = [BAND_GAP_PREDICTION_REQUESTS[i % len(BAND_GAP_PREDICTION_REQUESTS)] for i in range(300)]
+    df = prepare_perovskites_composition_batch_input(requests)
+    buffer = io.BytesIO()
+    if file_format == "csv":
+        df.to_csv(buffer, index=False)
+    else:
+        df.to_parquet(buffer, index=False, row_group_size=100)
+
+    response = client.post(
+        "/data/score/band_gap",
+        params={"chunk_size": 100},
+        files={"file": (f"compositions.{file_format}", buffer.getvalue())}
+    )
+
+    assert response.status_code == 200
+    scored = pd.read_csv(io.StringIO(response.text))
+    assert len(scored) == 300
+    assert scored[PREDICTED_BAND_GAP_COLUMN].notna().all()
+
+
+def test_band_gap_server_timing_includes_batched_stages(client, monkeypatch):
+    monkeypatch.setattr(app_module, "SERVER_TIMING_ENABLED", True)
+    payload = {
+        "perovskite_composition": {
+            "A_site": [{"name": "MA", "frequence": 1.0}],
+            "B_site": [{"name": "Pb", "frequence": 1.0}],
+            "C_site": [{"name": "I", "frequence": 3.0}],
+        },
+        "inorganic_composition": False,
+        "dimension_list_of_layers": 1.0,
+        "dimension": "3D",
+        "space_group": "Pm3m",
+    }
+
+    response = client.post("/prediction/band_gap", json=payload)
+
+    assert response.status_code == 200
+    stages = [entry.split(";")[0].strip() for entry in response.headers["Server-Timing"].split(",")]
+    assert {"batch", "predict", "total"} <= set(stages)
@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from ml_prediction_web_service.services.batching import MicroBatcher
+from ml_prediction_web_service.services.metrics import collect_server_timings, observe_stage
+
+
+@pytest.mark.asyncio
+async def test_concurrent_items_are_batched():
+    calls = []
+
+    def batch_fn(items):
+        calls.append(list(items))
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(batch_fn, max_batch_size=8, max_wait_ms=50)
+    results = await asyncio.gather(*(batcher.submit(i) for i in range(5)))
+    await batcher.stop()
+
+    assert results == [0, 2, 4, 6, 8]
+    assert calls == [[0, 1, 2, 3, 4]]
+    stats = batcher.stats()
+    assert stats["batches_total"] == 1
+    assert stats["max_batch_size"] == 5
+
+
+@pytest.mark.asyncio
+async def test_batches_are_split_by_max_batch_size():
+    calls = []
+
+    def batch_fn(items):
+        calls.append(len(items))
+        return items
+
+    batcher = MicroBatcher(batch_fn, max_batch_size=2, max_wait_ms=50)
+    results = await asyncio.gather(*(batcher.submit(i) for i in range(5)))
+    await batcher.stop()
+
+    assert results == list(range(5))
+    assert calls == [2, 2, 1]
+
+
+@pytest.mark.asyncio
+async def test_batch_failure_is_propagated_to_every_caller():
+    def batch_fn(items):
+        raise ValueError("model failure")
+
+    batcher = MicroBatcher(batch_fn, max_batch_size=4, max_wait_ms=10)
+    results = await asyncio.gather(*(batcher.submit(i) for i in range(3)), return_exceptions=True)
+    await batcher.stop()
+
+    assert all(isinstance(result, ValueError) for result in results)
+    assert batcher.stats()["failed_batches_total"] == 1
+
+
+@pytest.mark.asyncio
+async def test_batch_stages_are_reported_to_every_caller():
+    def batch_fn(items):
+        with observe_stage("model", "predict"):
+            return items
+
+    batcher = MicroBatcher(batch_fn, max_batch_size=8, max_wait_ms=50)
+
+    async def submit(item):
+        with collect_server_timings() as timings:
+            await batcher.submit(item)
+        return timings
+
+    all_timings = await asyncio.gather(submit(1), submit(2))
+    await batcher.stop()
+
+    assert batcher.stats()["batches_total"] == 1
+    for timings in all_timings:
+        assert [(stage, model) for stage, model, _ in timings] == [("predict", "model")]
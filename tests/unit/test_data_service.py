@@ -0,0 +1,97 @@
+import io
+import json
+
+import pandas as pd
+import pytest
+
+from conftest import BAND_GAP_PREDICTION_REQUESTS, MODELS_PATH
+from ml_prediction_web_service.services.data_service import (
+    PREDICTED_BAND_GAP_COLUMN,
+    iter_table_chunks,
+    score_band_gap_chunks,
+    score_band_gap_chunks_parallel,
+    serialize_chunks,
+    write_parquet_chunks
+)
+from ml_prediction_web_service.services.preparation import prepare_perovskites_composition_batch_input
+
+
+def _prepared_table(n_rows: int) -> pd.DataFrame:
+    requests = [BAND_GAP_PREDICTION_REQUESTS[i % len(BAND_GAP_PREDICTION_REQUESTS)] for i in range(n_rows)]
+    return prepare_perovskites_composition_batch_input(requests)
+
+
+@pytest.mark.parametrize("file_format", ["csv", "parquet"])
+def test_iter_table_chunks(file_format):
+    df = _prepared_table(7)
+    buffer = io.BytesIO()
+    if file_format == "csv":
+        df.to_csv(buffer, index=False)
+    else:
+        df.to_parquet(buffer, index=False, row_group_size=2)
+    buffer.seek(0)
+
+    chunks = list(iter_table_chunks(buffer, file_format, chunk_size=3))
+    assert [len(chunk) for chunk in chunks] == [3, 3, 1]
+    assert list(chunks[0].columns) == list(df.columns)
+
+
+def test_iter_table_chunks_filters_parquet_file_object():
+    df = _prepared_table(6)
+    buffer = io.BytesIO()
+    df.to_parquet(buffer, index=False, row_group_size=2)
+    buffer.seek(0)
+
+    chunks = list(iter_table_chunks(buffer, "parquet", columns=["A_1", "A_1_coef"], filters=[("A_1_coef", "<", 1.)]))
+    filtered = pd.concat(chunks)
+    assert list(filtered.columns) == ["A_1", "A_1_coef"]
+    assert len(filtered) == 3
+
+
+def test_serialize_chunks():
+    chunks = [pd.DataFrame({"a": [1, 2]}), pd.DataFrame({"a": [3]})]
+
+    csv = b"".join(serialize_chunks(chunks, "csv")).decode()
+    assert csv.splitlines() == ["a", "1", "2", "3"]
+
+    ndjson = b"".join(serialize_chunks(chunks, "ndjson")).decode()
+    assert [json.loads(line) for line in ndjson.splitlines()] == [{"a": 1}, {"a": 2}, {"a": 3}]
+
+
+def test_score_band_gap_chunks(test_components):
+    df = _prepared_table(5)
+    buffer = io.BytesIO()
+    df.to_csv(buffer, index=False)
+    buffer.seek(0)
+
+    scored = list(score_band_gap_chunks(iter_table_chunks(buffer, "csv", chunk_size=2), test_components))
+    assert sum(len(chunk) for chunk in scored) == 5
+    for chunk in scored:
+        assert chunk[PREDICTED_BAND_GAP_COLUMN].notna().all()
+        assert {"r_A", "r_B", "r_C", "octahedral_factor", "tolerance_factor"} <= set(chunk.columns)
+
+
+def test_score_band_gap_chunks_rejects_missing_columns(test_components):
+    chunks = [_prepared_table(1).drop(columns=["A_1"])]
+    with pytest.raises(ValueError, match="A_1"):
+        next(score_band_gap_chunks(chunks, test_components))
+
+
+def test_write_parquet_chunks(tmp_path):
+    chunks = [
+        pd.DataFrame({"A_3": [None, None], "A_3_coef": [0., 0.]}),
+        pd.DataFrame({"A_3": ["MA"], "A_3_coef": [0.5]}),
+    ]
+    path = tmp_path / "scored.parquet"
+
+    assert write_parquet_chunks(chunks, str(path)) == 3
+    df = pd.read_parquet(path)
+    assert df["A_3"].tolist() == [None, None, "MA"]
+
+
+def test_score_band_gap_chunks_parallel_keeps_order():
+    df = _prepared_table(6)
+    chunks = [df.iloc[i:i + 2].copy() for i in range(0, 6, 2)]
+
+    scored = list(score_band_gap_chunks_parallel(chunks, MODELS_PATH, workers=2))
+    assert [chunk.index.tolist() for chunk in scored] == [[0, 1], [2, 3], [4, 5]]
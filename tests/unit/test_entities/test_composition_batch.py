@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import BAND_GAP_PREDICTION_REQUESTS
+from ml_prediction_web_service.entities.composition_batch import CompositionBatch
+from ml_prediction_web_service.entities.dictionary import Element, Site
+from ml_prediction_web_service.entities.entities import ElementFraction, PerovskiteComposition
+from ml_prediction_web_service.services.features import vectorized_features
+from ml_prediction_web_service.services.preparation import prepare_perovskites_composition_batch_input
+
+COMPOSITIONS = [request.perovskite_composition for request in BAND_GAP_PREDICTION_REQUESTS] + [
+    PerovskiteComposition(
+        A_site=[
+            ElementFraction(name=Element.CS, frequence=0.05),
+            ElementFraction(name=Element.FA, frequence=0.8),
+            ElementFraction(name=Element.MA, frequence=0.15),
+        ],
+        B_site=[ElementFraction(name=Element.PB, frequence=1.0)],
+        C_site=[ElementFraction(name=Element.I, frequence=2.9), ElementFraction(name=Element.BR, frequence=0.1)],
+    )
+]
+
+
+def test_batch_is_compact_and_round_trips():
+    batch = CompositionBatch.from_compositions(COMPOSITIONS)
+
+    assert len(batch) == 3
+    assert batch.codes[Site.A].dtype == np.int16 and batch.codes[Site.A].shape == (3, 3)
+    assert batch.fractions[Site.C].dtype == np.float32 and batch.fractions[Site.C].shape == (3, 3)
+    assert batch.codes[Site.B][0].tolist() == [Element.PB.code, 0]
+    assert [composition.model_dump() for composition in batch.to_compositions()] == [
+        composition.model_dump() for composition in COMPOSITIONS
+    ]
+
+
+def test_batch_frame_matches_prepared_input():
+    batch = CompositionBatch.from_compositions(COMPOSITIONS[:2])
+    prepared = prepare_perovskites_composition_batch_input(BAND_GAP_PREDICTION_REQUESTS)
+
+    frame = batch.to_frame()
+    pd.testing.assert_frame_equal(frame, prepared[frame.columns], check_dtype=False)
+    assert [composition.model_dump() for composition in CompositionBatch.from_frame(frame).to_compositions()] == [
+        composition.model_dump() for composition in COMPOSITIONS[:2]
+    ]
+
+
+def test_composition_factors_match_frame_factors():
+    batch = CompositionBatch.from_compositions(COMPOSITIONS)
+
+    factors = vectorized_features.calculate_composition_factors(batch)
+
+    expected = vectorized_features.calculate_base_perovskite_factors(batch.to_frame())
+    for name, values in factors.items():
+        np.testing.assert_array_equal(values, expected[name].to_numpy())
+
+
+def test_site_sums_are_validated_per_row():
+    batch = CompositionBatch.from_compositions(COMPOSITIONS)
+    fractions = dict(batch.fractions)
+    fractions[Site.B] = fractions[Site.B].copy()
+    fractions[Site.B][1, 0] = 0.25
+    invalid = CompositionBatch(codes=batch.codes, fractions=fractions)
+
+    assert batch.site_sum_errors() == {}
+    assert invalid.site_sum_errors() == {1: "Fractions of B site must sum to 1.0, got 0.75"}
+    with pytest.raises(ValueError, match="Composition 1: Fractions of B site must sum to 1.0"):
+        invalid.validate()
@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from ml_prediction_web_service.entities.dictionary import Element, SpaceGroup, Dimension
+
+
+@pytest.mark.parametrize("element", list(Element))
+def test_element_indexes(element):
+    assert Element.get_element_by_name(element.nm) is element
+    assert Element.get_member_by_code(element.code) is element
+    assert Element.get_code_by_name(element.nm) == element.code
+
+
+def test_structure_dictionary_indexes():
+    assert SpaceGroup.get_code_by_name("Pm3m") == SpaceGroup.CUBIC.code
+    assert Dimension.get_member_by_name("3D") is Dimension.THREE_DIM
+    with pytest.raises(KeyError):
+        SpaceGroup.get_code_by_name("unknown")
+    with pytest.raises(ValueError):
+        Element.get_element_by_name("unknown")
+
+
+def test_property_tables_gather_by_code():
+    codes = Element.codes_from_names(["MA", None, "Pb", "I"])
+    radii = Element.property_table("ionic_radii")[codes]
+
+    assert codes.tolist() == [Element.MA.code, 0, Element.PB.code, Element.I.code]
+    assert np.isnan(radii[1])
+    np.testing.assert_array_equal(
+        radii[[0, 2, 3]], [Element.MA.ionic_radii, Element.PB.ionic_radii, Element.I.ionic_radii]
+    )
+    assert Element.property_table("hydrophobicity")[Element.BA.code] == 1.0
@@ -0,0 +1,34 @@
+import pytest
+from pydantic import ValidationError
+
+from ml_prediction_web_service.entities.dictionary import Element, SpaceGroup
+from ml_prediction_web_service.entities.entities import BandGapPredictionRequest, PerovskiteComposition
+
+BAND_GAP_PAYLOAD = {
+    "perovskite_composition": {
+        "A_site": [{"name": "MA", "frequence": 1.0}],
+        "B_site": [{"name": "Pb", "frequence": 1.0}],
+        "C_site": [{"name": "I", "frequence": 3.0}],
+    },
+    "inorganic_composition": False,
+    "dimension_list_of_layers": 1.0,
+    "dimension": "3D",
+    "space_group": "Pm3m",
+}
+
+
+def test_request_is_parsed_from_member_names():
+    request = BandGapPredictionRequest.model_validate(BAND_GAP_PAYLOAD)
+    assert request.perovskite_composition.B_site[0].name is Element.PB
+    assert request.space_group is SpaceGroup.CUBIC
+
+
+@pytest.mark.parametrize("site, fractions", [
+    ("A_site", [{"name": "MA", "frequence": 0.5}]),
+    ("B_site", [{"name": "Pb", "frequence": 0.5}, {"name": "Sn", "frequence": 0.6}]),
+    ("C_site", [{"name": "I", "frequence": 1.0}]),
+])
+def test_composition_fractions_must_sum_to_site_total(site, fractions):
+    composition = dict(BAND_GAP_PAYLOAD["perovskite_composition"], **{site: fractions})
+    with pytest.raises(ValidationError, match=f"Fractions of {site[0]} site"):
+        PerovskiteComposition.model_validate(composition)
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from conftest import BAND_GAP_PREDICTION_REQUESTS
+from ml_prediction_web_service.entities.composition_batch import CompositionBatch
+from ml_prediction_web_service.entities.dictionary import Element
+from ml_prediction_web_service.entities.entities import ElementFraction, PerovskiteComposition
+from ml_prediction_web_service.services.features import feature_context, vectorized_features
+from ml_prediction_web_service.services.features.feature_context import FeatureContext
+
+COMPOSITIONS = [request.perovskite_composition for request in BAND_GAP_PREDICTION_REQUESTS] + [
+    PerovskiteComposition(
+        A_site=[ElementFraction(name=Element.MA, frequence=0.2), ElementFraction(name=Element.FA, frequence=0.8)],
+        B_site=[ElementFraction(name=Element.PB, frequence=1.0)],
+        C_site=[ElementFraction(name=Element.I, frequence=2.4), ElementFraction(name=Element.BR, frequence=0.6)],
+    )
+]
+
+
+def test_derived_columns_are_computed_once(monkeypatch):
+    calls = []
+    factors = vectorized_features.calculate_composition_factors
+    monkeypatch.setattr(
+        feature_context, "_DERIVED_COLUMNS",
+        [(names, derive) if derive is not factors else (names, lambda batch: calls.append(1) or factors(batch))
+         for names, derive in feature_context._DERIVED_COLUMNS]
+    )
+    context = FeatureContext(CompositionBatch.from_compositions(COMPOSITIONS))
+
+    r_a = context.get("r_A")
+    context.columns(["tolerance_factor", "octahedral_factor", "A_1", "A_1_coef"])
+    subset = context.take(np.array([2]))
+
+    assert calls == [1]
+    assert subset.get("r_A").tolist() == r_a[[2]].tolist()
+    assert calls == [1]
+
+
+def test_formulas_and_frame():
+    context = FeatureContext(CompositionBatch.from_compositions(COMPOSITIONS))
+    context.set("band_gap", [1.5, 1.6, 1.7])
+
+    assert context.get("composition_long_form")[2] == "FA0.8MA0.2PbBr0.6I2.4"
+    assert context.get("composition_short_form")[2] == "FAMAPbBrI"
+    frame = context.frame(["A_1", "A_2", "band_gap"])
+    assert frame["A_1"].tolist() == ["MA", "MA", "MA"]
+    assert frame["A_2"].tolist() == [None, "FA", "FA"]
+    assert frame["band_gap"].tolist() == [1.5, 1.6, 1.7]
+    with pytest.raises(KeyError):
+        context.get("space_group")
+    with pytest.raises(ValueError):
+        context.set("band_gap", [1.5])
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ml_prediction_web_service.entities.dictionary import Element, Site
+from ml_prediction_web_service.services.features import structure_features, vectorized_features
+from ml_prediction_web_service.services.features.calc_factors import compute_octahedral_factor, compute_tolerance_factor
+
+COMPOSITIONS_DF = pd.DataFrame([
+    {"A_1": "MA", "A_2": None, "A_3": None, "A_1_coef": 1.0, "A_2_coef": 0, "A_3_coef": 0,
+     "B_1": "Pb", "B_2": None, "B_1_coef": 1.0, "B_2_coef": 0,
+     "C_1": "I", "C_2": None, "C_3": None, "C_1_coef": 3.0, "C_2_coef": 0, "C_3_coef": 0},
+    {"A_1": "Cs", "A_2": "FA", "A_3": "MA", "A_1_coef": 0.05, "A_2_coef": 0.8, "A_3_coef": 0.15,
+     "B_1": "Pb", "B_2": "Sn", "B_1_coef": 0.5, "B_2_coef": 0.5,
+     "C_1": "I", "C_2": "Br", "C_3": "Cl", "C_1_coef": 2.5, "C_2_coef": 0.4, "C_3_coef": 0.1},
+    {"A_1": "FA", "A_2": None, "A_3": None, "A_1_coef": 1.0, "A_2_coef": 0, "A_3_coef": 0,
+     "B_1": None, "B_2": None, "B_1_coef": 0, "B_2_coef": 0,
+     "C_1": None, "C_2": None, "C_3": None, "C_1_coef": 0, "C_2_coef": 0, "C_3_coef": 0},
+])
+
+
+@pytest.mark.parametrize("site", list(Site))
+def test_calculate_effective_radii_matches_row_wise(site):
+    expected = COMPOSITIONS_DF.apply(
+        lambda row: structure_features.calculate_effective_radii_for_site(row, site), axis=1
+    ).to_numpy()
+    result = vectorized_features.calculate_effective_radii(COMPOSITIONS_DF, site)
+    np.testing.assert_array_equal(result, expected)
+
+
+def test_calculate_base_perovskite_factors_matches_scalar_factors():
+    df = vectorized_features.calculate_base_perovskite_factors(COMPOSITIONS_DF.copy())
+    for _, row in df.iterrows():
+        assert row["tolerance_factor"] == compute_tolerance_factor(row["r_A"], row["r_B"], row["r_C"])
+        assert row["octahedral_factor"] == compute_octahedral_factor(row["r_B"], row["r_C"])
+
+
+def test_calculate_effective_radii_rejects_unknown_element():
+    df = COMPOSITIONS_DF.copy()
+    df.loc[0, "A_1"] = "Unobtainium"
+    with pytest.raises(ValueError):
+        vectorized_features.calculate_effective_radii(df, Site.A)
+
+
+def test_get_element_codes_maps_empty_slots_to_zero():
+    codes = vectorized_features.get_element_codes(COMPOSITIONS_DF["A_2"])
+    assert codes.tolist() == [0, Element.FA.code, 0]
@@ -0,0 +1,62 @@
+import pandas as pd
+import pyarrow.dataset as ds
+import pytest
+
+from ml_prediction_web_service.google_storage.storage import LocalFileStorage
+
+
+def _frame(n_rows: int) -> pd.DataFrame:
+    return pd.DataFrame({
+        "id": range(n_rows),
+        "name": [f"row_{i}" for i in range(n_rows)],
+        "value": [i / 10 for i in range(n_rows)],
+    })
+
+
+def _chunks(df: pd.DataFrame, chunk_size: int):
+    for start in range(0, len(df), chunk_size):
+        yield df.iloc[start:start + chunk_size]
+
+
+@pytest.mark.parametrize("file_format", ["csv", "parquet"])
+def test_chunked_round_trip(tmp_path, file_format):
+    storage = LocalFileStorage(tmp_path)
+    df = _frame(10)
+
+    storage.upload_dataframe_chunks(_chunks(df, 4), f"tables/data.{file_format}")
+    chunks = list(storage.iter_dataframe_chunks(f"tables/data.{file_format}", chunk_size=3))
+
+    assert [len(chunk) for chunk in chunks] == [3, 3, 3, 1]
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), df)
+    assert list((tmp_path / "tables").iterdir()) == [tmp_path / "tables" / f"data.{file_format}"]
+
+
+def test_parquet_projection_and_filters(tmp_path):
+    storage = LocalFileStorage(tmp_path)
+    storage.upload_dataframe_chunks(_chunks(_frame(100), 10), "data.parquet")
+
+    batches = list(storage.iter_record_batches("data.parquet", columns=["id", "value"], filters=[("id", ">=", 95)]))
+    assert all(batch.schema.names == ["id", "value"] for batch in batches)
+    assert sum(batch.num_rows for batch in batches) == 5
+
+    chunks = storage.iter_dataframe_chunks("data.parquet", filters=ds.field("name") == "row_42")
+    assert pd.concat(chunks)["id"].tolist() == [42]
+
+
+def test_csv_filters_are_rejected(tmp_path):
+    storage = LocalFileStorage(tmp_path)
+    storage.upload_dataframe(_frame(3), "data.csv", "csv")
+
+    with pytest.raises(ValueError):
+        list(storage.iter_dataframe_chunks("data.csv", filters=[("id", ">", 1)]))
+
+
+def test_download_dataframe_and_missing_file(tmp_path):
+    storage = LocalFileStorage(tmp_path)
+    storage.upload_dataframe(_frame(3), "data.parquet", "parquet")
+
+    pd.testing.assert_frame_equal(storage.download_dataframe("data.parquet"), _frame(3))
+    assert storage.verify_existence("data.parquet")
+    assert not storage.verify_existence("missing.parquet")
+    with pytest.raises(FileNotFoundError):
+        storage.download_file("missing.parquet")
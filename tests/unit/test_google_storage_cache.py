@@ -0,0 +1,166 @@
+import hashlib
+import os
+import threading
+from types import SimpleNamespace
+
+import pytest
+from googleapiclient.errors import HttpError
+
+from ml_prediction_web_service.google_storage.storage import GoogleDriveStorage
+
+
+class _Request:
+    def __init__(self, execute):
+        self.headers = {}
+        self._execute = execute
+
+    def execute(self):
+        return self._execute(self.headers)
+
+
+class _FakeDrive:
+    """
+    In-memory stand-in of the Drive v3 `files()` resource.
+    """
+
+    def __init__(self, files):
+        self.files_by_id = {}
+        self.ids_by_name = {}
+        self.calls = {"list": 0, "get": 0, "get_media": 0}
+        self._lock = threading.Lock()
+        for name, content in files.items():
+            self.put(name, content)
+
+    def put(self, name: str, content: bytes, file_id: str | None = None):
+        file_id = file_id or f"id-{name}"
+        self.files_by_id[file_id] = content
+        self.ids_by_name[name] = file_id
+
+    def files(self):
+        return self
+
+    def list(self, q, spaces, fields):
+        name = q.split('"')[1]
+        self._count("list")
+        file_id = self.ids_by_name.get(name)
+        return _Request(lambda _: {"files": [{"id": file_id, "name": name}] if file_id else []})
+
+    def get(self, fileId, fields):
+        self._count("get")
+
+        def execute(_):
+            if fileId not in self.files_by_id:
+                raise HttpError(resp=SimpleNamespace(status=404, reason="Not Found"), content=b"")
+            content = self.files_by_id[fileId]
+            return {
+                "id": fileId, "size": str(len(content)), "md5Checksum": hashlib.md5(content).hexdigest(),
+                "modifiedTime": "2025-01-01T00:00:00Z",
+            }
+        return _Request(execute)
+
+    def get_media(self, fileId):
+        self._count("get_media")
+
+        def execute(headers):
+            start, end = headers["Range"].removeprefix("bytes=").split("-")
+            return self.files_by_id[fileId][int(start):int(end) + 1]
+        return _Request(execute)
+
+    def _count(self, call: str):
+        with self._lock:
+            self.calls[call] += 1
+
+
+def _storage(drive: _FakeDrive, cache_dir, chunk_size: int = 4, cache_max_bytes: int = 0) -> GoogleDriveStorage:
+    return GoogleDriveStorage(
+        None, cache_dir=str(cache_dir), chunk_size=chunk_size, service_factory=lambda: drive,
+        cache_max_bytes=cache_max_bytes
+    )
+
+
+def test_download_is_chunked_and_cached(tmp_path):
+    drive = _FakeDrive({"data.csv": b"a,b\n1,2\n3,4\n"})
+    storage = _storage(drive, tmp_path)
+
+    assert storage.download_file("raw/data.csv") == b"a,b\n1,2\n3,4\n"
+    assert drive.calls["get_media"] == 3
+    assert storage.download_file("raw/data.csv") == b"a,b\n1,2\n3,4\n"
+    assert drive.calls["get_media"] == 3
+    assert drive.calls["list"] == 1
+
+    # the path -> ID index and the blobs survive a restart
+    restarted = _storage(drive, tmp_path)
+    assert restarted.download_file("raw/data.csv") == b"a,b\n1,2\n3,4\n"
+    assert drive.calls["list"] == 1
+    assert drive.calls["get_media"] == 3
+
+
+def test_changed_file_is_downloaded_again(tmp_path):
+    drive = _FakeDrive({"data.csv": b"old"})
+    storage = _storage(drive, tmp_path)
+    storage.download_file("data.csv")
+
+    drive.put("data.csv", b"new content")
+
+    assert storage.download_file("data.csv") == b"new content"
+
+
+def test_stale_file_id_is_resolved_again(tmp_path):
+    drive = _FakeDrive({"data.csv": b"content"})
+    storage = _storage(drive, tmp_path)
+    storage.download_file("data.csv")
+
+    del drive.files_by_id["id-data.csv"]
+    drive.put("data.csv", b"replaced", file_id="id-replaced")
+
+    assert storage.download_file("data.csv") == b"replaced"
+    assert drive.calls["list"] == 2
+
+
+def test_missing_file_raises(tmp_path):
+    storage = _storage(_FakeDrive({}), tmp_path)
+
+    with pytest.raises(FileNotFoundError):
+        storage.download_file("missing.csv")
+
+
+def test_interrupted_download_resumes(tmp_path):
+    content = b"0123456789abcdef"
+    drive = _FakeDrive({"model.joblib": content})
+    storage = _storage(drive, tmp_path)
+    key = hashlib.md5(content).hexdigest()
+    (tmp_path / "blobs" / f"{key}.part").write_bytes(content[:8])
+
+    assert storage.download_file("model.joblib") == content
+    assert drive.calls["get_media"] == 2
+
+
+def test_empty_file_is_not_fetched(tmp_path):
+    drive = _FakeDrive({"empty.csv": b""})
+    storage = _storage(drive, tmp_path)
+
+    assert storage.download_file("empty.csv") == b""
+    assert drive.calls["get_media"] == 0
+
+
+def test_least_recently_used_blobs_are_evicted(tmp_path):
+    drive = _FakeDrive({"a.bin": b"a" * 8, "b.bin": b"b" * 8, "c.bin": b"c" * 8})
+    storage = _storage(drive, tmp_path, cache_max_bytes=16)
+    a_path = storage.download_file_to_path("a.bin")
+    storage.download_file_to_path("b.bin")
+    os.utime(a_path, (0, 0))
+
+    storage.download_file_to_path("c.bin")
+
+    blobs = {path.read_bytes() for path in (tmp_path / "blobs").iterdir() if not path.suffix}
+    assert blobs == {b"b" * 8, b"c" * 8}
+
+
+def test_download_files_fetches_concurrently(tmp_path):
+    files = {f"file_{i}.bin": bytes([i]) * 10 for i in range(8)}
+    drive = _FakeDrive(files)
+    storage = _storage(drive, tmp_path)
+
+    paths = storage.download_files(list(files), max_workers=4)
+
+    assert {name: path.read_bytes() for name, path in paths.items()} == files
@@ -0,0 +1,50 @@
+import threading
+
+import pytest
+
+from ml_prediction_web_service.services.inference_executor import InferenceExecutor, InferenceOverloadedError
+
+
+@pytest.mark.asyncio
+async def test_run_uses_inference_threads():
+    executor = InferenceExecutor(workers=2)
+
+    thread_name = await executor.run(lambda: threading.current_thread().name)
+    executor.shutdown()
+
+    assert thread_name.startswith("inference")
+
+
+def test_admission_is_bounded():
+    executor = InferenceExecutor(workers=1, max_in_flight=2, retry_after_seconds=3.)
+
+    with executor.admit(), executor.admit():
+        with pytest.raises(InferenceOverloadedError) as e:
+            executor.admit()
+        assert e.value.retry_after_seconds == 3.
+
+    with executor.admit():
+        pass
+    executor.shutdown()
+
+    stats = executor.stats()
+    assert stats["in_flight"] == 0
+    assert stats["admitted_total"] == 3
+    assert stats["rejected_total"] == 1
+
+
+@pytest.mark.asyncio
+async def test_iterate_consumes_iterator_in_pool():
+    executor = InferenceExecutor(workers=1)
+    consumed_in = []
+
+    def produce():
+        for i in range(3):
+            consumed_in.append(threading.current_thread().name)
+            yield i
+
+    items = [item async for item in executor.iterate(produce())]
+    executor.shutdown()
+
+    assert items == [0, 1, 2]
+    assert all(name.startswith("inference") for name in consumed_in)
@@ -0,0 +1,49 @@
+from ml_prediction_web_service.services.metrics import (
+    MetricsRegistry,
+    PREDICTION_STAGE_SECONDS,
+    collect_server_timings,
+    format_server_timing,
+    observe_stage
+)
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("latency_seconds", "Latency", ("stage",), buckets=(0.1, 1.))
+    histogram.observe(0.05, stage="predict")
+    histogram.observe(0.5, stage="predict")
+    histogram.observe(5., stage="predict")
+
+    lines = registry.render().splitlines()
+
+    assert "# TYPE latency_seconds histogram" in lines
+    assert 'latency_seconds_bucket{stage="predict",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{stage="predict",le="1.0"} 2' in lines
+    assert 'latency_seconds_bucket{stage="predict",le="+Inf"} 3' in lines
+    assert 'latency_seconds_count{stage="predict"} 3' in lines
+    assert 'latency_seconds_sum{stage="predict"} 5.55' in lines
+
+
+def test_counter_escapes_label_values():
+    registry = MetricsRegistry()
+    counter = registry.counter("errors_total", "Errors", ("model",))
+    counter.inc(model='band "gap"')
+    counter.inc(2, model='band "gap"')
+
+    assert 'errors_total{model="band \\"gap\\""} 3.0' in registry.render().splitlines()
+
+
+def test_observe_stage_records_histogram_and_server_timings():
+    before = PREDICTION_STAGE_SECONDS.count(model="TEST", stage="prepare")
+
+    with collect_server_timings() as timings:
+        with observe_stage("TEST", "prepare"):
+            pass
+        with observe_stage("TEST", "prepare"):
+            pass
+
+    assert PREDICTION_STAGE_SECONDS.count(model="TEST", stage="prepare") == before + 2
+    assert [(stage, model) for stage, model, _ in timings] == [("prepare", "TEST")] * 2
+    header = format_server_timing(timings, 0.01)
+    assert header.startswith('prepare;desc="TEST";dur=')
+    assert header.endswith("total;dur=10.000")
@@ -0,0 +1,132 @@
+import hashlib
+import os
+
+import joblib
+import numpy as np
+
+from ml_prediction_web_service.entities.model_dictionary import SavedModelName
+from ml_prediction_web_service.repository.model_repository import GoogleModelRepository, LocalModelRepository
+
+
+def _dump_model(models_path, model_name: SavedModelName, model, mtime_ns: int):
+    path = models_path / model_name.value
+    joblib.dump(model, path)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_model_is_loaded_once(tmp_path):
+    _dump_model(tmp_path, SavedModelName.BAND_GAP_XGB, {"version": 1}, 1_000_000_000)
+    repository = LocalModelRepository(str(tmp_path))
+
+    first = repository.get_band_gap_xgb_model()
+    second = repository.get_band_gap_xgb_model()
+    assert first is second
+    assert repository.get_model_version(SavedModelName.BAND_GAP_XGB) is not None
+
+
+def test_load_models_skips_missing_artifacts(tmp_path):
+    _dump_model(tmp_path, SavedModelName.BAND_GAP_XGB, {"version": 1}, 1_000_000_000)
+    repository = LocalModelRepository(str(tmp_path))
+
+    loaded = repository.load_models()
+    assert loaded == [SavedModelName.BAND_GAP_XGB]
+
+
+def test_reload_swaps_changed_model(tmp_path):
+    _dump_model(tmp_path, SavedModelName.BAND_GAP_XGB, {"version": 1}, 1_000_000_000)
+    repository = LocalModelRepository(str(tmp_path))
+    repository.load_models()
+    old_version = repository.get_model_version(SavedModelName.BAND_GAP_XGB)
+
+    assert repository.reload() == []
+
+    _dump_model(tmp_path, SavedModelName.BAND_GAP_XGB, {"version": 2}, 2_000_000_000)
+    assert repository.reload() == [SavedModelName.BAND_GAP_XGB]
+    assert repository.get_band_gap_xgb_model() == {"version": 2}
+    assert repository.get_model_version(SavedModelName.BAND_GAP_XGB) != old_version
+
+
+def test_reload_keeps_model_when_artifact_is_broken(tmp_path):
+    _dump_model(tmp_path, SavedModelName.BAND_GAP_XGB, {"version": 1}, 1_000_000_000)
+    repository = LocalModelRepository(str(tmp_path))
+    repository.load_models()
+
+    path = tmp_path / SavedModelName.BAND_GAP_XGB.value
+    path.write_bytes(b"not a joblib file")
+    os.utime(path, ns=(2_000_000_000, 2_000_000_000))
+
+    assert repository.reload() == []
+    assert repository.get_band_gap_xgb_model() == {"version": 1}
+
+
+def test_memory_mapped_arrays_are_shared_from_the_artifact(tmp_path):
+    _dump_model(tmp_path, SavedModelName.BAND_GAP_XGB, {"weights": np.arange(1000.)}, 1_000_000_000)
+    repository = LocalModelRepository(str(tmp_path), mmap_mode="r")
+
+    weights = repository.get_band_gap_xgb_model()["weights"]
+    assert isinstance(weights, np.memmap)
+    np.testing.assert_array_equal(weights, np.arange(1000.))
+
+
+class _FakeStorage:
+    """
+    Stands in for GoogleDriveStorage: artifacts are files in `remote_path`, blobs are named by content hash.
+    """
+
+    def __init__(self, remote_path, blobs_path):
+        self.remote_path = remote_path
+        self.blobs_path = blobs_path
+        self.blobs_path.mkdir()
+        self.available = True
+        self.downloads = 0
+
+    def get_metadata(self, filepath: str):
+        if not self.available:
+            raise ConnectionError("Drive is unreachable")
+        path = self.remote_path / filepath
+        if not path.exists():
+            raise FileNotFoundError(filepath)
+        return {"id": filepath, "md5Checksum": hashlib.md5(path.read_bytes()).hexdigest()}
+
+    def download_file_to_path(self, filepath: str):
+        key = self.get_metadata(filepath)["md5Checksum"]
+        self.downloads += 1
+        blob_path = self.blobs_path / key
+        blob_path.write_bytes((self.remote_path / filepath).read_bytes())
+        return blob_path
+
+
+def _google_repository(tmp_path, storage):
+    return GoogleModelRepository(storage, cache_path=str(tmp_path / "cache"), remote_path="models")
+
+
+def test_google_repository_downloads_once_and_hot_swaps(tmp_path):
+    (tmp_path / "remote" / "models").mkdir(parents=True)
+    storage = _FakeStorage(tmp_path / "remote", tmp_path / "blobs")
+    joblib.dump({"version": 1}, tmp_path / "remote" / "models" / SavedModelName.BAND_GAP_XGB.value)
+    repository = _google_repository(tmp_path, storage)
+
+    assert repository.load_models() == [SavedModelName.BAND_GAP_XGB]
+    assert repository.get_band_gap_xgb_model() == {"version": 1}
+    assert repository.reload() == []
+    assert storage.downloads == 1
+
+    joblib.dump({"version": 2}, tmp_path / "remote" / "models" / SavedModelName.BAND_GAP_XGB.value)
+    assert repository.reload() == [SavedModelName.BAND_GAP_XGB]
+    assert repository.get_band_gap_xgb_model() == {"version": 2}
+    assert storage.downloads == 2
+
+
+def test_google_repository_cold_starts_from_cache_without_drive(tmp_path):
+    (tmp_path / "remote" / "models").mkdir(parents=True)
+    storage = _FakeStorage(tmp_path / "remote", tmp_path / "blobs")
+    joblib.dump({"version": 1}, tmp_path / "remote" / "models" / SavedModelName.BAND_GAP_XGB.value)
+    _google_repository(tmp_path, storage).load_models()
+
+    storage.available = False
+    restarted = _google_repository(tmp_path, storage)
+
+    assert restarted.load_models() == [SavedModelName.BAND_GAP_XGB]
+    assert restarted.get_band_gap_xgb_model() == {"version": 1}
+    assert restarted.reload() == []
+    assert storage.downloads == 1
@@ -0,0 +1,110 @@
+import json
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.compose import ColumnTransformer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+from xgboost import XGBRegressor
+
+from ml_prediction_web_service.entities.model_dictionary import SavedModelName
+from ml_prediction_web_service.repository.model_repository import LocalModelRepository
+from ml_prediction_web_service.repository.model_store import (
+    FEATURE_CATEGORICAL,
+    FEATURE_NUMERIC,
+    ModelManifestError,
+    convert_model,
+    manifest_path
+)
+from ml_prediction_web_service.services.tree_evaluator import TREE_ARRAYS, FlatTreeEnsemble, get_tree_ensemble
+
+FRAME = pd.DataFrame({
+    "r_A": np.linspace(1., 3., 40),
+    "tolerance_factor": np.linspace(0.8, 1.1, 40),
+    "dimension": ["3D", "2D"] * 20,
+})
+
+
+def _dump_pipeline(models_path, scale: float = 2.) -> Pipeline:
+    pipeline = Pipeline([
+        ("preprocessor", ColumnTransformer([
+            ("num", Pipeline([("scaler", StandardScaler())]), ["r_A", "tolerance_factor"]),
+            ("cat", Pipeline([("onehot", OneHotEncoder(handle_unknown="ignore"))]), ["dimension"]),
+        ])),
+        ("regressor", XGBRegressor(n_estimators=5, max_depth=2)),
+    ])
+    pipeline.fit(FRAME, FRAME["r_A"] * scale)
+    joblib.dump(pipeline, models_path / SavedModelName.BAND_GAP_XGB.value)
+    return pipeline
+
+
+def test_converted_model_loads_natively(tmp_path):
+    pipeline = _dump_pipeline(tmp_path)
+
+    manifest = convert_model(tmp_path, SavedModelName.BAND_GAP_XGB, training={"dataset": "test"})
+    repository = LocalModelRepository(str(tmp_path))
+
+    assert repository.load_models() == [SavedModelName.BAND_GAP_XGB]
+    assert manifest.feature_schema == {
+        "r_A": FEATURE_NUMERIC, "tolerance_factor": FEATURE_NUMERIC, "dimension": FEATURE_CATEGORICAL
+    }
+    assert manifest.training["dataset"] == "test"
+    assert repository.get_model_version(SavedModelName.BAND_GAP_XGB).startswith(f"{manifest.version}+")
+    assert repository.get_load_seconds(SavedModelName.BAND_GAP_XGB) > 0
+    model = repository.get_band_gap_xgb_model()
+    assert model is not pipeline
+    np.testing.assert_allclose(model.predict(FRAME), pipeline.predict(FRAME), rtol=1e-6)
+
+
+def test_converted_trees_are_memory_mapped(tmp_path):
+    pipeline = _dump_pipeline(tmp_path)
+    manifest = convert_model(tmp_path, SavedModelName.BAND_GAP_XGB)
+    repository = LocalModelRepository(str(tmp_path), mmap_mode="r")
+
+    model = repository.get_band_gap_xgb_model()
+
+    assert manifest.trees is not None
+    ensemble = get_tree_ensemble(model.steps[-1][1].get_booster())
+    flattened = FlatTreeEnsemble.from_booster(pipeline.steps[-1][1].get_booster())
+    for name in TREE_ARRAYS:
+        assert isinstance(getattr(ensemble, name), np.memmap)
+        np.testing.assert_array_equal(getattr(ensemble, name), getattr(flattened, name))
+    matrix = model[:-1].transform(FRAME)
+    np.testing.assert_allclose(ensemble.predict(matrix), pipeline.predict(FRAME), rtol=1e-5)
+
+
+def test_model_converted_again_under_the_same_version_is_reloaded(tmp_path):
+    _dump_pipeline(tmp_path)
+    convert_model(tmp_path, SavedModelName.BAND_GAP_XGB, version="2025.1")
+    repository = LocalModelRepository(str(tmp_path))
+    repository.load_models()
+    loaded_version = repository.get_model_version(SavedModelName.BAND_GAP_XGB)
+
+    retrained = _dump_pipeline(tmp_path, scale=3.)
+    convert_model(tmp_path, SavedModelName.BAND_GAP_XGB, version="2025.1")
+
+    assert repository.reload() == [SavedModelName.BAND_GAP_XGB]
+    assert repository.get_model_version(SavedModelName.BAND_GAP_XGB) != loaded_version
+    np.testing.assert_allclose(repository.get_band_gap_xgb_model().predict(FRAME), retrained.predict(FRAME), rtol=1e-6)
+
+
+def test_artifact_not_matching_its_manifest_fails_the_load(tmp_path):
+    _dump_pipeline(tmp_path)
+    convert_model(tmp_path, SavedModelName.BAND_GAP_XGB)
+    (tmp_path / "xgboost_band_gap.ubj").write_bytes(b"retrained elsewhere")
+
+    with pytest.raises(ModelManifestError, match="checksum of xgboost_band_gap.ubj"):
+        LocalModelRepository(str(tmp_path)).load_models()
+
+
+def test_manifest_of_another_model_is_rejected(tmp_path):
+    _dump_pipeline(tmp_path)
+    manifest = convert_model(tmp_path, SavedModelName.BAND_GAP_XGB)
+    data = json.loads(manifest_path(tmp_path, SavedModelName.BAND_GAP_XGB).read_text())
+    data["model"] = SavedModelName.JV_PCE_XGB.name
+    manifest_path(tmp_path, SavedModelName.BAND_GAP_XGB).write_text(json.dumps(data))
+
+    with pytest.raises(ModelManifestError, match="found for model BAND_GAP_XGB"):
+        LocalModelRepository(str(tmp_path)).get_band_gap_xgb_model()
@@ -0,0 +1,142 @@
+import numpy as np
+import pyarrow as pa
+import pytest
+from pydantic import ValidationError
+
+from ml_prediction_web_service.entities.dictionary import Element, Site
+from ml_prediction_web_service.entities.entities import BandGapPredictionRequest
+from ml_prediction_web_service.services.batch_parsing import (
+    format_validation_error,
+    parse_band_gap_items,
+    parse_band_gap_table
+)
+from ml_prediction_web_service.services.prediction_service import (
+    BATCH_FAST_PARSE_MIN_ITEMS,
+    band_gap_response_from_table,
+    band_gap_response_to_table,
+    predict_band_gap_batch_service,
+    predict_band_gap_table_service
+)
+
+
+def _payload(a_site, b_site, c_site, **fields):
+    return {
+        "perovskite_composition": {
+            "A_site": [{"name": name, "frequence": frequence} for name, frequence in a_site],
+            "B_site": [{"name": name, "frequence": frequence} for name, frequence in b_site],
+            "C_site": [{"name": name, "frequence": frequence} for name, frequence in c_site],
+        },
+        "inorganic_composition": False,
+        "dimension_list_of_layers": 1.0,
+        "dimension": "3D",
+        "space_group": "Pm3m",
+        **fields,
+    }
+
+
+VALID = _payload([("FA", 0.8), ("Cs", 0.2)], [("Pb", 1.0)], [("I", 2.5), ("Br", 0.5)])
+ITEMS = [
+    VALID,
+    _payload([("MA", 1.0)], [("Pb", 1.0)], [("I", 1.0)]),
+    _payload([("MA", 1.0)], [("Pb", 0.5), ("Sn", 0.5)], [("I", 3)], inorganic_composition="true"),
+    _payload([("XX", 1.0)], [("Pb", 1.0)], [("I", 3.0)]),
+    _payload([("MA", 1.0)], [("Pb", 1.0)], [("I", float("nan"))]),
+    {key: value for key, value in VALID.items() if key != "dimension"},
+    "not a request",
+]
+
+
+def _model_error(item) -> str | None:
+    try:
+        BandGapPredictionRequest.model_validate(item)
+    except ValidationError as e:
+        return format_validation_error(e)
+    return None
+
+
+def test_parse_matches_model_validation():
+    parsed = parse_band_gap_items(ITEMS)
+
+    expected_errors = {i: _model_error(item) for i, item in enumerate(ITEMS) if _model_error(item) is not None}
+    assert parsed.errors == expected_errors
+    assert parsed.indices.tolist() == [0, 2]
+
+    compositions = parsed.compositions.to_compositions()
+    for row, index in enumerate(parsed.indices):
+        request = BandGapPredictionRequest.model_validate(ITEMS[index])
+        assert compositions[row].model_dump() == request.perovskite_composition.model_dump()
+        assert parsed.composition_inorganic[row] == request.inorganic_composition
+        assert parsed.space_group[row] == request.space_group.nm
+    assert parsed.compositions.codes[Site.B][1].tolist() == [Element.PB.code, Element.SN.code]
+
+
+def test_fast_parse_predicts_like_single_requests(test_components):
+    items = (ITEMS * (BATCH_FAST_PARSE_MIN_ITEMS // len(ITEMS) + 1))[:BATCH_FAST_PARSE_MIN_ITEMS]
+
+    fast = predict_band_gap_batch_service(items, test_components)
+    small = [predict_band_gap_batch_service([item], test_components).results[0] for item in items]
+
+    assert [result.error for result in fast.results] == [result.error for result in small]
+    np.testing.assert_allclose(
+        [result.band_gap or np.nan for result in fast.results],
+        [result.band_gap or np.nan for result in small],
+        rtol=1e-6
+    )
+
+
+def _table(items) -> pa.Table:
+    """
+    Prepared input columns of payloads that `parse_band_gap_items` accepts, names as a dictionary column.
+    """
+    parsed = parse_band_gap_items(items)
+    frame = parsed.compositions.to_frame()
+    for name, values in parsed.columns().items():
+        frame[name] = values
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    return table.set_column(0, "A_1", table.column("A_1").dictionary_encode())
+
+
+def test_parse_table_matches_item_parsing():
+    items = [ITEMS[0], ITEMS[2], ITEMS[0]]
+    parsed_items = parse_band_gap_items(items)
+    table = _table(items)
+    names = table.column("B_1").to_pylist()
+    coefs = table.column("C_1_coef").to_pylist()
+    table = table.set_column(table.schema.get_field_index("B_1"), "B_1", pa.array([names[0], "XX", names[2]]))
+    table = table.set_column(
+        table.schema.get_field_index("C_1_coef"), "C_1_coef", pa.array([coefs[0], coefs[1], None])
+    )
+
+    parsed = parse_band_gap_table(table)
+
+    assert parsed.indices.tolist() == [0]
+    assert parsed.errors[1] == "B_1: No element found with name 'XX'"
+    assert parsed.errors[2].startswith("perovskite_composition: Value error, Fractions of C site must sum to 3.0")
+    for site in Site:
+        np.testing.assert_array_equal(parsed.compositions.codes[site], parsed_items.compositions.codes[site][:1])
+        np.testing.assert_array_equal(
+            parsed.compositions.fractions[site], parsed_items.compositions.fractions[site][:1]
+        )
+    for name, values in parsed.columns().items():
+        assert values.tolist() == parsed_items.columns()[name][:1].tolist()
+
+
+def test_parse_table_rejects_missing_columns():
+    with pytest.raises(ValueError, match="dimension"):
+        parse_band_gap_table(_table([VALID]).drop_columns(["dimension"]))
+
+
+def test_table_service_predicts_like_items(test_components):
+    items = [ITEMS[0], ITEMS[2]]
+    table = _table(items)
+    table = table.set_column(table.schema.get_field_index("dimension"), "dimension", pa.array(["3D", "9D"]))
+
+    results = predict_band_gap_table_service(table, test_components)
+
+    expected = predict_band_gap_batch_service(items[:1], test_components).results[0]
+    assert results.column("index").to_pylist() == [0, 1]
+    assert results.column("error").to_pylist() == [None, "dimension: Unknown dimension '9D'"]
+    np.testing.assert_allclose(results.column("band_gap").to_pylist()[0], expected.band_gap, rtol=1e-6)
+    assert results.column("band_gap").to_pylist()[1] is None
+    response = band_gap_response_from_table(results)
+    assert band_gap_response_to_table(response).equals(results)
@@ -0,0 +1,70 @@
+import dataclasses
+
+import numpy as np
+import pytest
+
+from conftest import BAND_GAP_PREDICTION_REQUESTS
+from ml_prediction_web_service.entities.dictionary import Element
+from ml_prediction_web_service.services.fast_inference import (
+    CompiledPipeline,
+    build_band_gap_columns,
+    get_compiled_pipeline
+)
+from ml_prediction_web_service.services.features.vectorized_features import calculate_base_perovskite_factors
+from ml_prediction_web_service.services.prediction_service import (
+    PREDICTION_ENGINE_ARRAY,
+    predict_band_gap_batch,
+    predict_band_gap_for_frame
+)
+from ml_prediction_web_service.services.preparation import prepare_perovskites_composition_batch_input
+
+
+@pytest.fixture
+def band_gap_model(test_components):
+    return test_components.model_repository.get_band_gap_xgb_model()
+
+
+def test_compiled_pipeline_encodes_like_preprocessor(band_gap_model):
+    compiled = CompiledPipeline.from_sklearn(band_gap_model)
+    preprocessor = band_gap_model.named_steps["preprocessor"]
+    df_input = calculate_base_perovskite_factors(
+        prepare_perovskites_composition_batch_input(BAND_GAP_PREDICTION_REQUESTS)
+    )
+
+    matrix = compiled.encode(build_band_gap_columns(BAND_GAP_PREDICTION_REQUESTS))
+
+    expected = preprocessor.transform(df_input)
+    if preprocessor.sparse_output_:
+        expected = expected.toarray()
+        expected[expected == 0] = np.nan
+    np.testing.assert_allclose(matrix, expected.astype(np.float32), rtol=1e-6)
+
+
+def test_compiled_pipeline_accepts_element_names(band_gap_model):
+    compiled = CompiledPipeline.from_sklearn(band_gap_model)
+    columns = build_band_gap_columns(BAND_GAP_PREDICTION_REQUESTS)
+    named_columns = {
+        name: np.array([Element.get_member_by_code(code).nm if code else None for code in values], dtype=object)
+        if values.dtype == np.int16 else values
+        for name, values in columns.items()
+    }
+
+    np.testing.assert_array_equal(compiled.encode(columns), compiled.encode(named_columns))
+
+
+def test_array_engine_matches_dataframe_engine(band_gap_model, test_components):
+    expected = predict_band_gap_for_frame(
+        prepare_perovskites_composition_batch_input(BAND_GAP_PREDICTION_REQUESTS), band_gap_model
+    )
+
+    components = dataclasses.replace(test_components, prediction_engine=PREDICTION_ENGINE_ARRAY)
+    band_gaps = predict_band_gap_batch(BAND_GAP_PREDICTION_REQUESTS, components)
+
+    np.testing.assert_allclose(band_gaps, expected, rtol=1e-5)
+
+
+def test_get_compiled_pipeline_falls_back_for_unsupported_models():
+    class Model:
+        pass
+
+    assert get_compiled_pipeline(Model()) is None
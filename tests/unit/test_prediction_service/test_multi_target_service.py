@@ -0,0 +1,81 @@
+import os
+
+import numpy as np
+
+from conftest import BAND_GAP_PREDICTION_REQUESTS, MODELS_PATH
+from ml_prediction_web_service.components import AppComponents
+from ml_prediction_web_service.entities.dictionary import BackContact, CellArchitecture, ETLStack
+from ml_prediction_web_service.entities.entities import (
+    DeviceConditions,
+    JVPCEPredictionRequest,
+    MultiTargetPredictionRequest,
+    StabilityConditions,
+    StabilityTemperatureRange
+)
+from ml_prediction_web_service.entities.model_dictionary import SavedModelName
+from ml_prediction_web_service.repository.model_repository import LocalModelRepository
+from ml_prediction_web_service.services.multi_target_service import predict_all_targets_batch_service
+from ml_prediction_web_service.services.prediction_service import predict_band_gap_batch, predict_jv_pce_batch
+
+DEVICE = DeviceConditions(cell_architecture=CellArchitecture.NIP, perovskite_thickness=500., deposition_solvents="DMF")
+STABILITY = StabilityConditions(
+    temperature_range=StabilityTemperatureRange(temperature_start=25., temperature_end=85.),
+    cell_area=0.1,
+    pce_initial=20.,
+    stability_protocol="ISOS-L-1",
+    stability_light_intensity=100.,
+    stability_time_total_exposure=1000.,
+    backcontact=BackContact.Au,
+    etl_stack_sequence=ETLStack.TI_O2_c,
+    cell_architecture=CellArchitecture.NIP,
+)
+
+
+def test_all_targets_chain_band_gap_into_jv_pce(test_components):
+    requests = [
+        MultiTargetPredictionRequest(**BAND_GAP_PREDICTION_REQUESTS[0].model_dump(), device=DEVICE),
+        MultiTargetPredictionRequest(**BAND_GAP_PREDICTION_REQUESTS[1].model_dump()),
+    ]
+
+    responses = predict_all_targets_batch_service(requests, test_components)
+
+    band_gaps = predict_band_gap_batch(BAND_GAP_PREDICTION_REQUESTS, test_components)
+    np.testing.assert_allclose([response.band_gap for response in responses], band_gaps, rtol=1e-6)
+    jv_pce = predict_jv_pce_batch([
+        JVPCEPredictionRequest(
+            **DEVICE.model_dump(),
+            perovskite_composition=requests[0].perovskite_composition,
+            band_gap=responses[0].band_gap,
+            inorganic_composition=requests[0].inorganic_composition,
+            dimension_list_of_layers=requests[0].dimension_list_of_layers,
+            dimension=requests[0].dimension,
+        )
+    ], test_components)
+    np.testing.assert_allclose(responses[0].jv_pce, jv_pce[0], rtol=1e-6)
+    assert responses[1].jv_pce is None
+    assert all(response.pce_t80 is None for response in responses)
+    assert all(response.errors == {} for response in responses)
+
+
+def test_missing_chained_model_leaves_other_targets(tmp_path):
+    for model_name in (SavedModelName.BAND_GAP_XGB, SavedModelName.JV_PCE_XGB):
+        os.symlink(os.path.abspath(os.path.join(MODELS_PATH, model_name.value)), tmp_path / model_name.value)
+    components = AppComponents(model_repository=LocalModelRepository(models_path=str(tmp_path)))
+    requests = [
+        MultiTargetPredictionRequest(
+            **BAND_GAP_PREDICTION_REQUESTS[0].model_dump(), stability=STABILITY, device=DEVICE
+        ),
+        MultiTargetPredictionRequest(**BAND_GAP_PREDICTION_REQUESTS[1].model_dump(), device=DEVICE),
+    ]
+
+    responses = predict_all_targets_batch_service(requests, components)
+
+    assert all(response.pce_t80 is None for response in responses)
+    assert all(response.jv_pce is not None for response in responses)
+    np.testing.assert_allclose(
+        [response.band_gap for response in responses],
+        predict_band_gap_batch(BAND_GAP_PREDICTION_REQUESTS, components),
+        rtol=1e-6
+    )
+    assert SavedModelName.PCE_T80_XGB.name in responses[0].errors["pce_t80"]
+    assert responses[1].errors == {}
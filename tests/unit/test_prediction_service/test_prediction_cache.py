@@ -0,0 +1,59 @@
+from conftest import BAND_GAP_PREDICTION_REQUESTS
+from ml_prediction_web_service.entities.dictionary import Element
+from ml_prediction_web_service.entities.entities import ElementFraction
+from ml_prediction_web_service.services.prediction_cache import PredictionCache
+from ml_prediction_web_service.services.prediction_service import predict_band_gap_batch
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.
+
+    def __call__(self):
+        return self.now
+
+
+def test_key_ignores_element_order_and_fraction_noise():
+    cache = PredictionCache(fraction_tolerance=1e-3)
+    request = BAND_GAP_PREDICTION_REQUESTS[1]
+    reordered = request.model_copy(deep=True)
+    composition = reordered.perovskite_composition
+    composition.A_site = list(reversed(composition.A_site))
+    composition.C_site = [
+        ElementFraction(name=Element.I, frequence=1.50001), ElementFraction(name=Element.CL, frequence=1.49999)
+    ]
+
+    assert cache.make_key(request, "v1") == cache.make_key(reordered, "v1")
+    assert cache.make_key(request, "v1") != cache.make_key(request, "v2")
+    assert cache.make_key(request, "v1") != cache.make_key(BAND_GAP_PREDICTION_REQUESTS[0], "v1")
+
+
+def test_lru_eviction_and_ttl():
+    clock = _Clock()
+    cache = PredictionCache(max_size=2, ttl_seconds=10., clock=clock)
+    cache.put("a", 1.)
+    cache.put("b", 2.)
+    assert cache.get("a") == 1.
+    cache.put("c", 3.)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1.
+    clock.now = 11.
+    assert cache.get("c") is None
+
+    stats = cache.stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 2
+    assert stats["evictions"] == 1
+    assert stats["expirations"] == 1
+
+
+def test_predict_band_gap_batch_uses_cache(test_components):
+    test_components.prediction_cache = PredictionCache()
+    first = predict_band_gap_batch(BAND_GAP_PREDICTION_REQUESTS, test_components)
+    second = predict_band_gap_batch(BAND_GAP_PREDICTION_REQUESTS, test_components)
+
+    assert (first == second).all()
+    stats = test_components.prediction_cache.stats()
+    assert stats["hits"] == len(BAND_GAP_PREDICTION_REQUESTS)
+    assert stats["misses"] == len(BAND_GAP_PREDICTION_REQUESTS)
@@ -1,7 +1,10 @@
 import pytest
 
 from conftest import BAND_GAP_PREDICTION_REQUESTS
-from ml_prediction_web_service.services.prediction_service import predict_band_gap_service
+from ml_prediction_web_service.services.prediction_service import (
+    predict_band_gap_batch_service,
+    predict_band_gap_service
+)
 
 
 @pytest.mark.parametrize(
@@ -10,3 +13,37 @@ from ml_prediction_web_service.services.prediction_service import predict_band_g
 def test_predict_band_gap_service(request_entity, test_components):
     band_gap = predict_band_gap_service(request_entity, test_components)
     assert isinstance(band_gap, float)
+
+
+def _band_gap_payload(a_site, b_site, c_site):
+    return {
+        "perovskite_composition": {
+            "A_site": [{"name": name, "frequence": frequence} for name, frequence in a_site],
+            "B_site": [{"name": name, "frequence": frequence} for name, frequence in b_site],
+            "C_site": [{"name": name, "frequence": frequence} for name, frequence in c_site],
+        },
+        "inorganic_composition": False,
+        "dimension_list_of_layers": 1.0,
+        "dimension": "3D",
+        "space_group": "Pm3m",
+    }
+
+
+def test_predict_band_gap_batch_service(test_components):
+    items = [
+        _band_gap_payload([("MA", 1.0)], [("Pb", 1.0)], [("I", 3.0)]),
+        _band_gap_payload([("MA", 1.0)], [("Pb", 1.0)], [("I", 1.0)]),
+        _band_gap_payload([("FA", 0.8), ("Cs", 0.2)], [("Pb", 1.0)], [("I", 2.5), ("Br", 0.5)]),
+        "not a request",
+    ]
+
+    response = predict_band_gap_batch_service(items, test_components)
+
+    assert [result.index for result in response.results] == [0, 1, 2, 3]
+    for result in (response.results[1], response.results[3]):
+        assert result.band_gap is None
+        assert result.error is not None
+    assert "C site" in response.results[1].error
+    for result in (response.results[0], response.results[2]):
+        assert result.error is None
+        assert isinstance(result.band_gap, float)
@@ -1,6 +1,9 @@
 import pytest
 import pandas as pd
-from ml_prediction_web_service.services.preparation import prepare_perovskites_composition_input
+from ml_prediction_web_service.services.preparation import (
+    prepare_perovskites_composition_batch_input,
+    prepare_perovskites_composition_input
+)
 from tests.conftest import BAND_GAP_PREDICTION_REQUESTS
 
 
@@ -15,4 +18,15 @@ def test_prepare_perovskites_composition_input(request_entity):
     desired_columns_coefs = [f'{col}_coef' for col in desired_columns_names]
     desired_columns_struct = ["space_group", "composition_inorganic"]
     desired_columns = set(desired_columns_names + desired_columns_coefs + desired_columns_struct)
-    assert len(desired_columns.difference(set(df_input.columns))) == 0
\ No newline at end of file
+    assert len(desired_columns.difference(set(df_input.columns))) == 0
+
+def test_prepare_perovskites_composition_batch_input():
+    df_input = prepare_perovskites_composition_batch_input(BAND_GAP_PREDICTION_REQUESTS)
+
+    assert len(df_input) == len(BAND_GAP_PREDICTION_REQUESTS)
+    for i, request_entity in enumerate(BAND_GAP_PREDICTION_REQUESTS):
+        pd.testing.assert_frame_equal(
+            df_input.iloc[[i]].reset_index(drop=True),
+            prepare_perovskites_composition_input(request_entity),
+            check_dtype=False
+        )
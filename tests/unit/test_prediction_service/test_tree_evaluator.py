@@ -0,0 +1,62 @@
+import dataclasses
+import glob
+import os
+
+import joblib
+import numpy as np
+import pytest
+
+from conftest import BAND_GAP_PREDICTION_REQUESTS, MODELS_PATH
+from ml_prediction_web_service.services.prediction_service import (
+    PREDICTION_ENGINE_DATAFRAME,
+    PREDICTION_ENGINE_TREES,
+    predict_band_gap_batch
+)
+from ml_prediction_web_service.services.tree_evaluator import FlatTreeEnsemble
+
+
+def _bundled_boosters():
+    paths = glob.glob(os.path.join(MODELS_PATH, "*.joblib")) if MODELS_PATH else []
+    for path in sorted(paths):
+        model = joblib.load(path)
+        yield pytest.param(model.steps[-1][1].get_booster(), id=os.path.basename(path))
+
+
+@pytest.mark.parametrize("booster", _bundled_boosters())
+def test_flat_tree_ensemble_matches_booster(booster):
+    ensemble = FlatTreeEnsemble.from_booster(booster)
+    rng = np.random.default_rng(0)
+    matrix = rng.normal(size=(256, ensemble.n_features)).astype(np.float32)
+    # one-hot style zeros and missing values exercise both split directions and default directions
+    matrix[rng.random(matrix.shape) < 0.3] = 0.
+    matrix[rng.random(matrix.shape) < 0.3] = np.nan
+
+    np.testing.assert_allclose(ensemble.predict(matrix), booster.inplace_predict(matrix), rtol=1e-5, atol=1e-5)
+
+
+@pytest.mark.parametrize("booster", _bundled_boosters())
+def test_flat_tree_ensemble_predicts_single_row(booster):
+    ensemble = FlatTreeEnsemble.from_booster(booster)
+    row = np.full(ensemble.n_features, np.nan, dtype=np.float32)
+
+    assert ensemble.predict(row).shape == (1,)
+
+
+def test_trees_engine_matches_dataframe_engine(test_components):
+    expected = predict_band_gap_batch(
+        BAND_GAP_PREDICTION_REQUESTS, dataclasses.replace(test_components, prediction_engine=PREDICTION_ENGINE_DATAFRAME)
+    )
+
+    band_gaps = predict_band_gap_batch(
+        BAND_GAP_PREDICTION_REQUESTS, dataclasses.replace(test_components, prediction_engine=PREDICTION_ENGINE_TREES)
+    )
+
+    np.testing.assert_allclose(band_gaps, expected, rtol=1e-5)
+
+
+def test_flat_tree_ensemble_rejects_wrong_feature_count(test_components):
+    booster = test_components.model_repository.get_band_gap_xgb_model().steps[-1][1].get_booster()
+    ensemble = FlatTreeEnsemble.from_booster(booster)
+
+    with pytest.raises(ValueError):
+        ensemble.predict(np.zeros((1, ensemble.n_features + 1), dtype=np.float32))
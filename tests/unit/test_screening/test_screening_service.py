@@ -0,0 +1,95 @@
+import dataclasses
+import json
+
+import pandas as pd
+import pytest
+from pydantic import ValidationError
+
+from ml_prediction_web_service.entities.dictionary import Element, SpaceGroup, Dimension, Site
+from ml_prediction_web_service.entities.entities import BandGapScreeningRequest, SITE_FRACTION_TOTALS
+from ml_prediction_web_service.services.prediction_service import PREDICTION_ENGINES
+from ml_prediction_web_service.services.features.structure_features import calculate_effective_radii_for_site
+from ml_prediction_web_service.services.screening_service import (
+    build_site_candidates,
+    enumerate_site_compositions,
+    screen_band_gap_candidates
+)
+
+
+@pytest.mark.parametrize("site", list(Site))
+def test_enumerated_site_compositions_respect_site_total(site):
+    compositions = enumerate_site_compositions(
+        [Element.MA, Element.FA, Element.CS], 3, SITE_FRACTION_TOTALS[site], 0.25
+    )
+    # 3 single, 3 pairs x 3 grids, 1 triple x 3 grids
+    assert len(compositions) == 3 + 9 + 3
+    for composition in compositions:
+        assert sum(fraction for _, fraction in composition) == pytest.approx(SITE_FRACTION_TOTALS[site])
+
+
+def test_site_candidate_radii_match_row_wise_radii():
+    compositions = enumerate_site_compositions([Element.I, Element.BR, Element.CL], 3, 3.0, 0.5)
+    candidates = build_site_candidates(compositions, 3)
+    for i in range(len(candidates)):
+        row = pd.Series({
+            **{f"C_{j + 1}": candidates.names[i, j] for j in range(3)},
+            **{f"C_{j + 1}_coef": candidates.coefs[i, j] for j in range(3)},
+        })
+        assert candidates.radii[i] == calculate_effective_radii_for_site(row, Site.C)
+
+
+def _screening_request(**overrides) -> BandGapScreeningRequest:
+    return BandGapScreeningRequest(**{
+        "A_elements": [Element.MA, Element.FA, Element.CS],
+        "B_elements": [Element.PB, Element.SN],
+        "C_elements": [Element.I, Element.BR],
+        "fraction_step": 0.25,
+        "band_gap_min": 1.4,
+        "band_gap_max": 1.8,
+        "top_k": 5,
+        "chunk_size": 16,
+        "inorganic_composition": False,
+        "dimension_list_of_layers": 1.0,
+        "dimension": Dimension.THREE_DIM,
+        "space_group": SpaceGroup.CUBIC,
+        **overrides,
+    })
+
+
+def test_screen_band_gap_candidates(test_components):
+    request = _screening_request()
+    events = list(screen_band_gap_candidates(request, test_components))
+    json.dumps(events)
+
+    progress = [event for event in events if event["type"] == "progress"]
+    candidates = [event for event in events if event["type"] == "candidate"]
+    assert progress[-1]["evaluated"] == progress[-1]["total"]
+    assert len(candidates) <= 5
+    distances = [abs(candidate["band_gap"] - 1.6) for candidate in candidates]
+    assert distances == sorted(distances)
+    for candidate in candidates:
+        assert 1.4 <= candidate["band_gap"] <= 1.8
+
+
+def test_screening_engines_agree(test_components):
+    request = _screening_request()
+    results = {}
+    for engine in PREDICTION_ENGINES:
+        components = dataclasses.replace(test_components, prediction_engine=engine)
+        events = screen_band_gap_candidates(request, components)
+        results[engine] = [event["band_gap"] for event in events if event["type"] == "candidate"]
+    for engine in PREDICTION_ENGINES:
+        assert results[engine] == pytest.approx(results[PREDICTION_ENGINES[0]], rel=1e-5)
+
+
+@pytest.mark.parametrize("overrides", [
+    {"fraction_step": 0.001},
+    {"A_elements": list(Element)[:40], "max_A_components": 3, "fraction_step": 0.05},
+    {
+        "A_elements": list(Element)[:12], "max_A_components": 3, "C_elements": list(Element)[:12],
+        "max_C_components": 3, "fraction_step": 0.1,
+    },
+])
+def test_screening_space_is_bounded(overrides):
+    with pytest.raises(ValidationError):
+        _screening_request(**overrides)